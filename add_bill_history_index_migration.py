@@ -0,0 +1,23 @@
+from app.database.database import engine
+from sqlalchemy import text
+import sys
+import os
+
+# Add current directory to path so we can import app
+sys.path.append(os.getcwd())
+
+def add_index():
+    print("Attempting to add (user_id, created_at DESC, id DESC) index to 'bills' table...")
+    try:
+        # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text(
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_bills_user_created_id "
+                "ON bills(user_id, created_at DESC, id DESC);"
+            ))
+            print("Migration successful: Added ix_bills_user_created_id index.")
+    except Exception as e:
+        print(f"Migration failed: {e}")
+
+if __name__ == "__main__":
+    add_index()
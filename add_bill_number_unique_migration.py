@@ -0,0 +1,27 @@
+from app.database.database import engine
+from sqlalchemy import text
+import sys
+import os
+
+# Add current directory to path so we can import app
+sys.path.append(os.getcwd())
+
+def change_constraint():
+    print("Attempting to make 'bills.bill_number' unique per shop instead of globally...")
+    try:
+        with engine.connect() as conn:
+            # bill_sequences counts per shop, so two shops issue the same
+            # BILL{yy}Y{mm}N001 in a month; only (user_id, bill_number) is unique.
+            conn.execute(text(
+                "CREATE UNIQUE INDEX IF NOT EXISTS uq_bills_user_bill_number "
+                "ON bills(user_id, bill_number);"
+            ))
+            conn.execute(text("DROP INDEX IF EXISTS ix_bills_bill_number;"))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_bills_bill_number ON bills(bill_number);"))
+            conn.commit()
+            print("Migration successful: bill numbers are now unique per (user_id, bill_number).")
+    except Exception as e:
+        print(f"Migration failed: {e}")
+
+if __name__ == "__main__":
+    change_constraint()
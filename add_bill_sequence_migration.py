@@ -0,0 +1,47 @@
+from app.database.database import engine
+from sqlalchemy import text
+import sys
+import os
+
+# Add current directory to path so we can import app
+sys.path.append(os.getcwd())
+
+def add_table():
+    print("Attempting to create 'bill_sequences' table and seed it from existing bills...")
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("""
+                CREATE TABLE IF NOT EXISTS bill_sequences (
+                    user_id INTEGER NOT NULL REFERENCES users(id),
+                    year INTEGER NOT NULL,
+                    month INTEGER NOT NULL,
+                    last_value INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (user_id, year, month)
+                );
+            """))
+            # Seed each shop/month with the highest sequence already issued.
+            # Old numbers came from an all-time count, so the parsed N suffix can
+            # be larger than the month's bill count; take whichever is bigger.
+            conn.execute(text("""
+                INSERT INTO bill_sequences (user_id, year, month, last_value)
+                SELECT
+                    user_id,
+                    EXTRACT(YEAR FROM created_at)::int,
+                    EXTRACT(MONTH FROM created_at)::int,
+                    GREATEST(
+                        COUNT(*),
+                        MAX(COALESCE(substring(bill_number FROM 'N([0-9]+)$')::int, 0))
+                    )
+                FROM bills
+                WHERE user_id IS NOT NULL AND created_at IS NOT NULL
+                GROUP BY 1, 2, 3
+                ON CONFLICT (user_id, year, month)
+                DO UPDATE SET last_value = GREATEST(bill_sequences.last_value, EXCLUDED.last_value);
+            """))
+            conn.commit()
+            print("Migration successful: Created and seeded bill_sequences table.")
+    except Exception as e:
+        print(f"Migration failed: {e}")
+
+if __name__ == "__main__":
+    add_table()
@@ -0,0 +1,32 @@
+from app.database.database import engine
+from sqlalchemy import text
+import sys
+import os
+
+# Add current directory to path so we can import app
+sys.path.append(os.getcwd())
+
+def add_constraint():
+    print("Attempting to add unique (user_id, vegetable_id) constraint to 'inventory' table...")
+    try:
+        with engine.connect() as conn:
+            # Repeated setup/bulk-sync calls could leave several inventory rows for
+            # the same vegetable; keep the oldest one before adding the constraint.
+            conn.execute(text("""
+                DELETE FROM inventory i
+                USING inventory k
+                WHERE i.user_id = k.user_id
+                  AND i.vegetable_id = k.vegetable_id
+                  AND i.id > k.id;
+            """))
+            conn.execute(text(
+                "CREATE UNIQUE INDEX IF NOT EXISTS uq_inventory_user_vegetable "
+                "ON inventory(user_id, vegetable_id);"
+            ))
+            conn.commit()
+            print("Migration successful: inventory is now unique per (user_id, vegetable_id).")
+    except Exception as e:
+        print(f"Migration failed: {e}")
+
+if __name__ == "__main__":
+    add_constraint()
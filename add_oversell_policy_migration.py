@@ -0,0 +1,23 @@
+from app.database.database import engine
+from sqlalchemy import text
+import sys
+import os
+
+# Add current directory to path so we can import app
+sys.path.append(os.getcwd())
+
+def add_column():
+    print("Attempting to add 'oversell_policy' column to 'users' table...")
+    try:
+        with engine.connect() as conn:
+            # Existing shops keep today's behaviour: sell even when stock runs out
+            conn.execute(text(
+                "ALTER TABLE users ADD COLUMN IF NOT EXISTS oversell_policy VARCHAR(8) NOT NULL DEFAULT 'allow';"
+            ))
+            conn.commit()
+            print("Migration successful: Added oversell_policy column.")
+    except Exception as e:
+        print(f"Migration failed: {e}")
+
+if __name__ == "__main__":
+    add_column()
@@ -0,0 +1,23 @@
+from app.database.database import engine
+from sqlalchemy import text
+import sys
+import os
+
+# Add current directory to path so we can import app
+sys.path.append(os.getcwd())
+
+def add_column():
+    print("Attempting to add 'mobile_index' column to 'users' table...")
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("ALTER TABLE users ADD COLUMN IF NOT EXISTS mobile_index VARCHAR(64);"))
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_users_mobile_index ON users(mobile_index);"
+            ))
+            conn.commit()
+            print("Migration successful: Added 'mobile_index' column. Run backfill_phone_index.py next.")
+    except Exception as e:
+        print(f"Migration failed: {e}")
+
+if __name__ == "__main__":
+    add_column()
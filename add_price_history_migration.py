@@ -0,0 +1,42 @@
+from app.database.database import engine
+from app.models import inventory, price_history, user, vegetable # Import models for registration
+from app.models.price_history import PriceHistoryDay
+from sqlalchemy import text
+import sys
+import os
+
+# Add current directory to path so we can import app
+sys.path.append(os.getcwd())
+
+def add_table():
+    print("Attempting to create 'price_history_days' and seed it with today's inventory prices...")
+    try:
+        PriceHistoryDay.__table__.create(bind=engine, checkfirst=True)
+        with engine.connect() as conn:
+            # One point per inventory row at its last price change, so every chart has a starting price
+            conn.execute(text("""
+                INSERT INTO price_history_days (
+                    user_id, vegetable_id, day, points, offsets, wholesale, retail,
+                    open_wholesale, close_wholesale, min_wholesale, max_wholesale, sum_wholesale,
+                    open_retail, close_retail, min_retail, max_retail, sum_retail
+                )
+                SELECT
+                    user_id, vegetable_id, ts::date, 1,
+                    ARRAY[EXTRACT(EPOCH FROM ts - ts::date)::int], ARRAY[wholesale_price], ARRAY[retail_price],
+                    wholesale_price, wholesale_price, wholesale_price, wholesale_price, wholesale_price,
+                    retail_price, retail_price, retail_price, retail_price, retail_price
+                FROM (
+                    SELECT user_id, vegetable_id, wholesale_price, retail_price,
+                           COALESCE(price_updated_at, now() AT TIME ZONE 'utc') AS ts
+                    FROM inventory
+                    WHERE user_id IS NOT NULL AND vegetable_id IS NOT NULL
+                ) current_prices
+                ON CONFLICT (user_id, vegetable_id, day) DO NOTHING;
+            """))
+            conn.commit()
+            print("Migration successful: Created and seeded price_history_days.")
+    except Exception as e:
+        print(f"Migration failed: {e}")
+
+if __name__ == "__main__":
+    add_table()
@@ -0,0 +1,25 @@
+from app.database.database import engine
+from app.models import inventory, price_schedule, user, vegetable # Import models for registration
+from app.models.price_schedule import PriceSchedule
+from sqlalchemy import text
+import sys
+import os
+
+# Add current directory to path so we can import app
+sys.path.append(os.getcwd())
+
+def add_schedule():
+    print("Attempting to create 'price_schedules' and add 'price_schedule_id' to 'inventory'...")
+    try:
+        # Table and its partial indexes, exactly as declared on the model
+        PriceSchedule.__table__.create(bind=engine, checkfirst=True)
+        with engine.connect() as conn:
+            # Existing rows have no rate card applied; their prices stay as they are
+            conn.execute(text("ALTER TABLE inventory ADD COLUMN IF NOT EXISTS price_schedule_id INTEGER;"))
+            conn.commit()
+            print("Migration successful: Created price_schedules and added price_schedule_id.")
+    except Exception as e:
+        print(f"Migration failed: {e}")
+
+if __name__ == "__main__":
+    add_schedule()
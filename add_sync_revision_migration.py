@@ -0,0 +1,47 @@
+from app.database.database import engine
+from app.models import inventory, user, vegetable # Import models for registration
+from app.models.inventory import InventoryTombstone
+from sqlalchemy import text
+import sys
+import os
+
+# Add current directory to path so we can import app
+sys.path.append(os.getcwd())
+
+def add_columns():
+    print("Attempting to add sync 'revision' columns, ledger 'txid' and the 'inventory_tombstones' table...")
+    try:
+        InventoryTombstone.__table__.create(bind=engine, checkfirst=True)
+        with engine.connect() as conn:
+            # Existing rows start at revision 0; clients pick them up with a full sync (since=0)
+            conn.execute(text("ALTER TABLE inventory ADD COLUMN IF NOT EXISTS revision INTEGER NOT NULL DEFAULT 0;"))
+            conn.execute(text("ALTER TABLE vegetables ADD COLUMN IF NOT EXISTS revision INTEGER NOT NULL DEFAULT 0;"))
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_inventory_user_revision ON inventory (user_id, revision);"
+            ))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_vegetables_revision ON vegetables (revision);"))
+            # Sales are synced through the ledger; existing movements get this transaction's id
+            conn.execute(text(
+                "ALTER TABLE stock_movements ADD COLUMN IF NOT EXISTS txid BIGINT NOT NULL DEFAULT txid_current();"
+            ))
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_stock_movements_user_txid "
+                "ON stock_movements (user_id, txid) INCLUDE (vegetable_id);"
+            ))
+            # Per-shop and master list counters start above the revisions already stamped
+            conn.execute(text(
+                "INSERT INTO catalog_versions (name, version) "
+                "SELECT 'sync:' || user_id, MAX(revision) FROM ("
+                "  SELECT user_id, revision FROM inventory"
+                "  UNION ALL SELECT user_id, revision FROM inventory_tombstones"
+                ") stamped GROUP BY user_id "
+                "UNION ALL SELECT 'sync:vegetables', COALESCE(MAX(revision), 0) FROM vegetables "
+                "ON CONFLICT (name) DO UPDATE SET version = GREATEST(catalog_versions.version, EXCLUDED.version);"
+            ))
+            conn.commit()
+            print("Migration successful: Added revision columns, ledger txid and inventory_tombstones.")
+    except Exception as e:
+        print(f"Migration failed: {e}")
+
+if __name__ == "__main__":
+    add_columns()
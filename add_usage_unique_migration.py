@@ -0,0 +1,43 @@
+from app.database.database import engine
+from sqlalchemy import text
+import sys
+import os
+
+# Add current directory to path so we can import app
+sys.path.append(os.getcwd())
+
+def add_constraint():
+    print("Attempting to add unique (user_id, vegetable_id) constraint to 'vegetable_usage' table...")
+    try:
+        with engine.connect() as conn:
+            # The old per-item loop could insert duplicate usage rows for the same
+            # vegetable; fold them into the oldest row before adding the constraint.
+            conn.execute(text("""
+                UPDATE vegetable_usage u
+                SET usage_count = d.total
+                FROM (
+                    SELECT MIN(id) AS keep_id, SUM(usage_count) AS total
+                    FROM vegetable_usage
+                    GROUP BY user_id, vegetable_id
+                    HAVING COUNT(*) > 1
+                ) d
+                WHERE u.id = d.keep_id;
+            """))
+            conn.execute(text("""
+                DELETE FROM vegetable_usage u
+                USING vegetable_usage k
+                WHERE u.user_id = k.user_id
+                  AND u.vegetable_id = k.vegetable_id
+                  AND u.id > k.id;
+            """))
+            conn.execute(text(
+                "CREATE UNIQUE INDEX IF NOT EXISTS uq_vegetable_usage_user_vegetable "
+                "ON vegetable_usage(user_id, vegetable_id);"
+            ))
+            conn.commit()
+            print("Migration successful: vegetable_usage is now unique per (user_id, vegetable_id).")
+    except Exception as e:
+        print(f"Migration failed: {e}")
+
+if __name__ == "__main__":
+    add_constraint()
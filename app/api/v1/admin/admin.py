@@ -3,7 +3,11 @@ from sqlalchemy.orm import Session
 from app.database.database import get_db
 from app.schema.user import UserCreate, UserResponse
 from app.models.user import User, UserRole
-from app.core.auth import get_password_hash, check_role, get_current_user
+from app.core.auth import hash_password, check_role, get_current_user
+from app.core.kdf import KdfBusy
+from app.core.user_cache import invalidate_user, user_cache_stats
+from app.services.catalog_cache import catalog_cache_stats
+from app.services.pdf_cache import pdf_cache_stats
 
 router = APIRouter()
 
@@ -17,7 +21,15 @@ async def create_user(
     if db_user:
         raise HTTPException(status_code=400, detail="Username already registered")
     
-    hashed_password = get_password_hash(user_in.password)
+    # Off the event loop, on the KDF pool
+    try:
+        hashed_password = await hash_password(user_in.password, username=current_user.username)
+    except KdfBusy as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=e.detail,
+            headers={"Retry-After": str(e.retry_after)}
+        )
     new_user = User(
         username=user_in.username,
         hashed_password=hashed_password,
@@ -27,4 +39,17 @@ async def create_user(
     db.add(new_user)
     db.commit()
     db.refresh(new_user)
+    invalidate_user(new_user.username)
     return new_user
+
+
+@router.get("/cache-stats")
+async def get_cache_stats(
+    current_user: User = Depends(check_role([UserRole.ADMIN]))
+):
+    """Hit/miss counters of this worker's in-process caches."""
+    return {
+        "auth": user_cache_stats(),
+        "catalog": catalog_cache_stats(),
+        "pdf": pdf_cache_stats(),
+    }
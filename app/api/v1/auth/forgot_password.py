@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from typing import Optional
 from datetime import timedelta
+import hmac
 
 from app.database.database import get_db
 from app.models.user import User
@@ -10,8 +11,11 @@ from app.core.auth import (
     create_access_token,
     hash_password,
     decrypt_phone,
+    phone_blind_index,
     verify_password,
 )
+from app.core.kdf import KdfBusy
+from app.core.user_cache import invalidate_user
 from jose import JWTError, jwt
 from app.core import config
 
@@ -44,8 +48,11 @@ class ResetPasswordResponse(BaseModel):
 
 # ── Helper ─────────────────────────────────────────────────────────────────────
 
-async def _match_mobile(plain_phone: str, encrypted_phone: str) -> bool:
-    """Decrypt the stored phone and compare to the plain input."""
+async def _match_mobile(plain_phone: str, user: User) -> bool:
+    """Compare the plain input to the user's blind index, or decrypt rows not backfilled yet."""
+    if user.mobile_index:
+        return hmac.compare_digest(phone_blind_index(plain_phone), user.mobile_index)
+    encrypted_phone = user.mobile_number
     try:
         decrypted = await decrypt_phone(encrypted_phone)
         # Normalise: strip spaces / dashes for a loose match
@@ -84,7 +91,7 @@ async def forgot_password(
                    "Please contact the administrator.",
         )
 
-    phone_match = await _match_mobile(request.mobile_number, user.mobile_number)
+    phone_match = await _match_mobile(request.mobile_number, user)
     if not phone_match:
         raise generic_error
 
@@ -103,6 +110,7 @@ async def forgot_password(
 @router.post("/reset-password", response_model=ResetPasswordResponse)
 async def reset_password(
     request: ResetPasswordRequest,
+    http_request: Request,
     db: Session = Depends(get_db),
 ):
     """
@@ -130,8 +138,19 @@ async def reset_password(
         raise credentials_exception
 
     # Hash and persist the new password
-    new_hashed = await hash_password(request.new_password)
+    try:
+        new_hashed = await hash_password(
+            request.new_password, username=user.username,
+            client_ip=http_request.client.host if http_request.client else None
+        )
+    except KdfBusy as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=e.detail,
+            headers={"Retry-After": str(e.retry_after)}
+        )
     user.hashed_password = new_hashed
     db.commit()
+    invalidate_user(user.username)
 
     return ResetPasswordResponse(message="Password has been reset successfully.")
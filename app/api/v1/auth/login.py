@@ -1,19 +1,36 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from ....database.database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ....database.database import get_async_db
 from app.models.user import User
 from app.core.auth import verify_password, create_access_token
+from app.core.kdf import KdfBusy
 from app.schema.user import Token
 from datetime import timedelta
 
 router = APIRouter()
 
 @router.post("/login", response_model=Token)
-async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == form_data.username).first()
-   
-    if not user or not await verify_password(form_data.password, user.hashed_password):
+async def login(request: Request, form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
+    user = (await db.execute(select(User).where(User.username == form_data.username))).scalars().first()
+    # Hand the connection back before the ~100 ms hash
+    await db.close()
+
+    verified = False
+    if user:
+        try:
+            verified = await verify_password(
+                form_data.password, user.hashed_password,
+                username=user.username, client_ip=request.client.host if request.client else None
+            )
+        except KdfBusy as e:
+            raise HTTPException(
+                status_code=e.status_code,
+                detail=e.detail,
+                headers={"Retry-After": str(e.retry_after)}
+            )
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
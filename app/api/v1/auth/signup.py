@@ -1,6 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
-from app.core.auth import hash_password, encrypt_phone
+from app.core.auth import hash_password, encrypt_phone, phone_blind_index
+from app.core.kdf import KdfBusy
 from app.database.database import get_db
 from app.models.user import User
 from app.schema.user import UserCreate, UserResponse
@@ -8,13 +9,22 @@ from app.schema.user import UserCreate, UserResponse
 router = APIRouter()
 
 @router.post("/signup", response_model=UserResponse)
-async def signup(user_in: UserCreate, db: Session = Depends(get_db)):
+async def signup(request: Request, user_in: UserCreate, db: Session = Depends(get_db)):
     # Check if username already exists
     if db.query(User).filter(User.username == user_in.username).first():
         raise HTTPException(status_code=400, detail="Username already exists")
 
     # Hash password and encrypt phone
-    hashed_password = await hash_password(user_in.password)
+    try:
+        hashed_password = await hash_password(
+            user_in.password, client_ip=request.client.host if request.client else None
+        )
+    except KdfBusy as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=e.detail,
+            headers={"Retry-After": str(e.retry_after)}
+        )
     encrypted_phone = await encrypt_phone(user_in.mobile_number) if user_in.mobile_number else None
 
     # Create user
@@ -23,6 +33,7 @@ async def signup(user_in: UserCreate, db: Session = Depends(get_db)):
         hashed_password=hashed_password,
         shop_name=user_in.shop_name,
         mobile_number=encrypted_phone,
+        mobile_index=phone_blind_index(user_in.mobile_number) if user_in.mobile_number else None,
         role=user_in.role
     )
     db.add(db_user)
@@ -1,42 +1,62 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List
-import uuid
-from datetime import datetime, timedelta
-from app.database.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlalchemy import delete, select, tuple_
+from sqlalchemy.exc import IntegrityError
+from typing import List, Literal, Optional
+from datetime import date, datetime, timedelta
+from app.database.database import get_async_db
 from app.models.bill import Bill, BillItem
+from app.models.customer import Customer
+from app.models.sales_rollup import DailySalesRollup, DailyVegetableRollup
 from app.models.inventory import Inventory
 from app.models.vegetable import Vegetable
-from app.models.usage import VegetableUsage
 from app.models.user import User
-from app.schema.bill import BillCreate, BillResponse, DashboardStats, BillUpdate
+from app.schema.bill import BillCreate, BillCreateResponse, BillResponse, DashboardStats, BillUpdate, StockShortageItem
 from app.core.auth import get_current_user
-from app.services.pdf_service import generate_bill_pdf
-from fastapi.responses import StreamingResponse
+from app.utils.pagination import encode_cursor, decode_cursor
+from app.utils.http_cache import not_modified, set_etag
+from app.services.pdf_service import bill_version
+from app.services.pdf_worker import PdfQueueFull, render_bill_pdf_async
+from app.services.pdf_cache import invalidate_bill_pdf_async
+from app.services.receipt_service import TEMPLATES as RECEIPT_TEMPLATES, render_escpos, render_receipt_pdf
+from app.services.billing_service import (
+    add_bill_lines,
+    allocate_bill_number,
+    filter_bills,
+    insert_bill_items,
+    resolve_vegetables
+)
+from app.services.sales_rollup_service import apply_bill_to_rollup
+from app.services.customer_stats_service import apply_bill_to_customer_stats
+from app.services.stock_ledger_service import StockShortage, current_stock, pending_stock, with_current_stock
 
 router = APIRouter(prefix="/billing")
 
-@router.post("/create", response_model=BillResponse)
+
+async def _load_bill(db: AsyncSession, bill_id: int, user_id: int) -> Optional[Bill]:
+    """The shop's bill with its items loaded (async sessions cannot lazy-load them later)."""
+    result = await db.execute(
+        select(Bill).options(selectinload(Bill.items))
+        .where(Bill.id == bill_id, Bill.user_id == user_id)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalars().first()
+
+
+@router.post("/create", response_model=BillCreateResponse)
 async def create_bill(
     bill_in: BillCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     try:
-        total_amount = 0
-        
         # Initialize bill
         # Custom bill number generation: BILL26Y02N001
-        now = datetime.utcnow()
-        year_code = now.strftime('%y') # '26'
-        month_code = now.strftime('%m') # '02'
-        
-        # Get count of bills for this user to generate next sequence number
-        bill_count = db.query(func.count(Bill.id)).filter(Bill.user_id == current_user.id).scalar() or 0
-        sequence = str(bill_count + 1).zfill(3)
-        
-        bill_number = bill_in.bill_number or f"BILL{year_code}Y{month_code}N{sequence}"
+        # Uses the per-shop monthly counter instead of counting all past bills
+        bill_number = bill_in.bill_number or await db.run_sync(
+            allocate_bill_number, current_user.id, datetime.utcnow()
+        )
         db_bill = Bill(
             bill_number=bill_number,
             user_id=current_user.id,
@@ -53,8 +73,9 @@ async def create_bill(
         
         # Sync with Customer table
         if bill_in.customer_mobile:
-            from app.models.customer import Customer
-            existing_customer = db.query(Customer).filter(Customer.mobile_number == bill_in.customer_mobile).first()
+            existing_customer = (await db.execute(
+                select(Customer).where(Customer.mobile_number == bill_in.customer_mobile)
+            )).scalars().first()
             if existing_customer:
                 existing_customer.name = bill_in.customer_name or existing_customer.name
                 existing_customer.updated_at = datetime.utcnow()
@@ -65,73 +86,48 @@ async def create_bill(
                 )
                 db.add(new_customer)
             
-        db.flush() # Get bill ID
+        await db.flush() # Get bill ID
         
-        for item in bill_in.items:
-            # Try to find vegetable by ID or Name
-            if item.vegetable_id:
-                veg = db.query(Vegetable).filter(Vegetable.id == item.vegetable_id).first()
-            else:
-                veg = db.query(Vegetable).filter(Vegetable.name == item.name).first()
-            
-            if not veg:
-                continue
-
-            # Check inventory for this user
-            inv = db.query(Inventory).filter(
-                Inventory.user_id == current_user.id,
-                Inventory.vegetable_id == veg.id
-            ).with_for_update().first() 
-            
-            if inv and inv.stock_kg < item.quantity:
-                inv.stock_kg -= item.quantity
-            elif inv:
-                inv.stock_kg -= item.quantity
-            
-            price = item.price
-            subtotal = item.total
-            total_amount += subtotal
-            
-            # Create bill item
-            db_bill_item = BillItem(
-                bill_id=db_bill.id,
-                vegetable_id=veg.id,
-                vegetable_name=veg.name,
-                tamil_name=veg.tamil_name,
-                grade=item.grade,
-                qty_kg=item.quantity,
-                price=price,
-                subtotal=subtotal
-            )
-            db.add(db_bill_item)
-            
-            # Update usage
-            usage = db.query(VegetableUsage).filter(
-                VegetableUsage.user_id == current_user.id,
-                VegetableUsage.vegetable_id == veg.id
-            ).first()
-            if usage:
-                usage.usage_count += 1
-            else:
-                new_usage = VegetableUsage(
-                    user_id=current_user.id,
-                    vegetable_id=veg.id,
-                    usage_count=1
-                )
-                db.add(new_usage)
+        # Resolve, book stock and insert all lines in a fixed number of statements
+        total_amount, bill_lines, shortages = await db.run_sync(
+            add_bill_lines, db_bill.id, current_user.id, bill_in.items, current_user.oversell_policy
+        )
         
         # Calculate final totals
         final_subtotal = total_amount if total_amount > 0 else bill_in.subtotal
         db_bill.subtotal = final_subtotal
         db_bill.total_amount = final_subtotal + bill_in.tax_amount - bill_in.discount_amount
         
-        db.commit()
-        db.refresh(db_bill)
+        # Keep the dashboard rollups in the same transaction as the bill
+        await db.run_sync(
+            apply_bill_to_rollup, current_user.id, db_bill.created_at.date(), db_bill.billing_type,
+            db_bill.total_amount, bill_lines
+        )
+        await db.run_sync(
+            apply_bill_to_customer_stats, current_user.id, db_bill.customer_mobile, db_bill.customer_name,
+            db_bill.bill_number, db_bill.created_at, db_bill.total_amount
+        )
+        
+        await db.commit()
         
-        return db_bill
+        response = BillCreateResponse.model_validate(await _load_bill(db, db_bill.id, current_user.id))
+        response.stock_warnings = [StockShortageItem(**line) for line in shortages]
+        return response
         
+    except StockShortage as e:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail={
+            "message": "Not enough stock",
+            "items": [StockShortageItem(**line).model_dump(by_alias=True) for line in e.shortages]
+        })
+    except IntegrityError as e:
+        await db.rollback()
+        if "uq_bills_user_bill_number" in str(e.orig):
+            # Only reachable with a client-supplied number; allocated ones are unique per shop
+            raise HTTPException(status_code=409, detail="Bill number already exists")
+        raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         if isinstance(e, HTTPException):
             raise e
         raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
@@ -142,16 +138,33 @@ async def create_bill(
 async def update_bill(
     bill_id: int,
     bill_update: BillUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Handles 'Edit Invoice' - updates bill header and items.
     """
-    db_bill = db.query(Bill).filter(Bill.id == bill_id, Bill.user_id == current_user.id).first()
+    db_bill = (await db.execute(
+        select(Bill).where(Bill.id == bill_id, Bill.user_id == current_user.id)
+    )).scalars().first()
     if not db_bill:
         raise HTTPException(status_code=404, detail="Bill not found")
 
+    # Take the bill's current contribution out of the dashboard rollups
+    old_lines = [
+        {"vegetable_id": row.vegetable_id, "vegetable_name": row.vegetable_name, "qty_kg": row.qty_kg}
+        for row in await db.execute(
+            select(BillItem.vegetable_id, BillItem.vegetable_name, BillItem.qty_kg)
+            .where(BillItem.bill_id == bill_id, BillItem.vegetable_id != None)
+        )
+    ]
+    await db.run_sync(
+        apply_bill_to_rollup, current_user.id, db_bill.created_at.date(), db_bill.billing_type,
+        db_bill.total_amount, old_lines, sign=-1
+    )
+    new_lines = old_lines
+    old_total = db_bill.total_amount or 0.0
+
     if bill_update.customer_name is not None:
         db_bill.customer_name = bill_update.customer_name
     if bill_update.billing_type is not None:
@@ -159,28 +172,12 @@ async def update_bill(
     
     if bill_update.items is not None:
         # 1. Clear existing items
-        db.query(BillItem).filter(BillItem.bill_id == bill_id).delete()
+        await db.execute(delete(BillItem).where(BillItem.bill_id == bill_id))
         
         # 2. Add new items
-        for item in bill_update.items:
-            if item.vegetable_id:
-                veg = db.query(Vegetable).filter(Vegetable.id == item.vegetable_id).first()
-            else:
-                veg = db.query(Vegetable).filter(Vegetable.name == item.name).first()
-            
-            if not veg: continue
-
-            db_item = BillItem(
-                bill_id=bill_id,
-                vegetable_id=veg.id,
-                vegetable_name=veg.name,
-                tamil_name=veg.tamil_name,
-                grade=item.grade,
-                qty_kg=item.quantity,
-                price=item.price,
-                subtotal=item.total
-            )
-            db.add(db_item)
+        new_lines = await db.run_sync(
+            lambda session: insert_bill_items(session, bill_id, resolve_vegetables(session, bill_update.items))
+        )
 
     if bill_update.subtotal is not None:
         db_bill.subtotal = bill_update.subtotal
@@ -191,78 +188,133 @@ async def update_bill(
     if bill_update.grand_total is not None:
         db_bill.total_amount = bill_update.grand_total
 
-    db.commit()
-    db.refresh(db_bill)
-    return db_bill
+    # ...and add the edited bill back
+    await db.run_sync(
+        apply_bill_to_rollup, current_user.id, db_bill.created_at.date(), db_bill.billing_type,
+        db_bill.total_amount, new_lines
+    )
+    await db.run_sync(
+        apply_bill_to_customer_stats, current_user.id, db_bill.customer_mobile, db_bill.customer_name,
+        db_bill.bill_number, db_bill.created_at, (db_bill.total_amount or 0.0) - old_total,
+        purchases_delta=0
+    )
+
+    await db.commit()
+    # Drop this worker's cached PDFs; other workers miss on the new version hash
+    await invalidate_bill_pdf_async(bill_id)
+    return await _load_bill(db, bill_id, current_user.id)
 
 @router.get("/dashboard/stats", response_model=DashboardStats)
 async def get_dashboard_stats(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Provides data for the Billing Dashboard selection page.
     """
     today = datetime.utcnow().date()
+    week_start = today - timedelta(days=6)
     
-    # Query today's bills
-    today_bills = db.query(Bill).filter(
-        Bill.user_id == current_user.id,
-        func.date(Bill.created_at) == today
-    ).all()
+    # One indexed range read over the rollup covers today's totals and the weekly chart
+    daily_rows = (await db.execute(select(DailySalesRollup).where(
+        DailySalesRollup.user_id == current_user.id,
+        DailySalesRollup.date >= week_start,
+        DailySalesRollup.date <= today
+    ))).scalars().all()
     
-    retail_total = sum(b.total_amount for b in today_bills if b.billing_type == "Retail")
-    wholesale_total = sum(b.total_amount for b in today_bills if b.billing_type == "Wholesale")
+    today_rows = [row for row in daily_rows if row.date == today]
+    retail_total = sum(row.total_amount for row in today_rows if row.billing_type == "Retail")
+    wholesale_total = sum(row.total_amount for row in today_rows if row.billing_type == "Wholesale")
+    total_bills_today = sum(row.bill_count for row in today_rows)
     
     # Get top selling items today (by count of appearances in bills)
-    top_items = db.query(BillItem.vegetable_name, func.count(BillItem.id).label('count'))\
-        .join(Bill)\
-        .filter(Bill.user_id == current_user.id, func.date(Bill.created_at) == today)\
-        .group_by(BillItem.vegetable_name)\
-        .order_by(func.count(BillItem.id).desc())\
-        .limit(3)\
-        .all()
+    top_items = (await db.execute(
+        select(DailyVegetableRollup.vegetable_name)
+        .where(
+            DailyVegetableRollup.user_id == current_user.id,
+            DailyVegetableRollup.date == today,
+            DailyVegetableRollup.line_count > 0
+        )
+        .order_by(DailyVegetableRollup.line_count.desc())
+        .limit(3)
+    )).all()
 
     # Get weekly revenue for the last 7 days
-    weekly_revenue = []
-    for i in range(6, -1, -1):
-        day_date = today - timedelta(days=i)
-        day_total = db.query(func.sum(Bill.total_amount))\
-            .filter(Bill.user_id == current_user.id, func.date(Bill.created_at) == day_date)\
-            .scalar() or 0.0
-        weekly_revenue.append(float(day_total))
+    revenue_by_day = {}
+    for row in daily_rows:
+        revenue_by_day[row.date] = revenue_by_day.get(row.date, 0.0) + row.total_amount
+    weekly_revenue = [
+        float(revenue_by_day.get(today - timedelta(days=i), 0.0))
+        for i in range(6, -1, -1)
+    ]
 
-    # Get low stock items (threshold 5kg)
-    low_stock = db.query(Inventory).join(Vegetable).filter(
-        Inventory.user_id == current_user.id,
-        Inventory.stock_kg < 5
-    ).all()
+    # Get low stock items (threshold 5kg), snapshot plus pending ledger movements
+    pending = pending_stock(current_user.id)
+    low_stock = (await db.execute(
+        with_current_stock(
+            select(Vegetable.name).select_from(Inventory).join(Vegetable, Inventory.vegetable_id == Vegetable.id),
+            pending
+        ).where(
+            Inventory.user_id == current_user.id,
+            current_stock(pending) < 5
+        )
+    )).all()
 
     return {
         "shopName": current_user.shop_name or "Suji Vegetables",
         "todayRetailTotal": retail_total,
         "todayWholesaleTotal": wholesale_total,
-        "totalBillsToday": len(today_bills),
+        "totalBillsToday": total_bills_today,
         "topSellingItems": [item[0] for item in top_items],
         "weeklyRevenue": weekly_revenue,
         "lowStockCount": len(low_stock),
-        "lowStockItems": [inv.vegetable.name for inv in low_stock]
+        "lowStockItems": [row.name for row in low_stock]
     }
 
 @router.get("/history", response_model=List[BillResponse])
 async def get_billing_history(
-    db: Session = Depends(get_db),
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    billing_type: Optional[str] = None,
+    customer_mobile: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    return db.query(Bill).filter(Bill.user_id == current_user.id).order_by(Bill.created_at.desc()).all()
+    """
+    Newest-first billing history, keyset paginated on (created_at, id).
+    Pass the X-Next-Cursor response header back as `cursor` to get the next page;
+    the header is absent on the last page.
+    """
+    query = filter_bills(
+        select(Bill), current_user.id, from_date, to_date, billing_type, customer_mobile
+    )
+
+    after = decode_cursor(cursor)
+    if after:
+        query = query.filter(tuple_(Bill.created_at, Bill.id) < after)
+
+    # Fetch one extra row to know whether another page exists
+    bills = (await db.execute(
+        query.options(selectinload(Bill.items))
+        .order_by(Bill.created_at.desc(), Bill.id.desc())
+        .limit(limit + 1)
+    )).scalars().all()
+
+    if len(bills) > limit:
+        bills = bills[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(bills[-1].created_at, bills[-1].id)
+    return bills
 
 @router.get("/{bill_id}", response_model=BillResponse)
 async def get_bill(
     bill_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    bill = db.query(Bill).filter(Bill.id == bill_id, Bill.user_id == current_user.id).first()
+    bill = await _load_bill(db, bill_id, current_user.id)
     if not bill:
         raise HTTPException(status_code=404, detail="Bill not found")
     return bill
@@ -270,16 +322,61 @@ async def get_bill(
 @router.get("/{bill_id}/pdf")
 async def get_bill_pdf_endpoint(
     bill_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    bill = db.query(Bill).filter(Bill.id == bill_id, Bill.user_id == current_user.id).first()
+    bill = await _load_bill(db, bill_id, current_user.id)
     if not bill:
         raise HTTPException(status_code=404, detail="Bill not found")
-    
-    pdf_buffer = generate_bill_pdf(bill)
-    return StreamingResponse(
-        pdf_buffer,
+
+    version = bill_version(bill)
+    etag = f'"bill-{bill.id}-{version}"'
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+
+    # Rendered in the PDF process pool; this worker keeps serving other requests
+    try:
+        pdf = await render_bill_pdf_async(bill, version)
+    except PdfQueueFull as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=e.detail,
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    response = Response(
+        content=pdf,
         media_type="application/pdf",
         headers={"Content-Disposition": f"attachment; filename=bill_{bill.bill_number}.pdf"}
     )
+    set_etag(response, etag)
+    return response
+
+@router.get("/{bill_id}/receipt")
+async def get_bill_receipt(
+    bill_id: int,
+    format: Literal["escpos", "pdf"] = "escpos",
+    width: int = 58,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Thermal receipt for 58mm/80mm counter printers: raw ESC/POS bytes or a
+    narrow PDF. Takes a few milliseconds, so it is rendered inline.
+    """
+    if width not in RECEIPT_TEMPLATES:
+        raise HTTPException(status_code=400, detail=f"width must be one of {sorted(RECEIPT_TEMPLATES)}")
+    bill = await _load_bill(db, bill_id, current_user.id)
+    if not bill:
+        raise HTTPException(status_code=404, detail="Bill not found")
+
+    if format == "pdf":
+        content, media_type, extension = render_receipt_pdf(bill, width), "application/pdf", "pdf"
+    else:
+        content, media_type, extension = render_escpos(bill, width), "application/octet-stream", "bin"
+    return Response(
+        content=content,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=receipt_{bill.bill_number}_{width}mm.{extension}"}
+    )
@@ -0,0 +1,279 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from typing import List, Literal, Optional
+from datetime import date, datetime
+import csv
+import io
+import json
+import zipfile
+import zlib
+from app.database.database import AsyncSessionLocal, SessionLocal, get_async_db
+from app.models.bill import Bill, BillItem
+from app.models.user import User
+from app.schema.bill import BillResponse, BillItemResponse
+from app.core.auth import get_current_user
+from app.services.billing_service import filter_bills
+from app.services.pdf_cache import get_cached_pdf_async
+from app.services.pdf_service import bill_version
+from app.services.pdf_worker import bill_snapshot, render_snapshots_in_order
+from app.utils.pdf_concat import PdfConcatenator
+
+router = APIRouter(prefix="/billing")
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_BATCH_SIZE = 1000
+# Flush the output buffer to the client once it grows past this size
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+# Bills loaded per query when feeding the PDF renderer
+PDF_LOAD_BATCH_SIZE = 50
+
+# Column names follow the BillResponse / BillItemResponse aliases so exports match the API
+BILL_FIELDS = [
+    (name, field.alias or name)
+    for name, field in BillResponse.model_fields.items()
+    if name != "items"
+]
+ITEM_FIELDS = [
+    (name, field.alias or name)
+    for name, field in BillItemResponse.model_fields.items()
+]
+
+
+def _to_json_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _export_rows(user_id: int, filters: dict):
+    """
+    Stream (bill columns..., item columns...) rows ordered by bill.
+    Uses its own session because the request-scoped one is closed before
+    the response body is streamed. Sync on purpose: StreamingResponse
+    iterates sync generators in the threadpool, off the event loop.
+    """
+    stmt = select(
+        *[getattr(Bill, name) for name, _ in BILL_FIELDS],
+        *[getattr(BillItem, name) for name, _ in ITEM_FIELDS],
+    ).outerjoin(BillItem, BillItem.bill_id == Bill.id)
+    stmt = filter_bills(stmt, user_id, **filters)\
+        .order_by(Bill.created_at, Bill.id, BillItem.id)\
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+
+    db = SessionLocal()
+    try:
+        for row in db.execute(stmt):
+            yield row
+    finally:
+        db.close()
+
+
+def _csv_lines(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([alias for _, alias in BILL_FIELDS] + [alias for _, alias in ITEM_FIELDS])
+    for row in rows:
+        writer.writerow(["" if value is None else _to_json_value(value) for value in row])
+        if buffer.tell() >= EXPORT_CHUNK_BYTES:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _ndjson_lines(rows):
+    """One JSON object per bill with its items nested, like BillResponse."""
+    bill_width = len(BILL_FIELDS)
+    id_index = [name for name, _ in BILL_FIELDS].index("id")
+    chunk = []
+    size = 0
+    current = None
+    current_id = None
+
+    def finish(bill):
+        return json.dumps(bill, ensure_ascii=False) + "\n"
+
+    for row in rows:
+        bill_id = row[id_index]
+        if bill_id != current_id:
+            if current is not None:
+                line = finish(current)
+                chunk.append(line)
+                size += len(line)
+            current_id = bill_id
+            current = {alias: _to_json_value(row[i]) for i, (_, alias) in enumerate(BILL_FIELDS)}
+            current["items"] = []
+        item_values = row[bill_width:]
+        if item_values[0] is not None:
+            current["items"].append({
+                alias: item_values[i] for i, (_, alias) in enumerate(ITEM_FIELDS)
+            })
+        if size >= EXPORT_CHUNK_BYTES:
+            yield "".join(chunk)
+            chunk = []
+            size = 0
+
+    if current is not None:
+        chunk.append(finish(current))
+    yield "".join(chunk)
+
+
+def _encode(lines, compress: bool):
+    if not compress:
+        for text in lines:
+            if text:
+                yield text.encode("utf-8")
+        return
+    # wbits=31 writes a gzip container
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for text in lines:
+        data = compressor.compress(text.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+@router.get("/export")
+async def export_bills(
+    format: Literal["csv", "ndjson"] = "csv",
+    gzip: bool = False,
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    billing_type: Optional[str] = None,
+    customer_mobile: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Streams bills and their line items for the accountant.
+    CSV has one row per line item (bill columns repeated); NDJSON has one
+    bill per line with nested items. Rows are read through a server-side
+    cursor, so memory stays flat regardless of the date range.
+    """
+    filters = {
+        "from_date": from_date,
+        "to_date": to_date,
+        "billing_type": billing_type,
+        "customer_mobile": customer_mobile,
+    }
+    rows = _export_rows(current_user.id, filters)
+    lines = _csv_lines(rows) if format == "csv" else _ndjson_lines(rows)
+
+    filename = f"bills_{from_date or 'all'}_{to_date or 'all'}.{format}"
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    if gzip:
+        filename += ".gz"
+        media_type = "application/gzip"
+
+    return StreamingResponse(
+        _encode(lines, gzip),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+
+async def _bill_pdf_sources(user_id: int, bill_ids: List[int]):
+    """
+    Yield (file name, snapshot or cached PDF) per bill, loading bills in small
+    batches with their items. Own session for the same reason as _export_rows.
+    """
+    async with AsyncSessionLocal() as db:
+        for start in range(0, len(bill_ids), PDF_LOAD_BATCH_SIZE):
+            chunk = bill_ids[start:start + PDF_LOAD_BATCH_SIZE]
+            result = await db.execute(
+                select(Bill).options(selectinload(Bill.items))
+                .where(Bill.user_id == user_id, Bill.id.in_(chunk))
+            )
+            bills = {bill.id: bill for bill in result.scalars()}
+            for bill_id in chunk:
+                bill = bills.get(bill_id)
+                if bill is None:
+                    continue
+                cached = await get_cached_pdf_async(bill.id, bill_version(bill))
+                yield f"bill_{bill.bill_number}.pdf", cached if cached is not None else bill_snapshot(bill)
+            # Drop loaded bills before the next batch
+            db.expunge_all()
+
+
+async def _combined_pdf(sources):
+    concat = PdfConcatenator()
+    yield concat.start()
+    async for _, pdf in render_snapshots_in_order(sources):
+        yield concat.add(pdf)
+    yield concat.finish()
+
+
+class _ZipChunks:
+    """Write-only file object for ZipFile; the stream is drained after every entry."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+async def _zip_of_pdfs(sources):
+    out = _ZipChunks()
+    # PDF page streams are already compressed, so entries are stored as-is
+    with zipfile.ZipFile(out, "w", zipfile.ZIP_STORED) as archive:
+        async for name, pdf in render_snapshots_in_order(sources):
+            archive.writestr(zipfile.ZipInfo(name, date_time=datetime.now().timetuple()[:6]), pdf)
+            yield out.drain()
+    yield out.drain()
+
+
+@router.get("/export/pdf")
+async def export_bill_pdfs(
+    format: Literal["pdf", "zip"] = "pdf",
+    bill_ids: Optional[List[int]] = Query(None),
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    customer_mobile: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Invoices for a wholesale customer in one download: either an explicit
+    bill_ids list or a date range (optionally for one customer_mobile).
+    Bills are rendered across the PDF process pool and streamed out as they
+    finish, as one multi-page PDF or a ZIP with one PDF per bill.
+    """
+    if not bill_ids and not (from_date or to_date):
+        raise HTTPException(status_code=400, detail="Pass bill_ids or a from_date/to_date range")
+
+    query = filter_bills(
+        select(Bill.id), current_user.id,
+        from_date=from_date, to_date=to_date, customer_mobile=customer_mobile
+    )
+    if bill_ids:
+        query = query.where(Bill.id.in_(bill_ids))
+    ids = list((await db.execute(query.order_by(Bill.created_at, Bill.id))).scalars())
+    if not ids:
+        raise HTTPException(status_code=404, detail="No bills found")
+
+    sources = _bill_pdf_sources(current_user.id, ids)
+    filename = f"bills_{from_date or 'all'}_{to_date or 'all'}.{format}"
+    if format == "zip":
+        return StreamingResponse(
+            _zip_of_pdfs(sources),
+            media_type="application/zip",
+            headers={"Content-Disposition": f"attachment; filename={filename}"}
+        )
+    return StreamingResponse(
+        _combined_pdf(sources),
+        media_type="application/pdf",
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
@@ -1,12 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List
-from app.database.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select
+from typing import List, Literal, Optional
+from app.database.database import get_async_db
 from app.models.bill import Bill
 from app.models.customer import Customer
+from app.models.customer_stats import CustomerShopStats
 from app.models.user import User
 from app.core.auth import get_current_user
+from app.core import config
+from app.services.customer_stats_service import customer_stats_query
 from pydantic import BaseModel
 from datetime import datetime
 
@@ -22,42 +25,43 @@ class CustomerStats(BaseModel):
 
 @router.get("/stats", response_model=List[CustomerStats])
 async def get_all_customer_stats(
-    db: Session = Depends(get_db),
+    sort_by: Literal["total_spent", "visits", "recent"] = "recent",
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Get statistics for all customers who have purchased from this shop.
+    Customers are grouped by mobile number; name and last bill come from their latest bill.
     """
-    # Group bills by customer_mobile
-    stats = db.query(
-        Bill.customer_name,
-        Bill.customer_mobile,
-        func.count(Bill.id).label("total_purchases"),
-        func.sum(Bill.total_amount).label("total_spent"),
-        func.max(Bill.created_at).label("last_purchase_date")
-    ).filter(
-        Bill.user_id == current_user.id,
-        Bill.customer_mobile != None
-    ).group_by(
-        Bill.customer_name,
-        Bill.customer_mobile
-    ).all()
+    if config.USE_CUSTOMER_STATS_TABLE:
+        source = select(CustomerShopStats).where(
+            CustomerShopStats.user_id == current_user.id
+        ).subquery()
+    else:
+        # Single statement: totals and the last bill via ROW_NUMBER() OVER
+        source = customer_stats_query(current_user.id).subquery()
 
-    result = []
-    for s in stats:
-        # Get the last bill number for this customer
-        last_bill = db.query(Bill.bill_number).filter(
-            Bill.user_id == current_user.id,
-            Bill.customer_mobile == s.customer_mobile
-        ).order_by(Bill.created_at.desc()).first()
+    sort_columns = {
+        "total_spent": source.c.total_spent,
+        "visits": source.c.total_purchases,
+        "recent": source.c.last_purchase_date,
+    }
+    query = select(source).order_by(
+        sort_columns[sort_by].desc(), source.c.customer_mobile
+    ).offset(offset)
+    if limit:
+        query = query.limit(limit)
 
-        result.append(CustomerStats(
+    return [
+        CustomerStats(
             name=s.customer_name or "Unknown",
             mobile_number=s.customer_mobile,
             total_purchases=s.total_purchases,
             total_spent=s.total_spent or 0.0,
             last_purchase_date=s.last_purchase_date,
-            last_bill_number=last_bill.bill_number if last_bill else "N/A"
-        ))
-    
-    return result
+            last_bill_number=s.last_bill_number or "N/A"
+        )
+        for s in await db.execute(query)
+    ]
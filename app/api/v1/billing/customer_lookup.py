@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.database.database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database.database import get_async_db
 from app.models.customer import Customer
 from app.schema.customer import CustomerResponse
 from typing import Optional
@@ -8,7 +9,7 @@ from typing import Optional
 router = APIRouter()
 
 @router.get("/customers/lookup/{mobile_number}", response_model=CustomerResponse)
-def lookup_customer(mobile_number: str, db: Session = Depends(get_db)):
+async def lookup_customer(mobile_number: str, db: AsyncSession = Depends(get_async_db)):
     """
     Lookup a customer by their mobile number.
     Returns customer details if found, otherwise 404.
@@ -20,7 +21,9 @@ def lookup_customer(mobile_number: str, db: Session = Depends(get_db)):
             detail="Invalid mobile number format. Must be 10-15 digits."
         )
 
-    customer = db.query(Customer).filter(Customer.mobile_number == mobile_number).first()
+    customer = (await db.execute(
+        select(Customer).where(Customer.mobile_number == mobile_number)
+    )).scalars().first()
     
     if not customer:
         raise HTTPException(
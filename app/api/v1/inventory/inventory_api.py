@@ -1,107 +1,132 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from datetime import datetime
-from typing import List
-from app.database.database import get_db
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import date, datetime, timedelta
+from typing import List, Literal, Optional
+from app.database.database import get_async_db
 from app.models.inventory import Inventory
-from app.models.vegetable import Vegetable
 from app.models.user import User
 from app.schema.inventory import (
     InventorySetup, 
     InventoryResponse, 
     InventoryUpdate, 
-    InventoryBulkSync
+    InventoryBulkSync,
+    OversellPolicyUpdate,
+    PriceHistoryPoints,
+    PriceHistorySeries,
+    StockMovementCreate,
+    StockReportItem
 )
 from app.core.auth import get_current_user
+from app.core.user_cache import invalidate_user
+from app.services.catalog_cache import bump_catalog_version, get_catalog
+from app.services.inventory_service import (
+    list_inventory,
+    upsert_inventory,
+    upsert_vegetables_by_name
+)
+from app.services.price_history_service import day_points, price_series, record_prices
+from app.services.price_schedule_service import (
+    create_rate_card,
+    parse_expiry,
+    parse_start,
+    run_due,
+    to_utc_naive,
+    wake_scheduler
+)
+from app.services.price_table import bump_price_version
+from app.services.sync_service import mark_deleted, stamp_inventory, stamp_vegetables
+from app.services.stock_ledger_service import (
+    ADJUSTMENT,
+    RECEIPT,
+    SALE,
+    WASTAGE,
+    record_movements,
+    set_stock_levels,
+    stock_report
+)
 
 router = APIRouter(prefix="/inventory")
 
+PRICE_HISTORY_DEFAULT_DAYS = 90
+PRICE_HISTORY_MAX_DAYS = 3660
+
 @router.post("/setup")
 async def setup_inventory(
     setup_in: InventorySetup,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    for item in setup_in.items:
-        # Check if vegetable exists
-        veg = db.query(Vegetable).filter(Vegetable.id == item.vegetable_id).first()
-        if not veg:
-            continue
-        
-        # Check if already in inventory
-        existing = db.query(Inventory).filter(
-            Inventory.user_id == current_user.id,
-            Inventory.vegetable_id == item.vegetable_id
-        ).first()
-        
-        if existing:
-            existing.price_per_kg = item.price_per_kg
-            existing.stock_kg = item.stock_kg
-        else:
-            new_inv = Inventory(
-                user_id=current_user.id,
-                vegetable_id=item.vegetable_id,
-                price_per_kg=item.price_per_kg,
-                stock_kg=item.stock_kg
-            )
-            db.add(new_inv)
+    # Skip unknown vegetables, then apply the whole payload as one upsert.
+    # New rows start empty; the counted stock goes to the ledger as adjustments.
+    catalog = await db.run_sync(get_catalog)
+    items = [item for item in setup_in.items if item.vegetable_id in catalog.by_id]
+    await db.run_sync(upsert_inventory, current_user.id, [
+        {
+            "vegetable_id": item.vegetable_id,
+            "price_per_kg": item.price_per_kg,
+            "stock_kg": 0.0,
+            "price_schedule_id": None
+        }
+        for item in items
+    ], update_columns=["price_per_kg", "price_schedule_id"])
+    await db.run_sync(
+        set_stock_levels, current_user.id, {item.vegetable_id: item.stock_kg for item in items}, "setup"
+    )
+    await db.run_sync(record_prices, current_user.id, [item.vegetable_id for item in items])
+    await db.run_sync(bump_price_version, current_user.id)
+    await db.run_sync(stamp_inventory, current_user.id, [item.vegetable_id for item in items])
     
-    db.commit()
+    await db.commit()
     return {"message": "Inventory setup successfully"}
 
 @router.post("/bulk-sync")
 async def bulk_sync_inventory(
     sync_in: InventoryBulkSync,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Endpoint to send details from the UI image: 
     Inserts/Updates vegetables and links them to user inventory.
     """
-    for item in sync_in.items:
-        # 1. Ensure vegetable exists in master list
-        veg = db.query(Vegetable).filter(Vegetable.name == item.name).first()
-        if not veg:
-            veg = Vegetable(
-                name=item.name,
-                tamil_name=item.tamil_name,
-                tanglish_name=item.tanglish_name,
-                category=item.category,
-                image_url=item.image,
-                price_per_kg=item.price
-            )
-            db.add(veg)
-            db.flush()
-        else:
-            # Update master details if they changed
-            veg.tamil_name = item.tamil_name
-            veg.tanglish_name = item.tanglish_name
-            veg.category = item.category
-            veg.image_url = item.image
-
-        # 2. Add/Update in User Inventory
-        inv = db.query(Inventory).filter(
-            Inventory.user_id == current_user.id,
-            Inventory.vegetable_id == veg.id
-        ).first()
-
-        if inv:
-            inv.price_per_kg = item.price
-            inv.retail_price = item.price
-            inv.stock_kg = item.stock
-            inv.price_updated_at = datetime.utcnow()
-        else:
-            new_inv = Inventory(
-                user_id=current_user.id,
-                vegetable_id=veg.id,
-                price_per_kg=item.price,
-                retail_price=item.price,
-                stock_kg=item.stock
-            )
-            db.add(new_inv)
-
-    db.commit()
+    # 1. Ensure vegetables exist in master list (one upsert, returns ids)
+    veg_ids = await db.run_sync(upsert_vegetables_by_name, [
+        {
+            "name": item.name,
+            "tamil_name": item.tamil_name,
+            "tanglish_name": item.tanglish_name,
+            "category": item.category,
+            "image_url": item.image,
+            "price_per_kg": item.price
+        }
+        for item in sync_in.items
+    ], update_columns=["tamil_name", "tanglish_name", "category", "image_url"])
+
+    # 2. Add/Update in User Inventory (one upsert)
+    now = datetime.utcnow()
+    await db.run_sync(upsert_inventory, current_user.id, [
+        {
+            "vegetable_id": veg_ids[item.name],
+            "price_per_kg": item.price,
+            "retail_price": item.price,
+            "stock_kg": 0.0,
+            "price_updated_at": now,
+            "price_schedule_id": None
+        }
+        for item in sync_in.items
+    ], update_columns=["price_per_kg", "retail_price", "price_updated_at", "price_schedule_id"])
+    await db.run_sync(
+        set_stock_levels, current_user.id, {veg_ids[item.name]: item.stock for item in sync_in.items}, "bulk-sync"
+    )
+    await db.run_sync(record_prices, current_user.id, veg_ids.values(), now)
+
+    # Master vegetable details changed; invalidate every worker's catalog cache
+    await db.run_sync(bump_catalog_version)
+    await db.run_sync(bump_price_version, current_user.id)
+    await db.run_sync(stamp_vegetables, veg_ids.values())
+    await db.run_sync(stamp_inventory, current_user.id, veg_ids.values())
+    await db.commit()
     return {"message": "Inventory synced successfully from UI details"}
 
 from app.schema.inventory import (
@@ -117,74 +142,80 @@ from app.schema.inventory import (
 @router.post("/daily-pricing")
 async def publish_daily_pricing(
     pricing_in: DailyPriceUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Handles 'Publish Rates' from the Daily Pricing page.
-    Updates wholesale/retail prices and sets the activation schedule.
+    Stores the rate card with its activation schedule; the price scheduler
+    applies it at startTime (local shop time) and restores the previous
+    prices after expiryDate. A card that is already due applies right away.
     """
-    for item in pricing_in.items:
-        inv = db.query(Inventory).filter(
-            Inventory.user_id == current_user.id,
-            Inventory.vegetable_id == item.vegetable_id
-        ).first()
-        
-        if inv:
-            inv.wholesale_price = item.wholesale
-            inv.retail_price = item.retail
-            inv.price_per_kg = item.retail # Default active price is retail
-            inv.start_time = pricing_in.start_time
-            inv.expiry_date = pricing_in.expiry_date
-            inv.price_updated_at = datetime.utcnow()
+    now = datetime.utcnow()
+    starts_at = to_utc_naive(pricing_in.starts_at) if pricing_in.starts_at else parse_start(pricing_in.start_time, now)
+    expires_at = to_utc_naive(pricing_in.expires_at) if pricing_in.expires_at else parse_expiry(pricing_in.expiry_date)
+    if expires_at is not None and expires_at <= max(starts_at, now):
+        raise HTTPException(status_code=400, detail="Rate card expires before it starts")
+
+    # One INSERT ... SELECT for the whole rate card; unknown items are ignored
+    await db.run_sync(
+        create_rate_card, current_user.id,
+        [(item.vegetable_id, item.wholesale, item.retail) for item in pricing_in.items],
+        starts_at, expires_at, pricing_in.start_time, pricing_in.expiry_date
+    )
+    active = starts_at <= now
+    if active:
+        await db.run_sync(run_due, now, current_user.id)
+    else:
+        await db.run_sync(bump_price_version, current_user.id)
             
-    db.commit()
-    return {"message": "Prices published successfully with activation schedule"}
+    await db.commit()
+    if not active:
+        wake_scheduler()
+    return {
+        "message": "Prices published successfully with activation schedule",
+        "startsAt": starts_at.isoformat(),
+        "expiresAt": expires_at.isoformat() if expires_at else None,
+        "active": active
+    }
 
 @router.get("/", response_model=List[InventoryResponse])
 async def get_inventory(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Retrieves the inventory to be displayed on the Shop and Pricing pages.
     """
-    inventory_items = db.query(Inventory).filter(Inventory.user_id == current_user.id).all()
-    
-    result = []
-    for item in inventory_items:
-        veg = item.vegetable
-        if not veg: continue
-        
-        result.append({
-            "id": veg.id,
-            "vegetableId": veg.id,
-            "name": veg.name,
-            "tamilName": veg.tamil_name,
-            "tanglishName": veg.tanglish_name,
-            "price": item.price_per_kg,
-            "stock": item.stock_kg,
-            "wholesalePrice": item.wholesale_price,
-            "retailPrice": item.retail_price,
-            "startTime": item.start_time,
-            "expiryDate": item.expiry_date,
-            "priceUpdatedAt": item.price_updated_at.isoformat() if item.price_updated_at else None,
-            "category": veg.category,
-            "image": veg.image_url
-        })
-    return result
+    # One price table check and one joined projection, whatever the row count
+    return await db.run_sync(list_inventory, current_user.id)
+
+@router.put("/oversell-policy")
+async def set_oversell_policy(
+    policy_in: OversellPolicyUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Chooses what bill create does when a line exceeds stock: allow (sell past
+    zero), warn (sell and list the lines in stockWarnings) or reject (409).
+    """
+    await db.execute(update(User).where(User.id == current_user.id).values(oversell_policy=policy_in.policy))
+    await db.commit()
+    invalidate_user(current_user.username)
+    return {"message": "Oversell policy updated", "policy": policy_in.policy}
 
 @router.put("/{veg_id}")
 async def update_inventory_item(
     veg_id: int,
     update_in: InventoryUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    item = db.query(Inventory).filter(
+    item = (await db.execute(select(Inventory).where(
         Inventory.user_id == current_user.id,
         Inventory.vegetable_id == veg_id
-    ).first()
+    ))).scalars().first()
     
     if not item:
         raise HTTPException(status_code=404, detail="Item not found in inventory")
@@ -199,38 +230,148 @@ async def update_inventory_item(
         item.wholesale_price = update_in.wholesale_price
         item.price_updated_at = datetime.utcnow()
     if update_in.stock_kg is not None:
-        item.stock_kg = update_in.stock_kg
+        await db.run_sync(set_stock_levels, current_user.id, {veg_id: update_in.stock_kg}, "manual edit")
+    changed = update_in.stock_kg is not None
     if update_in.start_time is not None:
         item.start_time = update_in.start_time
     if update_in.expiry_date is not None:
         item.expiry_date = update_in.expiry_date
+    repriced = any(v is not None for v in (update_in.retail_price, update_in.price_per_kg, update_in.wholesale_price))
+    if repriced:
+        # A manual edit replaces the active rate card; its expiry must not undo the edit
+        item.price_schedule_id = None
+    if item in db.dirty:
+        changed = True
+        await db.flush()
+        await db.run_sync(bump_price_version, current_user.id)
+    if repriced:
+        await db.run_sync(record_prices, current_user.id, [veg_id], item.price_updated_at)
+    if changed:
+        await db.run_sync(stamp_inventory, current_user.id, [veg_id])
         
-    db.commit()
+    await db.commit()
     return {"message": "Inventory updated successfully"}
 
+@router.post("/{veg_id}/movements")
+async def add_stock_movement(
+    veg_id: int,
+    movement_in: StockMovementCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Records a goods receipt, wastage or manual correction for one vegetable.
+    Receipts and wastage take a positive quantity; adjustments are signed.
+    """
+    if movement_in.kind != ADJUSTMENT and movement_in.quantity <= 0:
+        raise HTTPException(status_code=400, detail="Quantity must be positive")
+    exists = (await db.execute(select(Inventory.id).where(
+        Inventory.user_id == current_user.id,
+        Inventory.vegetable_id == veg_id
+    ))).first()
+    if not exists:
+        raise HTTPException(status_code=404, detail="Item not found in inventory")
+
+    qty = -movement_in.quantity if movement_in.kind == WASTAGE else movement_in.quantity
+    await db.run_sync(record_movements, current_user.id, [
+        {"vegetable_id": veg_id, "kind": movement_in.kind, "qty_kg": qty, "note": movement_in.note}
+    ])
+    await db.run_sync(stamp_inventory, current_user.id, [veg_id])
+    await db.commit()
+    return {"message": "Stock movement recorded"}
+
+@router.get("/stock-report", response_model=List[StockReportItem])
+async def get_stock_report(
+    from_date: date,
+    to_date: Optional[date] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Kilograms sold, received, adjusted and wasted per vegetable between two
+    dates (inclusive), from the stock movement ledger.
+    """
+    to_date = to_date or from_date
+    if to_date < from_date:
+        raise HTTPException(status_code=400, detail="to_date is before from_date")
+    report = await db.run_sync(
+        stock_report, current_user.id,
+        datetime.combine(from_date, datetime.min.time()),
+        datetime.combine(to_date + timedelta(days=1), datetime.min.time())
+    )
+    catalog = await db.run_sync(get_catalog)
+    return [
+        {
+            "vegetableId": veg_id,
+            "name": catalog.by_id[veg_id].name if veg_id in catalog.by_id else "",
+            "sold": abs(kinds.get(SALE, 0.0)),
+            "received": kinds.get(RECEIPT, 0.0),
+            "adjusted": kinds.get(ADJUSTMENT, 0.0),
+            "wasted": abs(kinds.get(WASTAGE, 0.0)),
+            "net": sum(kinds.values())
+        }
+        for veg_id, kinds in sorted(report.items())
+    ]
+
+@router.get("/{veg_id}/price-history", response_model=PriceHistorySeries)
+async def get_price_history(
+    veg_id: int,
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    field: Literal["wholesale", "retail"] = "retail",
+    bucket: Literal["day", "week", "month"] = "day",
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Open/close/min/max/avg of one price per day, week or month between two
+    dates (inclusive, default the last 90 days), as parallel arrays for charts.
+    """
+    to_date = to_date or datetime.utcnow().date()
+    from_date = from_date or to_date - timedelta(days=PRICE_HISTORY_DEFAULT_DAYS - 1)
+    if to_date < from_date:
+        raise HTTPException(status_code=400, detail="to_date is before from_date")
+    if (to_date - from_date).days >= PRICE_HISTORY_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"Range is limited to {PRICE_HISTORY_MAX_DAYS} days")
+    series = await db.run_sync(price_series, current_user.id, veg_id, from_date, to_date, field, bucket)
+    return {"vegetableId": veg_id, "field": field, "bucket": bucket, **series}
+
+@router.get("/{veg_id}/price-history/points", response_model=PriceHistoryPoints)
+async def get_price_history_points(
+    veg_id: int,
+    day: date,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Every wholesale/retail price change of one vegetable on one day."""
+    points = await db.run_sync(day_points, current_user.id, veg_id, day)
+    return {"vegetableId": veg_id, "day": day.isoformat(), **points}
+
 @router.delete("/{veg_id}")
 async def delete_inventory_item(
     veg_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    item = db.query(Inventory).filter(
+    item = (await db.execute(select(Inventory).where(
         Inventory.user_id == current_user.id,
         Inventory.vegetable_id == veg_id
-    ).first()
+    ))).scalars().first()
     
     if not item:
         raise HTTPException(status_code=404, detail="Item not found in inventory")
     
-    db.delete(item)
-    db.commit()
+    await db.delete(item)
+    await db.run_sync(bump_price_version, current_user.id)
+    await db.run_sync(mark_deleted, current_user.id, veg_id)
+    await db.commit()
     return {"message": "Item deleted from inventory successfully"}
 
 @router.post("/update/{veg_id}")
 async def update_inventory(
     veg_id: int,
     update_in: InventoryUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     return await update_inventory_item(veg_id, update_in, db, current_user)
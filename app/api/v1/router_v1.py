@@ -2,6 +2,7 @@ from fastapi import APIRouter
 from app.api.v1.vegetables.vegetable_create import router as veg_router
 from app.api.v1.vegetables.price_update import router as price_router
 from app.api.v1.billing.bill_create import router as bill_router
+from app.api.v1.billing.bill_export import router as bill_export_router
 from app.api.v1.auth.login import router as login_router
 from app.api.v1.auth.signup import router as signup_router
 from app.api.v1.auth.forgot_password import router as forgot_password_router
@@ -9,6 +10,7 @@ from app.api.v1.admin.admin import router as admin_router
 from app.api.v1.inventory.inventory_api import router as inventory_router
 from app.api.v1.billing.customer_lookup import router as customer_router
 from app.api.v1.billing.customer_api import router as customer_stats_router
+from app.api.v1.sync.sync_api import router as sync_router
 
 router = APIRouter(prefix="/api/v1")
 
@@ -19,6 +21,8 @@ router.include_router(admin_router, prefix="/admin", tags=["Admin"])
 router.include_router(inventory_router, tags=["Inventory"])
 router.include_router(veg_router, tags=["Vegetables"])
 router.include_router(price_router, tags=["Vegetables"])
+router.include_router(bill_export_router, tags=["Billing"])
 router.include_router(bill_router, tags=["Billing"])
 router.include_router(customer_router, tags=["Billing"])
 router.include_router(customer_stats_router, tags=["Billing"])
+router.include_router(sync_router, tags=["Sync"])
@@ -0,0 +1,27 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database.database import get_async_db
+from app.models.user import User
+from app.schema.sync import SyncChanges
+from app.core.auth import get_current_user
+from app.services.sync_service import InvalidCursor, changes_since
+
+router = APIRouter(prefix="/sync")
+
+@router.get("/changes", response_model=SyncChanges)
+async def get_changes(
+    since: Optional[str] = Query(None, max_length=64),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Inventory and vegetable rows changed since the client's last sync,
+    including stock moved by sales, and the inventory items deleted since.
+    Start without `since` and pass the returned cursor next time; the work
+    and payload follow what changed, not the catalog size.
+    """
+    try:
+        return await db.run_sync(changes_since, current_user.id, since)
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid sync cursor")
@@ -1,12 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
 from typing import List
-from app.database.database import get_db
+from app.database.database import get_async_db
 from app.models.vegetable import Vegetable
 from app.models.inventory import Inventory
 from app.schema.vegetable import VegetablePriceUpdate
 from app.core.auth import get_current_user
+from app.services.catalog_cache import bump_catalog_version
+from app.services.inventory_service import PRICE_COLUMNS, update_inventory_rows, update_vegetable_prices
+from app.services.price_history_service import record_prices
+from app.services.price_table import bump_price_version
+from app.services.sync_service import stamp_inventory, stamp_vegetables
 from app.models.user import User, UserRole
 
 router = APIRouter(prefix="/vegetables")
@@ -14,29 +19,36 @@ router = APIRouter(prefix="/vegetables")
 @router.put("/bulk-price-update")
 async def bulk_update_prices(
     prices: List[VegetablePriceUpdate],
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     # Only Admin or authorized shop users can update prices
     # For now allowing all authenticated users to simulate the UI
-    for price_data in prices:
-        # Update master list
-        veg = db.query(Vegetable).filter(Vegetable.id == price_data.id).first()
-        if veg:
-            veg.wholesale_price = price_data.wholesale_price
-            veg.retail_price = price_data.retail_price
-            veg.price_per_kg = price_data.retail_price 
-        
-        # Update user inventory
-        inv = db.query(Inventory).filter(
-            Inventory.user_id == current_user.id,
-            Inventory.vegetable_id == price_data.id
-        ).first()
-        if inv:
-            inv.wholesale_price = price_data.wholesale_price
-            inv.retail_price = price_data.retail_price
-            inv.price_per_kg = price_data.retail_price
-            inv.price_updated_at = datetime.utcnow()
+    # Update master list and user inventory with one statement each
+    await db.run_sync(update_vegetable_prices, [
+        {
+            "id": price_data.id,
+            "wholesale_price": price_data.wholesale_price,
+            "retail_price": price_data.retail_price
+        }
+        for price_data in prices
+    ])
+    now = datetime.utcnow()
+    await db.run_sync(update_inventory_rows, current_user.id, [
+        {
+            "vegetable_id": price_data.id,
+            "wholesale_price": price_data.wholesale_price,
+            "retail_price": price_data.retail_price,
+            "price_per_kg": price_data.retail_price
+        }
+        for price_data in prices
+    ], types=PRICE_COLUMNS, extra={"price_updated_at": now, "price_schedule_id": None})
+    await db.run_sync(record_prices, current_user.id, [price_data.id for price_data in prices], now)
     
-    db.commit()
+    # Master prices changed; invalidate every worker's catalog cache
+    await db.run_sync(bump_catalog_version)
+    await db.run_sync(bump_price_version, current_user.id)
+    await db.run_sync(stamp_vegetables, [price_data.id for price_data in prices])
+    await db.run_sync(stamp_inventory, current_user.id, [price_data.id for price_data in prices])
+    await db.commit()
     return {"message": "Prices updated successfully"}
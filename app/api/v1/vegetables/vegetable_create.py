@@ -1,56 +1,99 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from fastapi import APIRouter, Depends, Query, Request, Response
+from sqlalchemy import desc, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
-from app.database.database import get_db
+from app.database.database import get_async_db
 from app.models.vegetable import Vegetable
 from app.models.usage import VegetableUsage
 from app.models.user import User
 from app.schema.vegetable import VegetableResponse, TopVegetableResponse
 from app.core.auth import get_current_user
+from app.services.catalog_cache import get_catalog
+from app.services.vegetable_search import get_search_index, shop_usage_counts
+from app.utils.http_cache import not_modified, set_etag
 
 router = APIRouter(prefix="/vegetables")
 
 @router.get("/", response_model=List[VegetableResponse])
 async def get_vegetables(
+    request: Request,
+    response: Response,
     search: str = None,
     category: str = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    query = db.query(Vegetable)
-    if search:
-        query = query.filter(Vegetable.name.ilike(f"%{search}%") | Vegetable.tamil_name.ilike(f"%{search}%"))
+    catalog = await db.run_sync(get_catalog)
+    cached = not_modified(request, catalog.etag)
+    if cached:
+        return cached
+    set_etag(response, catalog.etag)
+
     if category and category != "All Items":
-        query = query.filter(Vegetable.category == category)
-    return query.all()
+        vegetables = catalog.by_category.get(category, ())
+    else:
+        vegetables = catalog.vegetables
+    if search:
+        # Ranked English/Tamil/Tanglish match from the in-memory search index
+        allowed = {veg.id for veg in vegetables}
+        vegetables = [
+            veg for veg in get_search_index(catalog=catalog).search(search, limit=len(catalog.vegetables))
+            if veg.id in allowed
+        ]
+    return vegetables
+
+@router.get("/suggest", response_model=List[VegetableResponse])
+async def suggest_vegetables(
+    q: str,
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Type-ahead for the billing counter. Tolerates typos and Tanglish spellings
+    ("vendakai", "thakali") and ranks the shop's frequently billed items first.
+    """
+    index = await db.run_sync(get_search_index)
+    return index.search(q, limit=limit, usage=await db.run_sync(shop_usage_counts, current_user.id))
 
 @router.get("/top15", response_model=List[TopVegetableResponse])
 async def get_top15_vegetables(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    top_usages = db.query(VegetableUsage)\
-        .filter(VegetableUsage.user_id == current_user.id)\
-        .order_by(desc(VegetableUsage.usage_count))\
-        .limit(15)\
-        .all()
+    # Single joined projection instead of one Vegetable query per usage row
+    rows = await db.execute(select(
+        Vegetable.id,
+        Vegetable.name,
+        Vegetable.tamil_name,
+        Vegetable.image_url,
+        Vegetable.price_per_kg,
+        VegetableUsage.usage_count
+    ).join(Vegetable, Vegetable.id == VegetableUsage.vegetable_id)
+        .where(VegetableUsage.user_id == current_user.id)
+        .order_by(desc(VegetableUsage.usage_count))
+        .limit(15))
     
-    result = []
-    for usage in top_usages:
-        veg = db.query(Vegetable).filter(Vegetable.id == usage.vegetable_id).first()
-        if veg:
-            result.append({
-                "id": veg.id,
-                "name": veg.name,
-                "tamil_name": veg.tamil_name,
-                "image_url": veg.image_url,
-                "price_per_kg": veg.price_per_kg,
-                "usage_count": usage.usage_count
-            })
-    return result
+    return [
+        {
+            "id": row.id,
+            "name": row.name,
+            "tamil_name": row.tamil_name,
+            "image_url": row.image_url,
+            "price_per_kg": row.price_per_kg,
+            "usage_count": row.usage_count
+        }
+        for row in rows
+    ]
 
 @router.get("/categories", response_model=List[str])
-async def get_categories(db: Session = Depends(get_db)):
-    categories = db.query(Vegetable.category).distinct().all()
-    # Flatten the result and filter out None
-    return [c[0] for c in categories if c[0]]
+async def get_categories(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db)
+):
+    catalog = await db.run_sync(get_catalog)
+    cached = not_modified(request, catalog.etag)
+    if cached:
+        return cached
+    set_etag(response, catalog.etag)
+    return list(catalog.categories)
@@ -1,7 +1,7 @@
 
 import os
+import hmac
 import hashlib
-import asyncio
 from datetime import datetime, timedelta
 from typing import Optional, List
 from base64 import b64encode, b64decode
@@ -9,15 +9,21 @@ from base64 import b64encode, b64decode
 from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.backends import default_backend
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 
-from app.database.database import get_db
+from app.database.database import get_async_db
 from app.models.user import User, UserRole
 from app.core import config
+from app.core.kdf import pbkdf2_sha256, run_kdf
+from app.core.user_cache import (
+    Principal,
+    cached_principal,
+    cached_token_subject,
+    remember_principal,
+    remember_token,
+)
 
 SECRET_KEY = config.SECRET_KEY
 ALGORITHM = "HS256"
@@ -30,6 +36,11 @@ if not AES_KEY_HEX:
 else:
     AES_KEY = bytes.fromhex(AES_KEY_HEX)
 
+if config.PHONE_INDEX_KEY:
+    PHONE_INDEX_KEY = bytes.fromhex(config.PHONE_INDEX_KEY)
+else:
+    PHONE_INDEX_KEY = hmac.new(AES_KEY, b"phone-blind-index", hashlib.sha256).digest()
+
 # OAuth2
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
@@ -38,40 +49,35 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 def hash_password_sync(password: str) -> str:
     """Synchronous version of password hashing."""
     salt = os.urandom(16)
-    kdf = PBKDF2HMAC(
-        algorithm=hashes.SHA256(),
-        length=32,
-        salt=salt,
-        iterations=100000,
-        backend=default_backend()
-    )
-    hashed_password = kdf.derive(password.encode())
+    hashed_password = pbkdf2_sha256(password, salt)
     return b64encode(salt + hashed_password).decode('utf-8')
 
-async def hash_password(password: str) -> str:
-    """Asynchronous wrapper for password hashing."""
-    return await asyncio.to_thread(hash_password_sync, password)
+async def hash_password(password: str, username: Optional[str] = None, client_ip: Optional[str] = None) -> str:
+    """
+    Password hashing on the KDF pool. Raises KdfBusy when the pool, the
+    username's share or the client IP's share is full.
+    """
+    return await run_kdf(hash_password_sync, password, username=username, client_ip=client_ip)
 
 def verify_password_sync(plain_password: str, hashed_password: str) -> bool:
     """Synchronous version of password verification."""
     try:
         decoded = b64decode(hashed_password.encode('utf-8'))
         salt, stored_hash = decoded[:16], decoded[16:]
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=salt,
-            iterations=100000,
-            backend=default_backend()
-        )
-        kdf.verify(plain_password.encode(), stored_hash)
-        return True
+        return hmac.compare_digest(pbkdf2_sha256(plain_password, salt), stored_hash)
     except Exception:
         return False
 
-async def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Asynchronous wrapper for password verification."""
-    return await asyncio.to_thread(verify_password_sync, plain_password, hashed_password)
+async def verify_password(
+    plain_password: str,
+    hashed_password: str,
+    username: Optional[str] = None,
+    client_ip: Optional[str] = None
+) -> bool:
+    """Password verification on the KDF pool. Raises KdfBusy like hash_password."""
+    return await run_kdf(
+        verify_password_sync, plain_password, hashed_password, username=username, client_ip=client_ip
+    )
 
 # Aliases for compatibility with existing code
 def get_password_hash(password: str) -> str:
@@ -86,18 +92,22 @@ def verify_password_compat(plain_password: str, hashed_password: str) -> bool:
 def hash_phone_sync(phone: str) -> str:
     """One-way hash for phone number."""
     salt = os.urandom(16)
-    kdf = PBKDF2HMAC(
-        algorithm=hashes.SHA256(),
-        length=32,
-        salt=salt,
-        iterations=100000,
-        backend=default_backend()
-    )
-    hashed_phone = kdf.derive(phone.encode())
+    hashed_phone = pbkdf2_sha256(phone, salt)
     return b64encode(salt + hashed_phone).decode('utf-8')
 
 async def hash_phone(phone: str) -> str:
-    return await asyncio.to_thread(hash_phone_sync, phone)
+    return await run_kdf(hash_phone_sync, phone)
+
+def normalize_phone(phone: str) -> str:
+    """Digits only, so '98765 43210' and '98765-43210' index the same."""
+    return "".join(ch for ch in str(phone) if ch.isdigit())
+
+def phone_blind_index(phone: str) -> str:
+    """
+    Keyed HMAC of the normalised number. Stored next to the AES-GCM ciphertext
+    so users can be found by phone with an equality lookup on an index.
+    """
+    return hmac.new(PHONE_INDEX_KEY, normalize_phone(phone).encode(), hashlib.sha256).hexdigest()
 
 async def encrypt_phone(phone: str) -> str:
     if not isinstance(phone, str):
@@ -108,6 +118,9 @@ async def encrypt_phone(phone: str) -> str:
     return b64encode(nonce + encrypted_data).decode("utf-8")
 
 async def decrypt_phone(encrypted_phone: str) -> str:
+    return decrypt_phone_sync(encrypted_phone)
+
+def decrypt_phone_sync(encrypted_phone: str) -> str:
     try:
         aesgcm = AESGCM(AES_KEY)
         encrypted_data = b64decode(encrypted_phone)
@@ -134,33 +147,44 @@ def create_access_token(
 
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> User:
+    db: AsyncSession = Depends(get_async_db)
+) -> Principal:
+    """
+    Resolve the bearer token to a cached Principal (id, username, role,
+    shop_name, oversell_policy). The JWT is verified once per token and the
+    users row is read once per AUTH_USER_CACHE_TTL; see app/core/user_cache.py.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-        if not username:
+    username = cached_token_subject(token)
+    if username is None:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            username = payload.get("sub")
+            if not username:
+                raise credentials_exception
+        except JWTError:
             raise credentials_exception
-    except JWTError:
-        raise credentials_exception
+        remember_token(token, username, payload.get("exp"))
 
-    user = db.query(User).filter(User.username == username).first()
-    if user is None:
-        raise credentials_exception
+    principal = cached_principal(username)
+    if principal is None:
+        user = (await db.execute(select(User).where(User.username == username))).scalars().first()
+        if user is None:
+            raise credentials_exception
+        principal = remember_principal(user)
 
-    return user
+    return principal
 
 
 def check_role(roles: List[UserRole]):
     def role_checker(
-        current_user: User = Depends(get_current_user)
-    ) -> User:
+        current_user: Principal = Depends(get_current_user)
+    ) -> Principal:
         if current_user.role not in roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
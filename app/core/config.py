@@ -15,5 +15,60 @@ DATABASE_URL = os.getenv(
     f"postgresql+asyncpg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 )
 
+# Connection pool of the async (asyncpg) engine used by the API routes
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "30"))
+
 SECRET_KEY = os.getenv("SECRET_KEY")
 AES_KEY = os.getenv("AES_KEY")
+# HMAC key (hex) for the searchable phone index. Derived from AES_KEY when unset;
+# changing either means re-running backfill_phone_index.py --rebuild.
+PHONE_INDEX_KEY = os.getenv("PHONE_INDEX_KEY")
+
+# Per-worker caches used by get_current_user. A role or shop name change made
+# through another worker is picked up after at most AUTH_USER_CACHE_TTL seconds.
+AUTH_USER_CACHE_TTL = int(os.getenv("AUTH_USER_CACHE_TTL", "60"))
+AUTH_USER_CACHE_SIZE = int(os.getenv("AUTH_USER_CACHE_SIZE", "10000"))
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))
+
+# Password hashing (PBKDF2) runs on its own thread pool, one hash per thread
+# at a time. Jobs beyond the queue size get 503; more than the per-username or
+# per-IP share in flight gets 429, both with Retry-After.
+KDF_WORKERS = int(os.getenv("KDF_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+KDF_QUEUE_SIZE = int(os.getenv("KDF_QUEUE_SIZE", str(KDF_WORKERS * 16)))
+KDF_MAX_PER_USER = int(os.getenv("KDF_MAX_PER_USER", "2"))
+KDF_MAX_PER_IP = int(os.getenv("KDF_MAX_PER_IP", "8"))
+
+# Serve /customers/stats from the customer_shop_stats table instead of
+# aggregating bills on every request. Run rebuild_customer_stats.py first.
+USE_CUSTOMER_STATS_TABLE = os.getenv("USE_CUSTOMER_STATS_TABLE", "false").lower() == "true"
+
+# Requests that run more SQL statements than this are logged as a warning and
+# counted in http_sql_statement_alerts_total (usually an N+1 regression).
+SQL_STATEMENT_ALERT = int(os.getenv("SQL_STATEMENT_ALERT", "25"))
+
+# Rendered bill PDFs kept in memory per worker (LRU, bytes). Set PDF_CACHE_DIR
+# to also keep them on disk so restarts and other workers can reuse them.
+PDF_CACHE_MAX_BYTES = int(os.getenv("PDF_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR") or None
+
+# Bill PDFs are rendered in a separate process pool. Jobs beyond the queue size
+# get 503, and a single shop beyond its share gets 429, both with Retry-After.
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", "2"))
+PDF_QUEUE_SIZE = int(os.getenv("PDF_QUEUE_SIZE", str(PDF_WORKERS * 8)))
+PDF_MAX_JOBS_PER_SHOP = int(os.getenv("PDF_MAX_JOBS_PER_SHOP", str(PDF_WORKERS * 4)))
+# Bills rendered ahead of the stream in a batch PDF/ZIP export
+PDF_BATCH_WINDOW = int(os.getenv("PDF_BATCH_WINDOW", str(PDF_WORKERS * 2)))
+
+# Stock changes are appended to stock_movements; each worker folds them into
+# inventory.stock_kg every STOCK_COMPACT_INTERVAL seconds (0 turns it off,
+# e.g. when compact_stock_ledger.py runs from cron instead).
+STOCK_COMPACT_INTERVAL = float(os.getenv("STOCK_COMPACT_INTERVAL", "30"))
+
+# Daily rate cards are published with a local start time ("06:00 AM") and
+# expiry date ("27-Oct-2023") in the shop's timezone. Each worker's price
+# scheduler wakes at the next activation or expiry, and at least every
+# PRICE_SCHEDULER_INTERVAL seconds (0 disables it, e.g. when
+# run_price_schedules.py runs from cron instead).
+SHOP_TIMEZONE = os.getenv("SHOP_TIMEZONE", "Asia/Kolkata")
+PRICE_SCHEDULER_INTERVAL = float(os.getenv("PRICE_SCHEDULER_INTERVAL", "60"))
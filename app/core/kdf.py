@@ -0,0 +1,154 @@
+import asyncio
+import hashlib
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.core import config
+
+# Password/phone key derivation runs on its own small thread pool instead of
+# asyncio's default executor, so a burst of logins (or a brute-force run)
+# cannot starve other offloaded work. hashlib.pbkdf2_hmac releases the GIL
+# while it iterates, so each worker thread keeps one core busy.
+#
+# Queued + running jobs are capped globally, per username and per client IP.
+# Callers over a cap get KdfBusy with a Retry-After estimate.
+
+KDF_ITERATIONS = 100000
+KDF_LENGTH = 32
+
+
+def pbkdf2_sha256(secret: str, salt: bytes) -> bytes:
+    """Same output as cryptography's PBKDF2HMAC(SHA256, 32, salt, 100000)."""
+    return hashlib.pbkdf2_hmac("sha256", secret.encode(), salt, KDF_ITERATIONS, KDF_LENGTH)
+
+
+class KdfBusy(Exception):
+    def __init__(self, status_code: int, retry_after: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.detail = detail
+
+
+_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+_pending = 0
+_pending_by_key: Dict[str, int] = {}
+_timings = deque(maxlen=1000)  # (queue_ms, hash_ms) of recent jobs
+_stats: Dict[str, int] = {"submitted": 0, "completed": 0, "rejected_busy": 0, "rejected_user": 0, "rejected_ip": 0}
+
+
+def start() -> ThreadPoolExecutor:
+    """Return the pool, creating it on first use."""
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=config.KDF_WORKERS, thread_name_prefix="kdf")
+    return _executor
+
+
+def shutdown():
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _retry_after() -> int:
+    """Seconds until the current queue has drained. Caller holds _lock."""
+    recent = [hash_ms for _, hash_ms in _timings]
+    average_ms = sum(recent) / len(recent) if recent else 100.0
+    return max(1, math.ceil(_pending * average_ms / 1000 / config.KDF_WORKERS))
+
+
+def _caller_keys(username: Optional[str], client_ip: Optional[str]) -> List[Tuple[str, int, str]]:
+    keys = []
+    if username:
+        keys.append((f"user:{username.lower()}", config.KDF_MAX_PER_USER, "rejected_user"))
+    if client_ip:
+        keys.append((f"ip:{client_ip}", config.KDF_MAX_PER_IP, "rejected_ip"))
+    return keys
+
+
+def _acquire(keys: List[Tuple[str, int, str]]):
+    global _pending
+    with _lock:
+        if _pending >= config.KDF_QUEUE_SIZE:
+            _stats["rejected_busy"] += 1
+            raise KdfBusy(503, _retry_after(), "Too many sign-ins right now, please retry")
+        for key, limit, counter in keys:
+            if _pending_by_key.get(key, 0) >= limit:
+                _stats[counter] += 1
+                raise KdfBusy(429, _retry_after(), "Too many sign-in attempts, please retry")
+        _pending += 1
+        for key, _, _ in keys:
+            _pending_by_key[key] = _pending_by_key.get(key, 0) + 1
+        _stats["submitted"] += 1
+
+
+def _release(keys: List[Tuple[str, int, str]]):
+    global _pending
+    with _lock:
+        _pending -= 1
+        for key, _, _ in keys:
+            remaining = _pending_by_key.get(key, 1) - 1
+            if remaining:
+                _pending_by_key[key] = remaining
+            else:
+                _pending_by_key.pop(key, None)
+
+
+def _timed(fn: Callable, args: tuple, submitted: float):
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, (started - submitted) * 1000, (time.perf_counter() - started) * 1000
+
+
+async def run_kdf(fn: Callable, *args, username: Optional[str] = None, client_ip: Optional[str] = None):
+    """
+    Run a KDF-bound function on the KDF pool.
+    Raises KdfBusy when the queue, the username's share or the IP's share is full.
+    """
+    keys = _caller_keys(username, client_ip)
+    _acquire(keys)
+    try:
+        future = start().submit(_timed, fn, args, time.perf_counter())
+    except BaseException:
+        _release(keys)
+        raise
+    # Release when the job ends, not when the caller stops waiting: a
+    # disconnected client's hash keeps its thread busy until it finishes
+    future.add_done_callback(lambda _: _release(keys))
+    result, queue_ms, hash_ms = await asyncio.wrap_future(future)
+
+    with _lock:
+        _stats["completed"] += 1
+        _timings.append((queue_ms, hash_ms))
+    return result
+
+
+def _percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def kdf_stats() -> Dict[str, float]:
+    with _lock:
+        queue_ms = [queue for queue, _ in _timings]
+        hash_ms = [hashed for _, hashed in _timings]
+        return {
+            **_stats,
+            "workers": config.KDF_WORKERS,
+            "pending": _pending,
+            "queue_ms_p50": _percentile(queue_ms, 50),
+            "queue_ms_p95": _percentile(queue_ms, 95),
+            "hash_ms_p50": _percentile(hash_ms, 50),
+            "hash_ms_p95": _percentile(hash_ms, 95),
+        }
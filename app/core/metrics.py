@@ -0,0 +1,214 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core import config
+
+# Per-request timing and SQL accounting.
+#
+# RequestTimingMiddleware opens a RequestStats for every HTTP request in a
+# context variable; cursor hooks on the sync and async engines add each
+# statement's count and time to it. The middleware then
+#   * adds a Server-Timing header (app, db) to the response
+#   * records the request in per-route histograms, served by /metrics in
+#     the Prometheus text format
+#   * logs requests that ran more than SQL_STATEMENT_ALERT statements, which
+#     is how an N+1 shows up
+# Everything is per worker process; Prometheus sums across workers.
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+
+
+class RequestStats:
+    __slots__ = ("sql_count", "sql_seconds")
+
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_start"].pop()
+    stats = _current.get()
+    if stats is not None:
+        stats.sql_count += 1
+        stats.sql_seconds += time.perf_counter() - started
+
+
+def instrument_engine(engine: Engine):
+    """Count statements and DB time of `engine` against the current request."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.total = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+
+
+_lock = threading.Lock()
+# (method, route) -> histogram
+_durations: Dict[Tuple[str, str], Histogram] = {}
+_sql_durations: Dict[Tuple[str, str], Histogram] = {}
+_sql_statements: Dict[Tuple[str, str], Histogram] = {}
+# (method, route, status) -> count
+_responses: Dict[Tuple[str, str, int], int] = {}
+_alerts: Dict[Tuple[str, str], int] = {}
+
+
+def _observe(series: Dict, key, buckets, value: float):
+    histogram = series.get(key)
+    if histogram is None:
+        histogram = series[key] = Histogram(buckets)
+    histogram.observe(value)
+
+
+def record_request(method: str, route: str, status: int, seconds: float, stats: RequestStats):
+    key = (method, route)
+    with _lock:
+        _observe(_durations, key, DURATION_BUCKETS, seconds)
+        _observe(_sql_durations, key, DURATION_BUCKETS, stats.sql_seconds)
+        _observe(_sql_statements, key, STATEMENT_BUCKETS, stats.sql_count)
+        _responses[(method, route, status)] = _responses.get((method, route, status), 0) + 1
+        if stats.sql_count > config.SQL_STATEMENT_ALERT:
+            _alerts[key] = _alerts.get(key, 0) + 1
+    if stats.sql_count > config.SQL_STATEMENT_ALERT:
+        logger.warning(
+            "%s %s ran %d SQL statements (%.1f ms in DB, %.1f ms total), over SQL_STATEMENT_ALERT=%d",
+            method, route, stats.sql_count, stats.sql_seconds * 1000, seconds * 1000, config.SQL_STATEMENT_ALERT
+        )
+
+
+def server_timing(seconds: float, stats: RequestStats) -> str:
+    return (
+        f'app;dur={(seconds - stats.sql_seconds) * 1000:.1f}, '
+        f'db;dur={stats.sql_seconds * 1000:.1f};desc="{stats.sql_count} queries"'
+    )
+
+
+class RequestTimingMiddleware:
+    """Pure ASGI middleware, so the context variable is shared with the endpoint."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing(time.perf_counter() - start, stats).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            route = scope.get("route")
+            # Unmatched paths share one series so scanners cannot blow up the label set
+            record_request(
+                scope["method"], getattr(route, "path", "<unmatched>"), status,
+                time.perf_counter() - start, stats
+            )
+
+
+def _labels(**labels) -> str:
+    inner = ",".join(f'{name}="{str(value)}"' for name, value in labels.items())
+    return "{" + inner + "}"
+
+
+def _histogram_lines(name: str, help_text: str, series: Dict[Tuple[str, str], Histogram]) -> List[str]:
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for (method, route), histogram in sorted(series.items()):
+        cumulative = 0
+        for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else f"{bound:g}"
+            lines.append(f"{name}_bucket{_labels(method=method, route=route, le=le)} {cumulative}")
+        lines.append(f"{name}_sum{_labels(method=method, route=route)} {histogram.total:.6f}")
+        lines.append(f"{name}_count{_labels(method=method, route=route)} {cumulative}")
+    return lines
+
+
+# Extra gauges (e.g. cache and pool stats) registered by name -> stats function
+_collectors: Dict[str, Callable[[], Dict]] = {}
+
+
+def register_collector(name: str, collect: Callable[[], Dict]):
+    _collectors[name] = collect
+
+
+def _collector_lines() -> List[str]:
+    lines = []
+    for name, collect in sorted(_collectors.items()):
+        for key, value in sorted(_flatten(collect()).items()):
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                lines.append(f"app_{name}_{key} {value}")
+    return lines
+
+
+def _flatten(stats: Dict, prefix: str = "") -> Dict:
+    flat = {}
+    for key, value in stats.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{prefix}{key}_"))
+        else:
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def render_prometheus() -> str:
+    with _lock:
+        lines = _histogram_lines(
+            "http_request_duration_seconds", "Wall time per request.", _durations
+        )
+        lines += _histogram_lines(
+            "http_request_sql_duration_seconds", "Time spent in SQL per request.", _sql_durations
+        )
+        lines += _histogram_lines(
+            "http_request_sql_statements", "SQL statements per request.", _sql_statements
+        )
+        lines += ["# HELP http_responses_total Responses by status.", "# TYPE http_responses_total counter"]
+        for (method, route, status), count in sorted(_responses.items()):
+            lines.append(f"http_responses_total{_labels(method=method, route=route, status=status)} {count}")
+        lines += [
+            "# HELP http_sql_statement_alerts_total Requests over SQL_STATEMENT_ALERT statements.",
+            "# TYPE http_sql_statement_alerts_total counter",
+        ]
+        for (method, route), count in sorted(_alerts.items()):
+            lines.append(f"http_sql_statement_alerts_total{_labels(method=method, route=route)} {count}")
+    lines += _collector_lines()
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,116 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Hashable, Optional
+
+from app.core import config
+from app.models.user import User, UserRole
+
+# Per-worker caches in front of get_current_user.
+#
+#   * token cache:     raw bearer token -> username, kept until the token's
+#                      own exp, so the signature is checked once per token
+#   * principal cache: username -> Principal, kept for AUTH_USER_CACHE_TTL
+#                      seconds, so the users table is read once per TTL
+#
+# Both are size-bounded LRUs. Writes that change a user (password reset,
+# admin changes) call invalidate_user in this worker; other workers pick the
+# change up when their entry's TTL runs out.
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Detached stand-in for the User row; carries only what routes read."""
+    id: int
+    username: str
+    role: UserRole
+    shop_name: Optional[str]
+    oversell_policy: str = "allow"
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(
+            id=user.id, username=user.username, role=user.role, shop_name=user.shop_name,
+            oversell_policy=user.oversell_policy or "allow"
+        )
+
+
+class _ExpiringLRU:
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, expires_at: float):
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard_values(self, value):
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if entry[0] == value]:
+                del self._entries[key]
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "size": len(self._entries),
+        }
+
+
+_tokens = _ExpiringLRU(config.AUTH_TOKEN_CACHE_SIZE)
+_principals = _ExpiringLRU(config.AUTH_USER_CACHE_SIZE)
+
+
+def cached_token_subject(token: str) -> Optional[str]:
+    return _tokens.get(token)
+
+
+def remember_token(token: str, username: str, expires_at: Optional[float]):
+    if expires_at is not None:
+        _tokens.put(token, username, float(expires_at))
+
+
+def cached_principal(username: str) -> Optional[Principal]:
+    return _principals.get(username)
+
+
+def remember_principal(user: User) -> Principal:
+    principal = Principal.from_user(user)
+    _principals.put(user.username, principal, time.time() + config.AUTH_USER_CACHE_TTL)
+    return principal
+
+
+def invalidate_user(username: str):
+    """Drop the cached principal and every cached token of a user."""
+    _principals.discard(username)
+    _tokens.discard_values(username)
+
+
+def user_cache_stats() -> Dict[str, Dict[str, float]]:
+    return {"tokens": _tokens.stats(), "principals": _principals.stats()}
@@ -1,6 +1,8 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from app.core import config
+from app.core.metrics import instrument_engine
 
 DATABASE_URL = (
     f"{config.DB_DRIVER}://{config.DB_USER}:"
@@ -21,6 +23,28 @@ SessionLocal = sessionmaker(
     bind=engine
 )
 
+# asyncpg engine for the API routes. The sync engine above stays for
+# scripts, migrations and the streaming exports' own sessions.
+async_engine = create_async_engine(
+    config.DATABASE_URL,
+    pool_pre_ping=True,
+    pool_size=config.DB_POOL_SIZE,
+    max_overflow=config.DB_MAX_OVERFLOW
+)
+
+# expire_on_commit=False: attributes stay loaded after commit, since an
+# async session cannot lazy-load them while the response is serialised
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
+# Per-request SQL count and time (Server-Timing, /metrics)
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+
 Base = declarative_base()
 
 def get_db():
@@ -29,3 +53,7 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
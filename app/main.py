@@ -1,7 +1,15 @@
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from app.database.database import Base, engine
-from app.models import bill, customer, inventory, user, vegetable # Import models for registration
+from app.models import bill, bill_sequence, customer, catalog_version, customer_stats, inventory, price_history, price_schedule, sales_rollup, stock_movement, user, vegetable # Import models for registration
 from app.api.v1.router_v1 import router as api_v1_router
+from app.core import kdf
+from app.core.metrics import RequestTimingMiddleware, register_collector, render_prometheus
+from app.core.user_cache import user_cache_stats
+from app.services import pdf_worker, price_schedule_service, stock_ledger_service
+from app.services.catalog_cache import catalog_cache_stats
+from app.services.pdf_cache import pdf_cache_stats
+from app.services.price_table import price_table_stats
 
 Base.metadata.create_all(bind=engine)
 
@@ -15,6 +23,48 @@ app.add_middleware(
     allow_credentials=False,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
+app.add_middleware(RequestTimingMiddleware)
 
 app.include_router(api_v1_router)
+
+register_collector("auth_cache", user_cache_stats)
+register_collector("catalog_cache", catalog_cache_stats)
+register_collector("pdf_cache", pdf_cache_stats)
+register_collector("price_table", price_table_stats)
+register_collector("pdf_worker", pdf_worker.pdf_worker_stats)
+register_collector("kdf", kdf.kdf_stats)
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+@app.on_event("startup")
+def warm_pdf_renderer():
+    pdf_worker.warm_up()
+
+@app.on_event("shutdown")
+def stop_pdf_renderer():
+    pdf_worker.shutdown()
+
+@app.on_event("shutdown")
+def stop_kdf_pool():
+    kdf.shutdown()
+
+@app.on_event("startup")
+async def start_stock_compactor():
+    stock_ledger_service.start_compactor()
+
+@app.on_event("shutdown")
+def stop_stock_compactor():
+    stock_ledger_service.stop_compactor()
+
+
+@app.on_event("startup")
+async def start_price_scheduler():
+    price_schedule_service.start_scheduler()
+
+@app.on_event("shutdown")
+def stop_price_scheduler():
+    price_schedule_service.stop_scheduler()
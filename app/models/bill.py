@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
+from sqlalchemy.sql import text
 from datetime import datetime
 from app.database.database import Base
 
@@ -21,9 +22,15 @@ class BillItem(Base):
 
 class Bill(Base):
     __tablename__ = "bills"
+    __table_args__ = (
+        # Backs keyset pagination of /billing/history
+        Index("ix_bills_user_created_id", "user_id", text("created_at DESC"), text("id DESC")),
+        # Numbers come from a per-shop counter, so every shop has its own N001
+        UniqueConstraint("user_id", "bill_number", name="uq_bills_user_bill_number"),
+    )
 
     id = Column(Integer, primary_key=True)
-    bill_number = Column(String, unique=True, index=True)
+    bill_number = Column(String, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     shop_name = Column(String)
     customer_name = Column(String, nullable=True)
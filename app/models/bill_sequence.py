@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, ForeignKey
+from app.database.database import Base
+
+class BillSequence(Base):
+    """
+    Per-shop, per-month bill number counter.
+    Incremented atomically on bill create, replacing COUNT(*) over bills.
+    """
+    __tablename__ = "bill_sequences"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    year = Column(Integer, primary_key=True)
+    month = Column(Integer, primary_key=True)
+    last_value = Column(Integer, nullable=False, default=0)
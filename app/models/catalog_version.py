@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, String
+from app.database.database import Base
+
+class CatalogVersion(Base):
+    """
+    Monotonic version counters for cached reference data (e.g. the vegetable catalog).
+    Bumped in the same transaction as the write so every worker can detect changes.
+    """
+    __tablename__ = "catalog_versions"
+
+    name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
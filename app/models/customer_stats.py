@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index
+from app.database.database import Base
+
+class CustomerShopStats(Base):
+    """
+    Running per-shop totals for each customer mobile number.
+    Maintained on bill create/update so /customers/stats is a plain indexed read.
+    """
+    __tablename__ = "customer_shop_stats"
+    __table_args__ = (
+        Index("ix_customer_shop_stats_spent", "user_id", "total_spent"),
+        Index("ix_customer_shop_stats_visits", "user_id", "total_purchases"),
+        Index("ix_customer_shop_stats_recent", "user_id", "last_purchase_date"),
+    )
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    customer_mobile = Column(String(15), primary_key=True)
+    customer_name = Column(String, nullable=True) # Name on the most recent bill
+    total_purchases = Column(Integer, nullable=False, default=0)
+    total_spent = Column(Float, nullable=False, default=0.0)
+    last_purchase_date = Column(DateTime, nullable=True)
+    last_bill_number = Column(String, nullable=True)
@@ -1,10 +1,16 @@
-from sqlalchemy import Column, Integer, Float, ForeignKey, String, DateTime
+from sqlalchemy import Column, Integer, Float, ForeignKey, String, DateTime, Index, UniqueConstraint
 from datetime import datetime
 from sqlalchemy.orm import relationship
 from app.database.database import Base
 
 class Inventory(Base):
     __tablename__ = "inventory"
+    __table_args__ = (
+        # One row per shop and vegetable; target of the bulk ON CONFLICT upserts
+        UniqueConstraint("user_id", "vegetable_id", name="uq_inventory_user_vegetable"),
+        # Delta sync: the shop's rows written after a client's cursor
+        Index("ix_inventory_user_revision", "user_id", "revision"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
@@ -16,6 +22,21 @@ class Inventory(Base):
     start_time = Column(String, nullable=True) # e.g., "06:00 AM"
     expiry_date = Column(String, nullable=True) # e.g., "27-Oct-2023"
     price_updated_at = Column(DateTime, nullable=True, default=datetime.utcnow)
+    # Rate card (price_schedules) currently applied; its expiry restores the prices it replaced
+    price_schedule_id = Column(Integer, nullable=True)
+    revision = Column(Integer, nullable=False, default=0, server_default="0") # Sync revision of the last write
 
     user = relationship("User")
     vegetable = relationship("Vegetable")
+
+class InventoryTombstone(Base):
+    """
+    Marks a shop's deleted inventory item so delta sync can tell clients to
+    drop it. Re-adding the item makes its inventory row newer than the marker.
+    """
+    __tablename__ = "inventory_tombstones"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    vegetable_id = Column(Integer, ForeignKey("vegetables.id"), primary_key=True)
+    revision = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,32 @@
+from sqlalchemy import Column, Integer, Float, Date, ForeignKey
+from sqlalchemy.dialects.postgresql import ARRAY
+from app.database.database import Base
+
+class PriceHistoryDay(Base):
+    """
+    Every price change of one shop's vegetable on one (UTC) day, stored as
+    parallel arrays, with the day's open/close/min/max/sum kept alongside.
+    Charts read one row per day instead of one row per change.
+    Appended to by price_history_service in the transaction of the change.
+    """
+    __tablename__ = "price_history_days"
+
+    # Primary key doubles as the (user_id, vegetable_id, time) index for range reads
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    vegetable_id = Column(Integer, ForeignKey("vegetables.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    points = Column(Integer, nullable=False, default=0)
+    # Seconds since midnight of each change, and the prices it set
+    offsets = Column(ARRAY(Integer), nullable=False)
+    wholesale = Column(ARRAY(Float), nullable=False)
+    retail = Column(ARRAY(Float), nullable=False)
+    open_wholesale = Column(Float, nullable=False)
+    close_wholesale = Column(Float, nullable=False)
+    min_wholesale = Column(Float, nullable=False)
+    max_wholesale = Column(Float, nullable=False)
+    sum_wholesale = Column(Float, nullable=False)
+    open_retail = Column(Float, nullable=False)
+    close_retail = Column(Float, nullable=False)
+    min_retail = Column(Float, nullable=False)
+    max_retail = Column(Float, nullable=False)
+    sum_retail = Column(Float, nullable=False)
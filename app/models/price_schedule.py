@@ -0,0 +1,34 @@
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index
+from sqlalchemy.sql import text
+from datetime import datetime
+from app.database.database import Base
+
+class PriceSchedule(Base):
+    """
+    One line of a published daily rate card, with real UTC activation and
+    expiry times. price_schedule_service applies it to the shop's Inventory
+    row when it starts and restores the previous prices when it expires.
+    """
+    __tablename__ = "price_schedules"
+    __table_args__ = (
+        # The scheduler's two lookups: cards due to start and cards due to expire
+        Index("ix_price_schedules_pending", "starts_at", postgresql_where=text("status = 'pending'")),
+        Index("ix_price_schedules_active", "expires_at", postgresql_where=text("status = 'active'")),
+        Index("ix_price_schedules_user_vegetable", "user_id", "vegetable_id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    vegetable_id = Column(Integer, ForeignKey("vegetables.id"), nullable=False)
+    wholesale_price = Column(Float, nullable=False)
+    retail_price = Column(Float, nullable=False)
+    starts_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=True) # None: until replaced
+    start_time = Column(String, nullable=True) # As published, e.g. "06:00 AM"
+    expiry_date = Column(String, nullable=True) # As published, e.g. "27-Oct-2023"
+    status = Column(String(8), nullable=False, default="pending") # pending, active, expired
+    # Inventory prices the card replaced, put back when it expires
+    prev_wholesale_price = Column(Float, nullable=True)
+    prev_retail_price = Column(Float, nullable=True)
+    prev_price_per_kg = Column(Float, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
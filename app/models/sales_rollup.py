@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey
+from app.database.database import Base
+
+class DailySalesRollup(Base):
+    """
+    Pre-aggregated bill totals per shop, day and billing type.
+    Maintained in the same transaction as bill create/update.
+    """
+    __tablename__ = "daily_sales_rollup"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    date = Column(Date, primary_key=True)
+    billing_type = Column(String, primary_key=True) # Wholesale or Retail
+    bill_count = Column(Integer, nullable=False, default=0)
+    total_amount = Column(Float, nullable=False, default=0.0)
+
+class DailyVegetableRollup(Base):
+    """
+    Per-vegetable line counts per shop and day, used for top selling items.
+    """
+    __tablename__ = "daily_vegetable_rollup"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    date = Column(Date, primary_key=True)
+    vegetable_id = Column(Integer, ForeignKey("vegetables.id"), primary_key=True)
+    vegetable_name = Column(String)
+    line_count = Column(Integer, nullable=False, default=0)
+    qty_kg = Column(Float, nullable=False, default=0.0)
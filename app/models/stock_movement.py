@@ -0,0 +1,40 @@
+from sqlalchemy import BigInteger, Boolean, Column, Integer, String, Float, DateTime, ForeignKey, Index
+from sqlalchemy.sql import text
+from datetime import datetime
+from app.database.database import Base
+
+class StockMovement(Base):
+    """
+    Append-only stock ledger: one row per sale line, receipt, adjustment or
+    wastage, with a signed qty_kg (negative takes stock out).
+    Current stock is Inventory.stock_kg (the snapshot) plus every movement
+    not yet compacted into it; see stock_ledger_service.
+    """
+    __tablename__ = "stock_movements"
+    __table_args__ = (
+        # Date-range stock reports: an index-only scan over one shop's window
+        Index(
+            "ix_stock_movements_user_created", "user_id", "created_at",
+            postgresql_include=["vegetable_id", "kind", "qty_kg"]
+        ),
+        # The uncompacted tail added on top of the snapshot by every stock read
+        Index(
+            "ix_stock_movements_pending", "user_id", "vegetable_id",
+            postgresql_include=["qty_kg"], postgresql_where=text("NOT compacted")
+        ),
+        # Delta sync: vegetables moved by transactions after a client's cursor
+        Index("ix_stock_movements_user_txid", "user_id", "txid", postgresql_include=["vegetable_id"]),
+    )
+
+    id = Column(BigInteger, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    vegetable_id = Column(Integer, ForeignKey("vegetables.id"), nullable=False)
+    kind = Column(String(16), nullable=False) # sale, receipt, adjustment or wastage
+    qty_kg = Column(Float, nullable=False)
+    bill_id = Column(Integer, ForeignKey("bills.id"), nullable=True) # Set for sales
+    note = Column(String, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    # Set once the movement is folded into Inventory.stock_kg; never reset
+    compacted = Column(Boolean, nullable=False, default=False, server_default=text("false"))
+    # Id of the writing transaction, for delta sync; see sync_service
+    txid = Column(BigInteger, nullable=False, server_default=text("txid_current()"))
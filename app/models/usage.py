@@ -1,8 +1,12 @@
-from sqlalchemy import Column, Integer, ForeignKey
+from sqlalchemy import Column, Integer, ForeignKey, UniqueConstraint
 from app.database.database import Base
 
 class VegetableUsage(Base):
     __tablename__ = "vegetable_usage"
+    __table_args__ = (
+        # Required for the single-statement usage upsert in bill create
+        UniqueConstraint("user_id", "vegetable_id", name="uq_vegetable_usage_user_vegetable"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
@@ -14,5 +14,8 @@ class User(Base):
     hashed_password = Column(String, nullable=False)
     role = Column(Enum(UserRole, values_callable=lambda x: [e.value for e in x]), default=UserRole.SHOP_USER)
     shop_name = Column(String, nullable=True) # For Shop Users
-    mobile_number = Column(String, nullable=True)
+    mobile_number = Column(String, nullable=True) # AES-GCM encrypted
+    mobile_index = Column(String(64), nullable=True, index=True) # phone_blind_index(mobile_number)
+    # What bill create does when a line exceeds stock: allow, warn or reject
+    oversell_policy = Column(String(8), nullable=False, default="allow", server_default="allow")
 
@@ -1,8 +1,12 @@
-from sqlalchemy import Column, Integer, String, Float
+from sqlalchemy import Column, Integer, String, Float, Index
 from app.database.database import Base
 
 class Vegetable(Base):
     __tablename__ = "vegetables"
+    __table_args__ = (
+        # Delta sync: rows written after a client's cursor
+        Index("ix_vegetables_revision", "revision"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, unique=True, nullable=False)
@@ -13,3 +17,4 @@ class Vegetable(Base):
     wholesale_price = Column(Float, nullable=False, default=0.0)
     retail_price = Column(Float, nullable=False, default=0.0)
     category = Column(String, nullable=True) # e.g., Root Veggies, Leafy Greens
+    revision = Column(Integer, nullable=False, default=0, server_default="0") # Sync revision of the last write
@@ -67,6 +67,18 @@ class BillResponse(BaseModel):
 
     model_config = ConfigDict(populate_by_name=True, from_attributes=True)
 
+class StockShortageItem(BaseModel):
+    vegetable_id: int = Field(alias="vegetableId")
+    name: str
+    requested: float
+    available: float
+
+    model_config = ConfigDict(populate_by_name=True)
+
+class BillCreateResponse(BillResponse):
+    # Lines sold beyond stock under the shop's "warn" oversell policy
+    stock_warnings: List[StockShortageItem] = Field(default_factory=list, alias="stockWarnings")
+
 class DashboardStats(BaseModel) :
     shop_name: str = Field(alias="shopName")
     today_retail_total: float = Field(0.0, alias="todayRetailTotal")
@@ -1,5 +1,6 @@
 from pydantic import BaseModel, ConfigDict, Field
-from typing import List, Optional
+from datetime import datetime
+from typing import List, Literal, Optional
 
 class InventorySetupItem(BaseModel):
     vegetable_id: int
@@ -43,6 +44,9 @@ class DailyPriceItem(BaseModel):
 class DailyPriceUpdate(BaseModel):
     start_time: Optional[str] = Field(None, alias="startTime")
     expiry_date: Optional[str] = Field(None, alias="expiryDate")
+    # Exact activation/expiry instants; override startTime/expiryDate (naive means UTC)
+    starts_at: Optional[datetime] = Field(None, alias="startsAt")
+    expires_at: Optional[datetime] = Field(None, alias="expiresAt")
     items: List[DailyPriceItem]
 
     model_config = ConfigDict(populate_by_name=True)
@@ -65,3 +69,48 @@ class InventoryResponse(BaseModel):
 
 
     model_config = ConfigDict(populate_by_name=True, from_attributes=True)
+
+class StockMovementCreate(BaseModel):
+    # receipt/wastage take a positive quantity; adjustment is a signed correction
+    kind: Literal["receipt", "wastage", "adjustment"]
+    quantity: float
+    note: Optional[str] = None
+
+class StockReportItem(BaseModel):
+    vegetable_id: int = Field(alias="vegetableId")
+    name: str
+    sold: float = 0.0
+    received: float = 0.0
+    adjusted: float = 0.0
+    wasted: float = 0.0
+    net: float = 0.0
+
+    model_config = ConfigDict(populate_by_name=True)
+
+class OversellPolicyUpdate(BaseModel):
+    # allow: sell past zero; warn: sell and report it; reject: refuse the bill
+    policy: Literal["allow", "warn", "reject"]
+
+class PriceHistorySeries(BaseModel):
+    # Column-wise, one entry per bucket; None before the first recorded price
+    vegetable_id: int = Field(alias="vegetableId")
+    field: Literal["wholesale", "retail"]
+    bucket: Literal["day", "week", "month"]
+    ts: List[str]
+    open: List[Optional[float]]
+    close: List[Optional[float]]
+    min: List[Optional[float]]
+    max: List[Optional[float]]
+    avg: List[Optional[float]]
+    changes: List[int]
+
+    model_config = ConfigDict(populate_by_name=True)
+
+class PriceHistoryPoints(BaseModel):
+    vegetable_id: int = Field(alias="vegetableId")
+    day: str
+    ts: List[str]
+    wholesale: List[float]
+    retail: List[float]
+
+    model_config = ConfigDict(populate_by_name=True)
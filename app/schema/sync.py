@@ -0,0 +1,16 @@
+from pydantic import BaseModel, ConfigDict
+from typing import List
+from app.schema.inventory import InventoryResponse
+from app.schema.vegetable import VegetableResponse
+
+class SyncChanges(BaseModel):
+    # Opaque; pass as ?since= next time
+    cursor: str
+    # True when this is everything (first sync or an unknown cursor): replace local data
+    full: bool
+    inventory: List[InventoryResponse]
+    # Vegetable ids removed from the shop's inventory
+    deleted: List[int]
+    vegetables: List[VegetableResponse]
+
+    model_config = ConfigDict(populate_by_name=True)
@@ -1,31 +1,165 @@
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
-from app.models.bill import Bill
-from app.models.bill_item import BillItem
-from app.utils.generate_bill_no import generate_bill_number
 
-def create_bill(db: Session, items: list):
-    bill_no = generate_bill_number()
-    total = 0
+from app.models.bill import Bill, BillItem
+from app.models.bill_sequence import BillSequence
+from app.models.usage import VegetableUsage
+from app.schema.bill import BillItemCreate
+from app.services.catalog_cache import get_catalog
+from app.services.stock_ledger_service import OVERSELL_ALLOW, StockShortage, apply_sale
+
+# Set-based helpers for bill writes.
+# Every helper issues a fixed number of statements no matter how many
+# lines the bill has, so a 40 line wholesale bill costs the same number
+# of round trips as a 1 line retail bill.
+
+
+def allocate_bill_number(db: Session, user_id: int, now: datetime) -> str:
+    """
+    Allocate the next BILL{yy}Y{mm}N{seq} number for a shop.
+    A single INSERT ... ON CONFLICT DO UPDATE ... RETURNING bumps the
+    per-month counter atomically. The row stays locked until the bill
+    commits, so concurrent counters get distinct numbers, and a rolled
+    back bill gives its number back instead of leaving a gap.
+    """
+    stmt = pg_insert(BillSequence).values(
+        user_id=user_id, year=now.year, month=now.month, last_value=1
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[BillSequence.user_id, BillSequence.year, BillSequence.month],
+        set_={"last_value": BillSequence.last_value + 1}
+    ).returning(BillSequence.last_value)
+    sequence = db.execute(stmt).scalar_one()
+    return f"BILL{now.strftime('%y')}Y{now.strftime('%m')}N{str(sequence).zfill(3)}"
 
-    bill = Bill(bill_number=bill_no, total_amount=0)
-    db.add(bill)
-    db.commit()
-    db.refresh(bill)
 
+def resolve_vegetables(db: Session, items: List[BillItemCreate]) -> List[tuple]:
+    """
+    Resolve every bill line to its catalog vegetable using the in-process
+    catalog cache (one version check instead of a vegetables query).
+    Lines are matched by id first, then by name. Unknown lines are dropped,
+    exactly like the old per-item loop did.
+    Returns a list of (item, vegetable) pairs in the original line order.
+    """
+    if not items:
+        return []
+    catalog = get_catalog(db)
+
+    resolved = []
     for item in items:
-        subtotal = item["qty"] * item["price"]
-        total += subtotal
-
-        db_item = BillItem(
-            bill_id=bill.id,
-            vegetable_name=item["name"],
-            qty_kg=item["qty"],
-            price=item["price"],
-            subtotal=subtotal
-        )
-        db.add(db_item)
-
-    bill.total_amount = total
-    db.commit()
-
-    return bill_no, total
+        if item.vegetable_id:
+            veg = catalog.by_id.get(item.vegetable_id)
+        else:
+            veg = catalog.by_name.get(item.name)
+        if veg:
+            resolved.append((item, veg))
+    return resolved
+
+
+def insert_bill_items(db: Session, bill_id: int, resolved: List[tuple]) -> List[dict]:
+    """
+    Bulk insert all BillItems for a bill in a single multi-row INSERT.
+    Returns the inserted rows.
+    """
+    rows = []
+    for item, veg in resolved:
+        rows.append({
+            "bill_id": bill_id,
+            "vegetable_id": veg.id,
+            "vegetable_name": veg.name,
+            "tamil_name": veg.tamil_name,
+            "grade": item.grade,
+            "qty_kg": item.quantity,
+            "price": item.price,
+            "subtotal": item.total,
+        })
+    if rows:
+        db.execute(insert(BillItem), rows)
+    return rows
+
+
+def bump_usage(db: Session, user_id: int, vegetable_ids: List[int]):
+    """
+    Upsert per-shop usage counters for all billed vegetables in one statement.
+    Relies on the (user_id, vegetable_id) unique constraint on vegetable_usage.
+    """
+    counts = Counter(vegetable_ids)
+    if not counts:
+        return
+    stmt = pg_insert(VegetableUsage).values([
+        {"user_id": user_id, "vegetable_id": veg_id, "usage_count": count}
+        for veg_id, count in sorted(counts.items())
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[VegetableUsage.user_id, VegetableUsage.vegetable_id],
+        set_={"usage_count": VegetableUsage.usage_count + stmt.excluded.usage_count}
+    )
+    db.execute(stmt)
+
+
+def add_bill_lines(
+    db: Session,
+    bill_id: int,
+    user_id: int,
+    items: List[BillItemCreate],
+    oversell_policy: str = OVERSELL_ALLOW
+) -> Tuple[float, List[dict], List[dict]]:
+    """
+    Set-based replacement for the old per-item loop in bill create:
+    resolve, book stock, insert lines and bump usage using a constant number
+    of statements. Stock is booked under the shop's oversell policy (see
+    stock_ledger_service); StockShortage propagates under reject.
+    Returns the computed subtotal, the inserted bill item rows and the
+    oversold lines.
+    """
+    resolved = resolve_vegetables(db, items)
+    if not resolved:
+        return 0, [], []
+
+    quantities: Dict[int, float] = {}
+    for item, veg in resolved:
+        quantities[veg.id] = quantities.get(veg.id, 0) + item.quantity
+
+    names = {veg.id: veg.name for _, veg in resolved}
+    try:
+        shortages = apply_sale(db, user_id, bill_id, quantities, oversell_policy)
+    except StockShortage as e:
+        for line in e.shortages:
+            line["name"] = names[line["vegetable_id"]]
+        raise
+    for line in shortages:
+        line["name"] = names[line["vegetable_id"]]
+
+    rows = insert_bill_items(db, bill_id, resolved)
+    bump_usage(db, user_id, [veg.id for _, veg in resolved])
+    return sum(row["subtotal"] for row in rows), rows, shortages
+
+
+def filter_bills(
+    query,
+    user_id: int,
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    billing_type: Optional[str] = None,
+    customer_mobile: Optional[str] = None
+):
+    """
+    Apply the shared history/export filters to a Query or Select over bills.
+    Date bounds are ranges on created_at (to_date inclusive) so the
+    (user_id, created_at) index can serve them.
+    """
+    query = query.filter(Bill.user_id == user_id)
+    if from_date:
+        query = query.filter(Bill.created_at >= datetime.combine(from_date, datetime.min.time()))
+    if to_date:
+        query = query.filter(Bill.created_at < datetime.combine(to_date + timedelta(days=1), datetime.min.time()))
+    if billing_type:
+        query = query.filter(Bill.billing_type == billing_type)
+    if customer_mobile:
+        query = query.filter(Bill.customer_mobile == customer_mobile)
+    return query
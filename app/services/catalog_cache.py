@@ -0,0 +1,120 @@
+import threading
+from dataclasses import dataclass, fields
+from types import MappingProxyType
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.models.catalog_version import CatalogVersion
+from app.models.vegetable import Vegetable
+
+# Process-local, immutable snapshot of the vegetable master list.
+# The catalog has ~100 rows and changes rarely, so every worker keeps a copy
+# and only re-reads it when the version row in catalog_versions moves.
+# Checking that row is a single primary-key lookup, which keeps several
+# uvicorn workers consistent without any cross-process messaging.
+
+CATALOG_NAME = "vegetables"
+
+
+@dataclass(frozen=True)
+class CatalogVegetable:
+    id: int
+    name: str
+    tamil_name: str
+    tanglish_name: Optional[str]
+    image_url: Optional[str]
+    price_per_kg: float
+    wholesale_price: float
+    retail_price: float
+    category: Optional[str]
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    version: int
+    vegetables: Tuple[CatalogVegetable, ...]
+    by_id: MappingProxyType
+    by_name: MappingProxyType
+    by_category: MappingProxyType
+    categories: Tuple[str, ...]
+
+    @property
+    def etag(self) -> str:
+        return f'"{CATALOG_NAME}-{self.version}"'
+
+
+_lock = threading.Lock()
+_snapshot: Optional[CatalogSnapshot] = None
+_stats: Dict[str, int] = {"hits": 0, "misses": 0}
+
+
+def current_version(db: Session) -> int:
+    version = db.query(CatalogVersion.version).filter(CatalogVersion.name == CATALOG_NAME).scalar()
+    return version or 0
+
+
+def bump_catalog_version(db: Session):
+    """
+    Invalidate every worker's catalog cache. Call inside the transaction that
+    changes the vegetables table so the new version becomes visible atomically
+    with the data.
+    """
+    stmt = pg_insert(CatalogVersion).values(name=CATALOG_NAME, version=1)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[CatalogVersion.name],
+        set_={"version": CatalogVersion.version + 1}
+    ))
+
+
+def _build_snapshot(db: Session, version: int) -> CatalogSnapshot:
+    columns = [f.name for f in fields(CatalogVegetable)]
+    vegetables = tuple(
+        CatalogVegetable(**{name: getattr(veg, name) for name in columns})
+        for veg in db.query(Vegetable).order_by(Vegetable.id).all()
+    )
+    by_category: Dict[str, list] = {}
+    for veg in vegetables:
+        if veg.category:
+            by_category.setdefault(veg.category, []).append(veg)
+    return CatalogSnapshot(
+        version=version,
+        vegetables=vegetables,
+        by_id=MappingProxyType({veg.id: veg for veg in vegetables}),
+        by_name=MappingProxyType({veg.name: veg for veg in vegetables}),
+        by_category=MappingProxyType({key: tuple(value) for key, value in by_category.items()}),
+        # Keep first-seen order, like SELECT DISTINCT category did
+        categories=tuple(by_category),
+    )
+
+
+def get_catalog(db: Session) -> CatalogSnapshot:
+    """Return the current catalog snapshot, reloading it if another write bumped the version."""
+    global _snapshot
+    version = current_version(db)
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.version == version:
+        _stats["hits"] += 1
+        return snapshot
+
+    # Build outside the lock: under run_sync the queries suspend on the event
+    # loop, and a second miss blocking on a held threading.Lock would stop the
+    # loop the first one needs to resume. Concurrent misses may both build;
+    # the lock only guards the swap.
+    snapshot = _build_snapshot(db, version)
+    with _lock:
+        _stats["misses"] += 1
+        if _snapshot is not None and _snapshot.version == version:
+            return _snapshot
+        _snapshot = snapshot
+        return snapshot
+
+
+def catalog_cache_stats() -> Dict[str, int]:
+    snapshot = _snapshot
+    return {
+        **_stats,
+        "version": snapshot.version if snapshot else -1,
+        "size": len(snapshot.vegetables) if snapshot else 0,
+    }
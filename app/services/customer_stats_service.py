@@ -0,0 +1,113 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import case, delete, func, insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.models.bill import Bill
+from app.models.customer_stats import CustomerShopStats
+
+
+def apply_bill_to_customer_stats(
+    db: Session,
+    user_id: int,
+    customer_mobile: Optional[str],
+    customer_name: Optional[str],
+    bill_number: str,
+    created_at: datetime,
+    amount_delta: float,
+    purchases_delta: int = 1
+):
+    """
+    Fold one bill write into the customer's running totals with a single upsert.
+    For a new bill pass its total and purchases_delta=1; for an edit pass the
+    change in total and purchases_delta=0. Name and last bill are only taken
+    from the bill if it is the customer's most recent one.
+    """
+    if not customer_mobile:
+        return
+    stmt = pg_insert(CustomerShopStats).values(
+        user_id=user_id,
+        customer_mobile=customer_mobile,
+        customer_name=customer_name,
+        total_purchases=purchases_delta,
+        total_spent=amount_delta or 0.0,
+        last_purchase_date=created_at,
+        last_bill_number=bill_number
+    )
+    is_latest = stmt.excluded.last_purchase_date >= func.coalesce(
+        CustomerShopStats.last_purchase_date, stmt.excluded.last_purchase_date
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[CustomerShopStats.user_id, CustomerShopStats.customer_mobile],
+        set_={
+            "total_purchases": CustomerShopStats.total_purchases + stmt.excluded.total_purchases,
+            "total_spent": CustomerShopStats.total_spent + stmt.excluded.total_spent,
+            "customer_name": case(
+                (is_latest, func.coalesce(stmt.excluded.customer_name, CustomerShopStats.customer_name)),
+                else_=CustomerShopStats.customer_name
+            ),
+            "last_bill_number": case(
+                (is_latest, stmt.excluded.last_bill_number),
+                else_=CustomerShopStats.last_bill_number
+            ),
+            "last_purchase_date": case(
+                (is_latest, stmt.excluded.last_purchase_date),
+                else_=CustomerShopStats.last_purchase_date
+            ),
+        }
+    )
+    db.execute(stmt)
+
+
+def customer_stats_query(user_id: Optional[int] = None):
+    """
+    Per-customer totals computed from raw bills in one statement.
+    Customers are identified by mobile number only; the name and last bill
+    number come from the most recent bill via ROW_NUMBER() OVER, so no
+    per-customer follow-up query is needed.
+    """
+    partition = (Bill.user_id, Bill.customer_mobile)
+    ranked = select(
+        Bill.user_id,
+        Bill.customer_mobile,
+        Bill.customer_name,
+        Bill.bill_number,
+        Bill.created_at,
+        func.row_number().over(
+            partition_by=partition,
+            order_by=(Bill.created_at.desc(), Bill.id.desc())
+        ).label("rn"),
+        func.count(Bill.id).over(partition_by=partition).label("total_purchases"),
+        func.coalesce(func.sum(Bill.total_amount).over(partition_by=partition), 0.0).label("total_spent"),
+    ).where(Bill.customer_mobile.isnot(None), Bill.user_id.isnot(None))
+    if user_id is not None:
+        ranked = ranked.where(Bill.user_id == user_id)
+    ranked = ranked.subquery()
+
+    return select(
+        ranked.c.user_id,
+        ranked.c.customer_mobile,
+        ranked.c.customer_name,
+        ranked.c.total_purchases,
+        ranked.c.total_spent,
+        ranked.c.created_at.label("last_purchase_date"),
+        ranked.c.bill_number.label("last_bill_number"),
+    ).where(ranked.c.rn == 1)
+
+
+def rebuild_customer_stats(db: Session, user_id: Optional[int] = None):
+    """Backfill customer_shop_stats from raw bills for one shop or all shops."""
+    stmt = delete(CustomerShopStats)
+    if user_id is not None:
+        stmt = stmt.where(CustomerShopStats.user_id == user_id)
+    db.execute(stmt)
+    db.execute(insert(CustomerShopStats).from_select(
+        [
+            "user_id", "customer_mobile", "customer_name", "total_purchases",
+            "total_spent", "last_purchase_date", "last_bill_number",
+        ],
+        customer_stats_query(user_id)
+    ))
+    db.commit()
@@ -0,0 +1,169 @@
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import column, or_, select, update, values, Float, Integer, String
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.models.inventory import Inventory
+from app.models.vegetable import Vegetable
+from app.services.price_table import get_price_table
+from app.services.stock_ledger_service import current_stock, pending_stock, with_current_stock
+
+# Bulk write helpers for inventory and the vegetable master list.
+# Each helper applies a whole payload in a single statement, so publishing a
+# 100 item rate card costs one round trip instead of 200+.
+
+_SQL_TYPES = {int: Integer, float: Float, str: String}
+
+# Per-row columns of a price update payload
+PRICE_COLUMNS = {"vegetable_id": int, "wholesale_price": float, "retail_price": float, "price_per_kg": float}
+
+
+def _last_wins(rows: Iterable[dict], key: str) -> List[dict]:
+    """
+    Drop earlier duplicates of the same key, keeping the last one like the old
+    item-by-item loops did. ON CONFLICT DO UPDATE cannot touch a row twice.
+    """
+    unique: Dict = {}
+    for row in rows:
+        unique[row[key]] = row
+    return [unique[k] for k in sorted(unique)]
+
+
+def _values_table(name: str, rows: List[dict], types: Dict[str, type]):
+    columns = list(types)
+    return values(
+        *[column(col, _SQL_TYPES[types[col]]) for col in columns],
+        name=name
+    ).data([tuple(row[col] for col in columns) for row in rows])
+
+
+def upsert_inventory(db: Session, user_id: int, rows: List[dict], update_columns: List[str]):
+    """
+    INSERT ... ON CONFLICT (user_id, vegetable_id) DO UPDATE for a whole payload.
+    `rows` are Inventory column dicts with vegetable_id; only `update_columns`
+    are overwritten on existing rows.
+    """
+    rows = _last_wins(rows, "vegetable_id")
+    if not rows:
+        return
+    stmt = pg_insert(Inventory).values([{**row, "user_id": user_id} for row in rows])
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[Inventory.user_id, Inventory.vegetable_id],
+        set_={col: stmt.excluded[col] for col in update_columns}
+    ))
+
+
+def update_inventory_rows(db: Session, user_id: int, rows: List[dict], types: Dict[str, type], extra: dict = None):
+    """
+    UPDATE inventory ... FROM (VALUES ...) for existing rows only.
+    `types` maps the per-row columns (vegetable_id first) to Python types;
+    `extra` holds values shared by every row (e.g. the publish schedule).
+    """
+    rows = _last_wins(rows, "vegetable_id")
+    if not rows:
+        return
+    data = _values_table("payload", rows, types)
+    assignments = {col: data.c[col] for col in types if col != "vegetable_id"}
+    assignments.update(extra or {})
+    db.execute(
+        update(Inventory)
+        .where(
+            Inventory.user_id == user_id,
+            Inventory.vegetable_id == data.c.vegetable_id
+        )
+        .values(**assignments),
+        execution_options={"synchronize_session": False}
+    )
+
+
+def update_vegetable_prices(db: Session, rows: List[dict]):
+    """Set wholesale/retail (and price_per_kg = retail) on the master list in one statement."""
+    rows = _last_wins(rows, "id")
+    if not rows:
+        return
+    data = _values_table("prices", rows, {"id": int, "wholesale_price": float, "retail_price": float})
+    db.execute(
+        update(Vegetable)
+        .where(Vegetable.id == data.c.id)
+        .values(
+            wholesale_price=data.c.wholesale_price,
+            retail_price=data.c.retail_price,
+            price_per_kg=data.c.retail_price
+        ),
+        execution_options={"synchronize_session": False}
+    )
+
+
+def upsert_vegetables_by_name(db: Session, rows: List[dict], update_columns: List[str]) -> Dict[str, int]:
+    """
+    INSERT ... ON CONFLICT (name) DO UPDATE ... RETURNING id, name.
+    Returns a name -> vegetable id map covering both new and existing rows.
+    """
+    rows = _last_wins(rows, "name")
+    if not rows:
+        return {}
+    stmt = pg_insert(Vegetable).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Vegetable.name],
+        set_={col: stmt.excluded[col] for col in update_columns}
+    ).returning(Vegetable.id, Vegetable.name)
+    return {name: veg_id for veg_id, name in db.execute(stmt)}
+
+
+def list_inventory(db: Session, user_id: int, changed_since: Optional[int] = None,
+                   also: Iterable[int] = ()) -> List[dict]:
+    """
+    The shop's inventory as shown on the Shop and Pricing pages, or only the
+    rows written after sync revision `changed_since` plus those of the
+    vegetable ids in `also` (stock moved through the ledger).
+    Single joined projection; no ORM objects and no lazy load per row.
+    Stock is the compacted snapshot plus the shop's pending ledger movements;
+    prices come from the shop's in-memory price table, which also applies
+    rate cards whose start or expiry has passed since the scheduler last ran.
+    """
+    prices = get_price_table(db, user_id)
+    pending = pending_stock(user_id)
+    query = with_current_stock(select(
+        Inventory.price_per_kg,
+        current_stock(pending).label("stock_kg"),
+        Inventory.wholesale_price,
+        Inventory.retail_price,
+        Inventory.start_time,
+        Inventory.expiry_date,
+        Inventory.price_updated_at,
+        Vegetable.id.label("vegetable_id"),
+        Vegetable.name,
+        Vegetable.tamil_name,
+        Vegetable.tanglish_name,
+        Vegetable.category,
+        Vegetable.image_url
+    ).join(Vegetable, Vegetable.id == Inventory.vegetable_id), pending).where(Inventory.user_id == user_id)
+    if changed_since is not None:
+        also = sorted(set(also))
+        changed = Inventory.revision > changed_since
+        query = query.where(or_(changed, Inventory.vegetable_id.in_(also)) if also else changed)
+
+    now = datetime.utcnow()
+    items = []
+    for row in db.execute(query):
+        # Rows written without a price version bump (seed scripts) fall back to their columns
+        price = prices.price(row.vegetable_id, now) or row
+        items.append({
+            "id": row.vegetable_id,
+            "vegetableId": row.vegetable_id,
+            "name": row.name,
+            "tamilName": row.tamil_name,
+            "tanglishName": row.tanglish_name,
+            "price": price.price_per_kg,
+            "stock": row.stock_kg,
+            "wholesalePrice": price.wholesale_price,
+            "retailPrice": price.retail_price,
+            "startTime": price.start_time,
+            "expiryDate": price.expiry_date,
+            "priceUpdatedAt": price.price_updated_at.isoformat() if price.price_updated_at else None,
+            "category": row.category,
+            "image": row.image_url
+        })
+    return items
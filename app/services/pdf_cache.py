@@ -0,0 +1,163 @@
+import asyncio
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from app.core import config
+
+# Size-bounded LRU of rendered bill PDFs, keyed by (bill id, bill version hash).
+# The version hash covers every field printed on the bill, so an edited bill
+# never matches an old entry even in a worker that missed the invalidation;
+# update_bill still drops the old entries so they don't hold memory.
+# With PDF_CACHE_DIR set, entries are also written to disk as
+# "<bill id>/<version>.pdf" and shared by every worker on the host. Async
+# callers use the *_async variants, which do the disk I/O on a thread.
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_entries: "OrderedDict[Tuple[int, str], bytes]" = OrderedDict()
+_size = 0
+_stats: Dict[str, int] = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+
+def _disk_dir(bill_id: int) -> Optional[str]:
+    if not config.PDF_CACHE_DIR:
+        return None
+    return os.path.join(config.PDF_CACHE_DIR, str(bill_id))
+
+
+def _disk_path(bill_id: int, version: str) -> Optional[str]:
+    directory = _disk_dir(bill_id)
+    return os.path.join(directory, f"{version}.pdf") if directory else None
+
+
+def _remember(key: Tuple[int, str], data: bytes):
+    """Insert into the memory LRU and evict the oldest entries past the byte budget. Caller holds _lock."""
+    global _size
+    if len(data) > config.PDF_CACHE_MAX_BYTES:
+        return
+    previous = _entries.pop(key, None)
+    if previous is not None:
+        _size -= len(previous)
+    _entries[key] = data
+    _size += len(data)
+    while _size > config.PDF_CACHE_MAX_BYTES:
+        _, evicted = _entries.popitem(last=False)
+        _size -= len(evicted)
+        _stats["evictions"] += 1
+
+
+def _memory_get(key: Tuple[int, str]) -> Optional[bytes]:
+    with _lock:
+        data = _entries.get(key)
+        if data is not None:
+            _entries.move_to_end(key)
+            _stats["hits"] += 1
+        return data
+
+
+def _read_disk(path: str) -> Optional[bytes]:
+    try:
+        with open(path, "rb") as f:
+            return f.read() or None
+    except OSError:
+        return None
+
+
+def _disk_result(key: Tuple[int, str], data: Optional[bytes]) -> Optional[bytes]:
+    with _lock:
+        if data:
+            _stats["disk_hits"] += 1
+            _remember(key, data)
+        else:
+            _stats["misses"] += 1
+    return data
+
+
+def _write_disk(bill_id: int, version: str, data: bytes):
+    path = _disk_path(bill_id, version)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename so a concurrent reader never sees a partial file
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        # The PDF is still served from memory; only the shared copy is missing
+        logger.warning("PDF cache write failed for bill %s: %s", bill_id, e)
+
+
+def _remove_disk(bill_id: int):
+    # One directory per bill, so this only lists the bill's own versions
+    directory = _disk_dir(bill_id)
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return
+    for name in names:
+        try:
+            os.remove(os.path.join(directory, name))
+        except OSError:
+            pass
+    try:
+        os.rmdir(directory)
+    except OSError:
+        pass  # A render for the new version may have just written into it
+
+
+def _forget(bill_id: int):
+    global _size
+    with _lock:
+        for key in [key for key in _entries if key[0] == bill_id]:
+            _size -= len(_entries.pop(key))
+
+
+def get_cached_pdf(bill_id: int, version: str) -> Optional[bytes]:
+    """Blocking on a disk lookup; from async code use get_cached_pdf_async."""
+    key = (bill_id, version)
+    data = _memory_get(key)
+    if data is not None:
+        return data
+    path = _disk_path(bill_id, version)
+    return _disk_result(key, _read_disk(path) if path else None)
+
+
+async def get_cached_pdf_async(bill_id: int, version: str) -> Optional[bytes]:
+    """Memory hits return inline; the disk tier is read on a worker thread."""
+    key = (bill_id, version)
+    data = _memory_get(key)
+    if data is not None:
+        return data
+    path = _disk_path(bill_id, version)
+    return _disk_result(key, await asyncio.to_thread(_read_disk, path) if path else None)
+
+
+def store_pdf(bill_id: int, version: str, data: bytes):
+    """Blocking on the disk write; from async code use store_pdf_async."""
+    with _lock:
+        _remember((bill_id, version), data)
+    if config.PDF_CACHE_DIR:
+        _write_disk(bill_id, version, data)
+
+
+async def store_pdf_async(bill_id: int, version: str, data: bytes):
+    with _lock:
+        _remember((bill_id, version), data)
+    if config.PDF_CACHE_DIR:
+        await asyncio.to_thread(_write_disk, bill_id, version, data)
+
+
+async def invalidate_bill_pdf_async(bill_id: int):
+    """Drop every cached version of a bill. Call after the bill is edited."""
+    _forget(bill_id)
+    if config.PDF_CACHE_DIR:
+        await asyncio.to_thread(_remove_disk, bill_id)
+
+
+def pdf_cache_stats() -> Dict[str, int]:
+    with _lock:
+        return {**_stats, "entries": len(_entries), "bytes": _size}
@@ -3,11 +3,16 @@ from reportlab.lib.units import mm
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Table, TableStyle, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.styles import ParagraphStyle
 from reportlab.lib import colors
 from reportlab import rl_config
 from io import BytesIO
-from app.models.bill import Bill
+from copy import copy
+from datetime import datetime
+from hashlib import sha1
+from typing import Dict, List, Optional
+from app.models.bill import Bill, BillItem
+from app.services.pdf_cache import get_cached_pdf, store_pdf
 from xml.sax.saxutils import escape
 
 # STICKY RULES: Unicode, UTF-8, Shaping, Professional Quality
@@ -31,22 +36,8 @@ except Exception as e:
     FONT_NAME = "Helvetica"
     BOLD_FONT_NAME = "Helvetica-Bold"
 
-# ---- PDF GENERATOR ----
-def generate_bill_pdf(bill: Bill) -> BytesIO:
-    buffer = BytesIO()
-
-    doc = SimpleDocTemplate(
-        buffer,
-        pagesize=A4,
-        rightMargin=15 * mm,
-        leftMargin=15 * mm,
-        topMargin=15 * mm,
-        bottomMargin=15 * mm
-    )
-
-    # ---- STYLES ----
-    styles = getSampleStyleSheet()
-    
+# ---- STYLES AND STATIC HEADER (built once per process) ----
+def _build_styles() -> Dict[str, ParagraphStyle]:
     tamil_style = ParagraphStyle(
         name="Tamil",
         fontName=FONT_NAME,
@@ -77,12 +68,21 @@ def generate_bill_pdf(bill: Bill) -> BytesIO:
         textColor=colors.HexColor("#666666") # Grey
     )
 
-    elements = []
+    return {
+        "tamil": tamil_style,
+        "tamil_bold": tamil_bold_style,
+        "shop_name": shop_name_style,
+        "address": address_style,
+        "grand_total": ParagraphStyle(name="GT", parent=tamil_bold_style, fontSize=16),
+        "grand_value": ParagraphStyle(name="GV", parent=tamil_bold_style, fontSize=16),
+    }
+
 
-    # ---- HEADER SECTION ----
-    elements.append(Paragraph("Suji Vegetables", shop_name_style))
-    elements.append(Paragraph("Pondy - Tindivanam Main Raod, Kiliyanur", address_style))
-    elements.append(Paragraph("Phone: +91 9095938085", address_style))
+def _build_header(styles: Dict[str, ParagraphStyle]) -> List:
+    elements = []
+    elements.append(Paragraph("Suji Vegetables", styles["shop_name"]))
+    elements.append(Paragraph("Pondy - Tindivanam Main Raod, Kiliyanur", styles["address"]))
+    elements.append(Paragraph("Phone: +91 9095938085", styles["address"]))
 
     elements.append(Spacer(1, 5 * mm))
     
@@ -93,6 +93,61 @@ def generate_bill_pdf(bill: Bill) -> BytesIO:
     ]))
     elements.append(divider)
     elements.append(Spacer(1, 8 * mm))
+    return elements
+
+
+STYLES = _build_styles()
+# Parsed/shaped once; each render works on shallow copies because
+# flowables keep their layout state on the instance during doc.build()
+HEADER_FLOWABLES = _build_header(STYLES)
+
+META_TABLE_STYLE = TableStyle([
+    ('VALIGN', (0,0), (-1,-1), 'TOP'),
+    ('BOTTOMPADDING', (0,0), (-1,-1), 2 * mm),
+])
+
+ITEMS_TABLE_STYLE = TableStyle([
+    ('LINEABOVE', (0,0), (-1,0), 1.2, colors.black), # Line above header
+    ('LINEBELOW', (0,0), (-1,0), 0.8, colors.black), # Line below header
+    ('ALIGN', (1,0), (-1,-1), 'RIGHT'),
+    ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+    ('BOTTOMPADDING', (0,0), (0,-1), 1.5 * mm),
+    ('TOPPADDING', (0,1), (0,-1), 1.5 * mm),
+    ('LINEBELOW', (0,-1), (-1,-1), 1.2, colors.black), # Bottom line
+])
+
+TOTALS_TABLE_STYLE = TableStyle([
+    ('ALIGN', (1,0), (-1,-1), 'RIGHT'),
+    ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+    ('BOTTOMPADDING', (0,0), (-1,-1), 1 * mm),
+    # Dotted line above grand total
+    ('LINEABOVE', (1,-1), (-1,-1), 0.5, colors.black, 1, (1, 2)),
+    ('TOPPADDING', (1,-1), (-1,-1), 3 * mm),
+])
+
+
+def format_qty(qty_kg: float) -> str:
+    if qty_kg < 1:
+        return f"{int(qty_kg * 1000)} g"
+    return f"{int(qty_kg)} kg" if qty_kg.is_integer() else f"{qty_kg:g} kg"
+
+
+# ---- PDF GENERATOR ----
+def generate_bill_pdf(bill: Bill) -> BytesIO:
+    buffer = BytesIO()
+
+    doc = SimpleDocTemplate(
+        buffer,
+        pagesize=A4,
+        rightMargin=15 * mm,
+        leftMargin=15 * mm,
+        topMargin=15 * mm,
+        bottomMargin=15 * mm
+    )
+
+    styles = STYLES
+    tamil_style = styles["tamil"]
+    elements = [copy(flowable) for flowable in HEADER_FLOWABLES]
 
     # ---- BILL META SECTION ----
     customer = escape(bill.customer_name or 'Walking Customer')
@@ -116,10 +171,7 @@ def generate_bill_pdf(bill: Bill) -> BytesIO:
         ]
     ]
     meta_table = Table(meta_data, colWidths=[110 * mm, 70 * mm])
-    meta_table.setStyle(TableStyle([
-        ('VALIGN', (0,0), (-1,-1), 'TOP'),
-        ('BOTTOMPADDING', (0,0), (-1,-1), 2 * mm),
-    ]))
+    meta_table.setStyle(META_TABLE_STYLE)
     elements.append(meta_table)
     elements.append(Spacer(1, 10 * mm))
 
@@ -140,10 +192,7 @@ def generate_bill_pdf(bill: Bill) -> BytesIO:
         if tam_name:
             item_html += f' <font color="#888888" size="9">{tam_name}</font>'
 
-        if item.qty_kg < 1:
-            qty_text = f"{int(item.qty_kg * 1000)} g"
-        else:
-            qty_text = f"{int(item.qty_kg)} kg" if item.qty_kg.is_integer() else f"{item.qty_kg:g} kg"
+        qty_text = format_qty(item.qty_kg)
 
         items_data.append([
             Paragraph(item_html, tamil_style),
@@ -153,15 +202,7 @@ def generate_bill_pdf(bill: Bill) -> BytesIO:
         ])
 
     items_table = Table(items_data, colWidths=[100 * mm, 25 * mm, 25 * mm, 30 * mm])
-    items_table.setStyle(TableStyle([
-        ('LINEABOVE', (0,0), (-1,0), 1.2, colors.black), # Line above header
-        ('LINEBELOW', (0,0), (-1,0), 0.8, colors.black), # Line below header
-        ('ALIGN', (1,0), (-1,-1), 'RIGHT'),
-        ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-        ('BOTTOMPADDING', (0,0), (0,-1), 1.5 * mm),
-        ('TOPPADDING', (0,1), (0,-1), 1.5 * mm),
-        ('LINEBELOW', (0,-1), (-1,-1), 1.2, colors.black), # Bottom line
-    ]))
+    items_table.setStyle(ITEMS_TABLE_STYLE)
     elements.append(items_table)
     
     # ---- TOTALS SECTION ----
@@ -178,31 +219,72 @@ def generate_bill_pdf(bill: Bill) -> BytesIO:
     totals_data.append(subtotal_row)
     
     if bill.tax_amount > 0:
-        totals_data.append(["", Paragraph('<font color="#666666">Tax:</font>', tamil_style), f"₹{bill.tax_amount:.2f}"])
+        totals_data.append([
+            "", Paragraph('<font color="#666666">Tax:</font>', tamil_style), f"₹{bill.tax_amount:.2f}"
+        ])
     
     if bill.discount_amount > 0:
-        totals_data.append(["", Paragraph('<font color="#666666">Discount:</font>', tamil_style), f"-₹{bill.discount_amount:.2f}"])
+        totals_data.append([
+            "",
+            Paragraph('<font color="#666666">Discount:</font>', tamil_style),
+            f"-₹{bill.discount_amount:.2f}"
+        ])
     
     # Grand Total
     grand_total_row = [
         "",
-        Paragraph("<b>Grand Total:</b>", ParagraphStyle(name="GT", parent=tamil_bold_style, fontSize=16)),
-        Paragraph(f"<b>₹{bill.total_amount:.2f}</b>", ParagraphStyle(name="GV", parent=tamil_bold_style, fontSize=16))
+        Paragraph("<b>Grand Total:</b>", styles["grand_total"]),
+        Paragraph(f"<b>₹{bill.total_amount:.2f}</b>", styles["grand_value"])
     ]
     totals_data.append(grand_total_row)
     
     totals_table = Table(totals_data, colWidths=[100 * mm, 40 * mm, 40 * mm])
-    totals_table.setStyle(TableStyle([
-        ('ALIGN', (1,0), (-1,-1), 'RIGHT'),
-        ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-        ('BOTTOMPADDING', (0,0), (-1,-1), 1 * mm),
-        # Dotted line above grand total
-        ('LINEABOVE', (1,-1), (-1,-1), 0.5, colors.black, 1, (1, 2)),
-        ('TOPPADDING', (1,-1), (-1,-1), 3 * mm),
-    ]))
+    totals_table.setStyle(TOTALS_TABLE_STYLE)
     
     elements.append(totals_table)
 
     doc.build(elements)
     buffer.seek(0)
     return buffer
+
+
+# ---- CACHED RENDERING ----
+def bill_version(bill: Bill) -> str:
+    """Hash of every field printed on the bill; changes whenever the bill is edited."""
+    parts = [
+        bill.bill_number, bill.customer_name, bill.customer_mobile, bill.billing_type,
+        bill.created_at.isoformat() if bill.created_at else None,
+        bill.subtotal, bill.tax_amount, bill.discount_amount, bill.total_amount,
+    ]
+    for item in bill.items:
+        parts.append((item.vegetable_name, item.tamil_name, item.qty_kg, item.price, item.subtotal))
+    return sha1(repr(parts).encode("utf-8")).hexdigest()[:16]
+
+
+def render_bill_pdf(bill: Bill, version: Optional[str] = None) -> bytes:
+    """
+    Return the bill's PDF bytes, rendering only on a cache miss.
+    Blocking; call it from a worker thread inside async endpoints.
+    """
+    version = version or bill_version(bill)
+    pdf = get_cached_pdf(bill.id, version)
+    if pdf is None:
+        pdf = generate_bill_pdf(bill).getvalue()
+        store_pdf(bill.id, version, pdf)
+    return pdf
+
+
+def warm_up():
+    """
+    Render a throwaway bill once so font loading and Tamil shaping setup
+    happen at startup instead of on the first customer's request.
+    """
+    sample = Bill(
+        bill_number="WARMUP", customer_name="Warm Up", billing_type="Retail",
+        subtotal=0.0, tax_amount=0.0, discount_amount=0.0, total_amount=0.0,
+        created_at=datetime.utcnow()
+    )
+    sample.items = [
+        BillItem(vegetable_name="Tomato", tamil_name="தக்காளி", qty_kg=1.0, price=0.0, subtotal=0.0)
+    ]
+    generate_bill_pdf(sample)
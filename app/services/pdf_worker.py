@@ -0,0 +1,299 @@
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+from types import SimpleNamespace
+from typing import AsyncIterable, AsyncIterator, Dict, Optional, Tuple
+
+from app.core import config
+from app.models.bill import Bill
+from app.services import pdf_service
+from app.services.pdf_cache import get_cached_pdf_async, store_pdf_async
+
+# Bill PDFs are laid out in a dedicated process pool so ReportLab never holds
+# the uvicorn worker's GIL. Jobs carry a plain dict snapshot of the bill (no
+# ORM objects cross the process boundary). The number of queued + running
+# jobs is capped globally and per shop; callers over the cap get
+# PdfQueueFull with a Retry-After estimate instead of waiting indefinitely.
+# Batch exports take slots from the same global count but wait for one
+# instead of failing, so an export never pushes the pool past the cap.
+
+
+class PdfQueueFull(Exception):
+    def __init__(self, status_code: int, retry_after: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.detail = detail
+
+
+_lock = threading.Lock()
+_executor: Optional[ProcessPoolExecutor] = None
+_pending = 0
+_pending_by_shop: Dict[int, int] = {}
+_timings = deque(maxlen=500)  # (queue_ms, render_ms) of recent jobs
+_stats: Dict[str, int] = {
+    "submitted": 0, "completed": 0, "failed": 0, "rejected_busy": 0, "rejected_shop": 0,
+    "batch_pdfs": 0, "batch_waits": 0,
+}
+
+# How long a batch export sleeps when the queue is full and it has nothing in flight to wait on
+BATCH_SLOT_POLL_SECONDS = 0.05
+
+
+def bill_snapshot(bill: Bill) -> dict:
+    """Everything generate_bill_pdf reads, as picklable builtins."""
+    return {
+        "bill_number": bill.bill_number,
+        "customer_name": bill.customer_name,
+        "customer_mobile": bill.customer_mobile,
+        "billing_type": bill.billing_type,
+        "created_at": bill.created_at,
+        "subtotal": bill.subtotal or 0.0,
+        "tax_amount": bill.tax_amount or 0.0,
+        "discount_amount": bill.discount_amount or 0.0,
+        "total_amount": bill.total_amount or 0.0,
+        "items": [
+            {
+                "vegetable_name": item.vegetable_name,
+                "tamil_name": item.tamil_name,
+                "qty_kg": item.qty_kg,
+                "price": item.price,
+                "subtotal": item.subtotal,
+            }
+            for item in bill.items
+        ],
+    }
+
+
+def _render_snapshot(snapshot: dict):
+    """Runs in a pool process. Returns the PDF bytes and the render time in ms."""
+    start = time.perf_counter()
+    bill = SimpleNamespace(**{**snapshot, "items": [SimpleNamespace(**item) for item in snapshot["items"]]})
+    pdf = pdf_service.generate_bill_pdf(bill).getvalue()
+    return pdf, (time.perf_counter() - start) * 1000
+
+
+def _init_worker():
+    pdf_service.warm_up()
+
+
+def _noop():
+    return None
+
+
+def start() -> ProcessPoolExecutor:
+    """Return the pool, creating it on first use."""
+    global _executor
+    with _lock:
+        if _executor is None:
+            # spawn: never fork a process that holds DB connections and event loop state
+            _executor = ProcessPoolExecutor(
+                max_workers=config.PDF_WORKERS,
+                mp_context=get_context("spawn"),
+                initializer=_init_worker
+            )
+    return _executor
+
+
+def warm_up():
+    """Spawn and warm every worker at startup instead of on the first reprint."""
+    executor = start()
+    for _ in range(config.PDF_WORKERS):
+        executor.submit(_noop)
+
+
+def _discard(executor: ProcessPoolExecutor):
+    global _executor
+    with _lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown():
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _retry_after() -> int:
+    """Seconds until roughly one queue's worth of work has drained. Caller holds _lock."""
+    recent = [render_ms for _, render_ms in _timings]
+    average_ms = sum(recent) / len(recent) if recent else 200.0
+    return max(1, math.ceil(_pending * average_ms / 1000 / config.PDF_WORKERS))
+
+
+def _acquire(shop_id: int):
+    global _pending
+    with _lock:
+        if _pending >= config.PDF_QUEUE_SIZE:
+            _stats["rejected_busy"] += 1
+            raise PdfQueueFull(503, _retry_after(), "PDF renderer is busy, please retry")
+        if _pending_by_shop.get(shop_id, 0) >= config.PDF_MAX_JOBS_PER_SHOP:
+            _stats["rejected_shop"] += 1
+            raise PdfQueueFull(429, _retry_after(), "Too many PDFs in progress for this shop")
+        _pending += 1
+        _pending_by_shop[shop_id] = _pending_by_shop.get(shop_id, 0) + 1
+        _stats["submitted"] += 1
+
+
+def _release(shop_id: int):
+    global _pending
+    with _lock:
+        _pending -= 1
+        remaining = _pending_by_shop.get(shop_id, 1) - 1
+        if remaining:
+            _pending_by_shop[shop_id] = remaining
+        else:
+            _pending_by_shop.pop(shop_id, None)
+
+
+def _try_acquire_batch() -> bool:
+    """Take a global slot for a batch render if the queue has room; batches are not counted per shop."""
+    global _pending
+    with _lock:
+        if _pending >= config.PDF_QUEUE_SIZE:
+            _stats["batch_waits"] += 1
+            return False
+        _pending += 1
+        return True
+
+
+def _release_batch(_future=None):
+    # Done-callback of the pool future: the slot is held until the render
+    # really finishes, even if the export was cancelled while it ran
+    global _pending
+    with _lock:
+        _pending -= 1
+
+
+async def render_bill_pdf_async(bill: Bill, version: Optional[str] = None) -> bytes:
+    """
+    Cached render of a bill through the process pool.
+    Raises PdfQueueFull when the global queue or the shop's share is full.
+    """
+    version = version or pdf_service.bill_version(bill)
+    pdf = await get_cached_pdf_async(bill.id, version)
+    if pdf is not None:
+        return pdf
+
+    snapshot = bill_snapshot(bill)
+    shop_id = bill.user_id
+    _acquire(shop_id)
+    future = None
+    try:
+        executor = start()
+        submitted = time.perf_counter()
+        future = executor.submit(_render_snapshot, snapshot)
+        # Release when the render ends, not when the caller stops waiting, so
+        # a disconnected client's job still counts against the caps while it runs
+        future.add_done_callback(lambda _: _release(shop_id))
+        pdf, render_ms = await asyncio.wrap_future(future)
+        total_ms = (time.perf_counter() - submitted) * 1000
+    except BrokenProcessPool:
+        # A worker died (e.g. OOM killed); replace the pool for the next request
+        _discard(executor)
+        with _lock:
+            _stats["failed"] += 1
+        raise PdfQueueFull(503, 1, "PDF renderer restarted, please retry")
+    except Exception:
+        with _lock:
+            _stats["failed"] += 1
+        raise
+    finally:
+        if future is None:
+            _release(shop_id)
+
+    with _lock:
+        _stats["completed"] += 1
+        _timings.append((max(0.0, total_ms - render_ms), render_ms))
+    await store_pdf_async(bill.id, version, pdf)
+    return pdf
+
+
+async def render_snapshots_in_order(
+    snapshots: AsyncIterable[Tuple[str, object]]
+) -> AsyncIterator[Tuple[str, bytes]]:
+    """
+    Render (name, snapshot) pairs across the pool and yield (name, pdf) in
+    input order. A snapshot may already be PDF bytes (e.g. a cache hit).
+    At most PDF_BATCH_WINDOW renders are in flight, so a large export never
+    holds more than a window of PDFs in memory and leaves pool capacity for
+    interactive reprints. Each render also takes a slot of the global
+    PDF_QUEUE_SIZE count; when none is free the export waits for its own
+    renders (or polls, if it has none in flight) rather than overfill the
+    pool.
+    """
+    executor = start()
+    window = deque()
+    snapshots = aiter(snapshots)
+    exhausted = False
+    entry = None
+    while True:
+        while not exhausted and len(window) < config.PDF_BATCH_WINDOW:
+            if entry is None:
+                entry = await anext(snapshots, None)
+                if entry is None:
+                    exhausted = True
+                    break
+            name, snapshot = entry
+            if isinstance(snapshot, bytes):
+                future = asyncio.get_running_loop().create_future()
+                future.set_result((snapshot, 0.0))
+            elif _try_acquire_batch():
+                try:
+                    submitted = executor.submit(_render_snapshot, snapshot)
+                except BaseException:
+                    _release_batch()
+                    raise
+                submitted.add_done_callback(_release_batch)
+                future = asyncio.wrap_future(submitted)
+            elif window:
+                # Queue full: hand out what is in flight first, which frees slots
+                break
+            else:
+                await asyncio.sleep(BATCH_SLOT_POLL_SECONDS)
+                continue
+            window.append((name, future))
+            entry = None
+        if not window:
+            return
+        name, future = window.popleft()
+        try:
+            pdf, render_ms = await future
+        except BaseException:
+            for _, pending in window:
+                pending.cancel()
+            raise
+        with _lock:
+            _stats["batch_pdfs"] += 1
+        yield name, pdf
+
+
+def _percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def pdf_worker_stats() -> Dict[str, float]:
+    with _lock:
+        queue_ms = [queue for queue, _ in _timings]
+        render_ms = [render for _, render in _timings]
+        return {
+            **_stats,
+            "workers": config.PDF_WORKERS,
+            "pending": _pending,
+            "queue_ms_p50": _percentile(queue_ms, 50),
+            "queue_ms_p95": _percentile(queue_ms, 95),
+            "render_ms_p50": _percentile(render_ms, 50),
+            "render_ms_p95": _percentile(render_ms, 95),
+        }
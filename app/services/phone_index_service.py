@@ -0,0 +1,64 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+
+from sqlalchemy import column, update, values, Integer, String
+
+from app.core.auth import decrypt_phone_sync, phone_blind_index
+from app.database.database import SessionLocal
+from app.models.user import User
+
+# users.mobile_number is AES-GCM with a random nonce, so equal numbers never
+# produce equal ciphertexts. users.mobile_index holds a keyed HMAC of the
+# number instead, which makes "who has this phone" a single indexed lookup
+# without storing the number in the clear. forgot-password compares against
+# it instead of decrypting the account's number.
+
+
+def _index_batch(rows: List[Tuple[int, str]]) -> int:
+    """Decrypt, index and write one batch of (id, encrypted phone) rows in its own session."""
+    indexed = [(user_id, phone_blind_index(decrypt_phone_sync(encrypted))) for user_id, encrypted in rows]
+    data = values(column("id", Integer), column("mobile_index", String), name="indexed").data(indexed)
+    db = SessionLocal()
+    try:
+        db.execute(
+            update(User).where(User.id == data.c.id).values(mobile_index=data.c.mobile_index),
+            execution_options={"synchronize_session": False}
+        )
+        db.commit()
+    finally:
+        db.close()
+    return len(indexed)
+
+
+def backfill_phone_index(batch_size: int = 500, workers: int = 4, rebuild: bool = False) -> int:
+    """
+    Fill users.mobile_index for rows that have a phone but no index yet (or
+    every row with `rebuild`, e.g. after rotating PHONE_INDEX_KEY).
+    Batches are read in id order with a keyset cursor and indexed across a
+    thread pool, at most 2 x workers batches in flight.
+    Returns the number of rows written.
+    """
+    query = SessionLocal()
+    written = 0
+    last_id = 0
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            in_flight = []
+            while True:
+                batch = query.query(User.id, User.mobile_number).filter(
+                    User.id > last_id,
+                    User.mobile_number.isnot(None),
+                    *([] if rebuild else [User.mobile_index.is_(None)])
+                ).order_by(User.id).limit(batch_size).all()
+                query.rollback()
+                if not batch:
+                    break
+                last_id = batch[-1].id
+                in_flight.append(pool.submit(_index_batch, [tuple(row) for row in batch]))
+                if len(in_flight) >= 2 * workers:
+                    written += in_flight.pop(0).result()
+            for future in in_flight:
+                written += future.result()
+    finally:
+        query.close()
+    return written
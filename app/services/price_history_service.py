@@ -0,0 +1,153 @@
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import func, literal, select
+from sqlalchemy.dialects.postgresql import array, insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.models.inventory import Inventory
+from app.models.price_history import PriceHistoryDay
+
+# Price history, compressed by day: each (shop, vegetable, day) row holds the
+# day's changes as parallel arrays (second of day, wholesale, retail) plus the
+# open/close/min/max/sum of both prices. A change appends to the arrays and
+# folds into the aggregates with one upsert, so range reads touch one row per
+# day however often prices moved, and never a raw row per change.
+#
+# Series are returned column-wise (one list per field) so a chart or
+# numpy.asarray can take them as they are. Days without a change carry the
+# previous close forward; days before the first recorded price are None.
+
+def record_prices(db: Session, user_id: int, vegetable_ids: Iterable[int], at: Optional[datetime] = None):
+    """
+    Append the current inventory prices of `vegetable_ids` to the shop's
+    history in one INSERT ... SELECT ... ON CONFLICT. Call after the price
+    write, in the same transaction. Vegetables without an inventory row are
+    skipped.
+    """
+    vegetable_ids = sorted(set(vegetable_ids))
+    if not vegetable_ids:
+        return
+    at = at or datetime.utcnow()
+    offset = int((at - datetime.combine(at.date(), time.min)).total_seconds())
+
+    stmt = pg_insert(PriceHistoryDay).from_select(
+        ["user_id", "vegetable_id", "day", "points", "offsets", "wholesale", "retail",
+         "open_wholesale", "close_wholesale", "min_wholesale", "max_wholesale", "sum_wholesale",
+         "open_retail", "close_retail", "min_retail", "max_retail", "sum_retail"],
+        select(
+            Inventory.user_id, Inventory.vegetable_id, literal(at.date()), literal(1),
+            array([literal(offset)]), array([Inventory.wholesale_price]), array([Inventory.retail_price]),
+            *[Inventory.wholesale_price] * 5,
+            *[Inventory.retail_price] * 5
+        ).where(Inventory.user_id == user_id, Inventory.vegetable_id.in_(vegetable_ids))
+    )
+    excluded = stmt.excluded
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[PriceHistoryDay.user_id, PriceHistoryDay.vegetable_id, PriceHistoryDay.day],
+        set_={
+            "points": PriceHistoryDay.points + excluded.points,
+            "offsets": func.array_cat(PriceHistoryDay.offsets, excluded.offsets),
+            "wholesale": func.array_cat(PriceHistoryDay.wholesale, excluded.wholesale),
+            "retail": func.array_cat(PriceHistoryDay.retail, excluded.retail),
+            "close_wholesale": excluded.close_wholesale,
+            "min_wholesale": func.least(PriceHistoryDay.min_wholesale, excluded.min_wholesale),
+            "max_wholesale": func.greatest(PriceHistoryDay.max_wholesale, excluded.max_wholesale),
+            "sum_wholesale": PriceHistoryDay.sum_wholesale + excluded.sum_wholesale,
+            "close_retail": excluded.close_retail,
+            "min_retail": func.least(PriceHistoryDay.min_retail, excluded.min_retail),
+            "max_retail": func.greatest(PriceHistoryDay.max_retail, excluded.max_retail),
+            "sum_retail": PriceHistoryDay.sum_retail + excluded.sum_retail,
+        }
+    ))
+
+
+def _bucket_start(day: date, bucket: str) -> date:
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    if bucket == "month":
+        return day.replace(day=1)
+    return day
+
+
+def price_series(db: Session, user_id: int, vegetable_id: int, start: date, end: date,
+                 field: str = "retail", bucket: str = "day") -> Dict[str, list]:
+    """
+    Open/close/min/max/avg of one price field per day, week or month over
+    [start, end] (inclusive), plus the number of changes in each bucket.
+    Reads the day rows in the range and the last one before it.
+    """
+    columns = [getattr(PriceHistoryDay, f"{agg}_{field}") for agg in ("open", "close", "min", "max", "sum")]
+    key = (PriceHistoryDay.user_id == user_id) & (PriceHistoryDay.vegetable_id == vegetable_id)
+    days = {
+        row.day: row for row in db.execute(
+            select(PriceHistoryDay.day, PriceHistoryDay.points, *columns)
+            .where(key, PriceHistoryDay.day >= start, PriceHistoryDay.day <= end)
+        )
+    }
+    carry = db.execute(
+        select(columns[1]).where(key, PriceHistoryDay.day < start)
+        .order_by(PriceHistoryDay.day.desc()).limit(1)
+    ).scalar()
+
+    series: Dict[str, list] = {"ts": [], "open": [], "close": [], "min": [], "max": [], "avg": [], "changes": []}
+    current = None  # [bucket, open, close, min, max, sum of daily averages, days priced, changes]
+    day = start
+    while day <= end:
+        row = days.get(day)
+        if row is not None:
+            day_open, day_close, day_min, day_max, day_sum = row[2:]
+            day_avg, changes = day_sum / row.points, row.points
+        else:
+            day_open = day_close = day_min = day_max = day_avg = carry
+            changes = 0
+        carry = day_close
+
+        bucket_key = _bucket_start(day, bucket)
+        if current is None or current[0] != bucket_key:
+            if current is not None:
+                _append_bucket(series, current)
+            current = [bucket_key, day_open, None, None, None, 0.0, 0, 0]
+        if current[1] is None:
+            current[1] = day_open
+        if day_close is not None:
+            current[2] = day_close
+            current[3] = day_min if current[3] is None else min(current[3], day_min)
+            current[4] = day_max if current[4] is None else max(current[4], day_max)
+            current[5] += day_avg
+            current[6] += 1
+        current[7] += changes
+        day += timedelta(days=1)
+    if current is not None:
+        _append_bucket(series, current)
+    return series
+
+
+def _append_bucket(series: Dict[str, list], bucket: list):
+    key, open_, close, low, high, avg_sum, priced_days, changes = bucket
+    series["ts"].append(key.isoformat())
+    series["open"].append(open_)
+    series["close"].append(close)
+    series["min"].append(low)
+    series["max"].append(high)
+    series["avg"].append(avg_sum / priced_days if priced_days else None)
+    series["changes"].append(changes)
+
+
+def day_points(db: Session, user_id: int, vegetable_id: int, day: date) -> Dict[str, List]:
+    """Every change recorded on one day, as parallel ts/wholesale/retail lists."""
+    row = db.execute(
+        select(PriceHistoryDay.offsets, PriceHistoryDay.wholesale, PriceHistoryDay.retail).where(
+            PriceHistoryDay.user_id == user_id,
+            PriceHistoryDay.vegetable_id == vegetable_id,
+            PriceHistoryDay.day == day
+        )
+    ).first()
+    if row is None:
+        return {"ts": [], "wholesale": [], "retail": []}
+    midnight = datetime.combine(day, time.min)
+    return {
+        "ts": [(midnight + timedelta(seconds=offset)).isoformat() for offset in row.offsets],
+        "wholesale": list(row.wholesale),
+        "retail": list(row.retail),
+    }
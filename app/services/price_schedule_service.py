@@ -0,0 +1,304 @@
+import asyncio
+import logging
+from datetime import datetime, time, timedelta, timezone
+from typing import Dict, List, Optional, Set, Tuple
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import func, insert, literal, select, update, values, column, Float, Integer
+from sqlalchemy.orm import Session
+
+from app.core import config
+from app.database.database import AsyncSessionLocal
+from app.models.inventory import Inventory
+from app.models.price_schedule import PriceSchedule
+from app.services.price_history_service import record_prices
+from app.services.price_table import bump_price_version
+from app.services.sync_service import stamp_inventory
+
+# Rate cards published on the Daily Pricing page become price_schedules rows
+# with real UTC start and expiry times. run_due applies them to inventory:
+#
+#   pending -> active   at starts_at: the card's prices are written to the
+#                       inventory row and the replaced prices kept on the card
+#   active  -> expired  at expires_at: the replaced prices are written back
+#
+# A newer card supersedes older ones: when several cards for the same
+# vegetable are due, the one with the latest start wins and the others are
+# expired unused. A card that supersedes an active one inherits the prices
+# that card replaced, so expiry always returns to the prices in force before
+# any card; a winning card that has already expired just does that. Manual price edits detach the row
+# from its card (inventory.price_schedule_id = NULL), so an expiring card
+# never overwrites them.
+#
+# Every run appends the new prices to the price history and bumps the price
+# table version of the shops it touched; between runs, price_table resolves
+# due cards from memory.
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+ACTIVE = "active"
+EXPIRED = "expired"
+
+START_TIME_FORMAT = "%I:%M %p"
+EXPIRY_DATE_FORMATS = ("%d-%b-%Y", "%Y-%m-%d")
+
+def _shop_zone() -> ZoneInfo:
+    return ZoneInfo(config.SHOP_TIMEZONE)
+
+
+def _to_utc(local: datetime) -> datetime:
+    return local.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def to_utc_naive(value: datetime) -> datetime:
+    """Normalise an API timestamp to naive UTC; naive values are taken as UTC already."""
+    return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+
+
+def parse_start(start_time: Optional[str], now: datetime) -> datetime:
+    """
+    UTC start of a card published with a local "06:00 AM" start time. The
+    time is taken as today in the shop's timezone; a time that has already
+    passed, or a missing or unreadable one, means now.
+    """
+    if start_time:
+        try:
+            parsed = datetime.strptime(start_time.strip(), START_TIME_FORMAT).time()
+        except ValueError:
+            return now
+        today = now.replace(tzinfo=timezone.utc).astimezone(_shop_zone()).date()
+        starts_at = _to_utc(datetime.combine(today, parsed, tzinfo=_shop_zone()))
+        if starts_at > now:
+            return starts_at
+    return now
+
+
+def parse_expiry(expiry_date: Optional[str]) -> Optional[datetime]:
+    """UTC end of a card valid through a local "27-Oct-2023" date, or None if missing or unreadable."""
+    if not expiry_date:
+        return None
+    for fmt in EXPIRY_DATE_FORMATS:
+        try:
+            day = datetime.strptime(expiry_date.strip(), fmt).date()
+        except ValueError:
+            continue
+        return _to_utc(datetime.combine(day + timedelta(days=1), time.min, tzinfo=_shop_zone()))
+    return None
+
+
+def create_rate_card(db: Session, user_id: int, prices: List[Tuple[int, float, float]], starts_at: datetime,
+                     expires_at: Optional[datetime], start_time: Optional[str] = None,
+                     expiry_date: Optional[str] = None):
+    """
+    Insert one pending price_schedules row per (vegetable_id, wholesale,
+    retail) in a single INSERT ... SELECT. Vegetables the shop has no
+    inventory row for are ignored, like the old direct update.
+    """
+    if not prices:
+        return
+    card = values(
+        column("vegetable_id", Integer), column("wholesale", Float), column("retail", Float), name="card"
+    ).data(sorted({veg_id: (veg_id, w, r) for veg_id, w, r in prices}.values()))
+    db.execute(insert(PriceSchedule).from_select(
+        ["user_id", "vegetable_id", "wholesale_price", "retail_price", "starts_at", "expires_at",
+         "start_time", "expiry_date", "status", "created_at"],
+        select(
+            Inventory.user_id, Inventory.vegetable_id, card.c.wholesale, card.c.retail,
+            literal(starts_at), literal(expires_at, PriceSchedule.expires_at.type),
+            literal(start_time, PriceSchedule.start_time.type), literal(expiry_date, PriceSchedule.expiry_date.type),
+            literal(PENDING), literal(datetime.utcnow())
+        ).join(card, card.c.vegetable_id == Inventory.vegetable_id).where(Inventory.user_id == user_id)
+    ))
+
+
+def _expire_due(db: Session, now: datetime, user_id: Optional[int]) -> Set[Tuple[int, int]]:
+    """Restore the prices replaced by active cards that have expired; returns the (shop, vegetable) rows changed."""
+    expired = update(PriceSchedule).where(PriceSchedule.status == ACTIVE, PriceSchedule.expires_at <= now)
+    if user_id is not None:
+        expired = expired.where(PriceSchedule.user_id == user_id)
+    expired = expired.values(status=EXPIRED).returning(
+        PriceSchedule.id, PriceSchedule.user_id, PriceSchedule.prev_wholesale_price,
+        PriceSchedule.prev_retail_price, PriceSchedule.prev_price_per_kg
+    ).cte("expired")
+    restored = db.execute(
+        update(Inventory)
+        .where(Inventory.price_schedule_id == expired.c.id)
+        .values(
+            wholesale_price=expired.c.prev_wholesale_price,
+            retail_price=expired.c.prev_retail_price,
+            price_per_kg=expired.c.prev_price_per_kg,
+            start_time=None,
+            expiry_date=None,
+            price_schedule_id=None,
+            price_updated_at=now
+        )
+        .returning(Inventory.user_id, Inventory.vegetable_id),
+        execution_options={"synchronize_session": False}
+    )
+    return {(shop, veg_id) for shop, veg_id in restored}
+
+
+def _activate_due(db: Session, now: datetime, user_id: Optional[int]) -> Tuple[Set[int], Set[Tuple[int, int]]]:
+    """
+    Apply the latest due pending card per vegetable (or its expiry). Returns
+    the shops whose cards changed and the (shop, vegetable) rows repriced.
+    """
+    due = select(PriceSchedule).where(PriceSchedule.status == PENDING, PriceSchedule.starts_at <= now)
+    if user_id is not None:
+        due = due.where(PriceSchedule.user_id == user_id)
+    # Row locks let the scheduler and a publishing shop run at once; whoever
+    # waits re-checks the status and skips cards the other already applied
+    cards = db.execute(
+        due.order_by(PriceSchedule.starts_at, PriceSchedule.id).with_for_update()
+    ).scalars().all()
+    if not cards:
+        return set(), set()
+
+    winners: Dict[Tuple[int, int], PriceSchedule] = {}
+    for card in cards:
+        winners[(card.user_id, card.vegetable_id)] = card
+    winner_ids = {card.id for card in winners.values()}
+    retired = [card.id for card in cards if card.id not in winner_ids]
+
+    current = PriceSchedule.__table__.alias("current_card")
+    rows = db.execute(
+        select(
+            Inventory.id, Inventory.user_id, Inventory.vegetable_id, Inventory.wholesale_price,
+            Inventory.retail_price, Inventory.price_per_kg, current.c.id.label("current_id"),
+            current.c.prev_wholesale_price, current.c.prev_retail_price, current.c.prev_price_per_kg
+        )
+        .outerjoin(current, (current.c.id == Inventory.price_schedule_id) & (current.c.status == ACTIVE))
+        .where(
+            Inventory.user_id.in_(sorted({shop for shop, _ in winners})),
+            Inventory.vegetable_id.in_(sorted({veg_id for _, veg_id in winners}))
+        )
+    ).all()
+
+    inventory_updates, card_updates, changed = [], [], set()
+    for row in rows:
+        card = winners.pop((row.user_id, row.vegetable_id), None)
+        if card is None:
+            continue
+        if row.current_id is not None:
+            # Superseding an active card: keep the prices from before that card
+            prev = (row.prev_wholesale_price, row.prev_retail_price, row.prev_price_per_kg)
+            retired.append(row.current_id)
+        else:
+            prev = (row.wholesale_price, row.retail_price, row.price_per_kg)
+        if card.expires_at is not None and card.expires_at <= now:
+            # Started and ended since the last run
+            retired.append(card.id)
+            if row.current_id is not None:
+                changed.add((row.user_id, row.vegetable_id))
+                inventory_updates.append({
+                    "id": row.id, "wholesale_price": prev[0], "retail_price": prev[1], "price_per_kg": prev[2],
+                    "start_time": None, "expiry_date": None, "price_schedule_id": None, "price_updated_at": now,
+                })
+            continue
+        changed.add((row.user_id, row.vegetable_id))
+        card_updates.append({
+            "id": card.id, "status": ACTIVE, "prev_wholesale_price": prev[0],
+            "prev_retail_price": prev[1], "prev_price_per_kg": prev[2],
+        })
+        inventory_updates.append({
+            "id": row.id, "wholesale_price": card.wholesale_price, "retail_price": card.retail_price,
+            "price_per_kg": card.retail_price, "start_time": card.start_time, "expiry_date": card.expiry_date,
+            "price_schedule_id": card.id, "price_updated_at": now,
+        })
+    # Cards whose inventory row was deleted meanwhile never apply
+    retired.extend(card.id for card in winners.values())
+
+    if retired:
+        db.execute(
+            update(PriceSchedule).where(PriceSchedule.id.in_(retired)).values(status=EXPIRED),
+            execution_options={"synchronize_session": False}
+        )
+    if card_updates:
+        db.execute(update(PriceSchedule), card_updates)
+    if inventory_updates:
+        db.execute(update(Inventory), inventory_updates)
+    return {card.user_id for card in cards}, changed
+
+
+def run_due(db: Session, now: Optional[datetime] = None, user_id: Optional[int] = None) -> Set[int]:
+    """
+    Expire and activate every card due at `now` (all shops, or one), record
+    the new prices in the price history, stamp the rows for delta sync, bump
+    the price table version of the shops touched and return them. The caller
+    commits.
+    """
+    now = now or datetime.utcnow()
+    changed = _expire_due(db, now, user_id)
+    shops, activated = _activate_due(db, now, user_id)
+    repriced: Dict[int, Set[int]] = {}
+    for shop, veg_id in changed | activated:
+        repriced.setdefault(shop, set()).add(veg_id)
+    for shop, vegetable_ids in sorted(repriced.items()):
+        record_prices(db, shop, vegetable_ids, now)
+    shops |= repriced.keys()
+    for shop in sorted(shops):
+        bump_price_version(db, shop)
+    # Last, since each shop's sync revision stays locked until commit
+    for shop, vegetable_ids in sorted(repriced.items()):
+        stamp_inventory(db, shop, vegetable_ids)
+    return shops
+
+
+def next_event(db: Session) -> Optional[datetime]:
+    """When the next pending card starts or active card expires, whichever is first."""
+    return db.execute(select(func.least(
+        select(func.min(PriceSchedule.starts_at)).where(PriceSchedule.status == PENDING).scalar_subquery(),
+        select(func.min(PriceSchedule.expires_at)).where(PriceSchedule.status == ACTIVE).scalar_subquery()
+    ))).scalar()
+
+
+_scheduler: Optional[asyncio.Task] = None
+_wake: Optional[asyncio.Event] = None
+
+
+def _apply_due(db: Session) -> Tuple[Set[int], Optional[datetime]]:
+    shops = run_due(db)
+    return shops, next_event(db)
+
+
+async def _schedule_forever(interval: float):
+    while True:
+        delay = interval
+        try:
+            async with AsyncSessionLocal() as db:
+                shops, upcoming = await db.run_sync(_apply_due)
+                await db.commit()
+            if shops:
+                logger.debug("Applied rate cards for %d shops", len(shops))
+            if upcoming is not None:
+                delay = min(interval, max(0.0, (upcoming - datetime.utcnow()).total_seconds()))
+        except Exception:
+            logger.exception("Applying rate cards failed; retrying in %ss", interval)
+        try:
+            await asyncio.wait_for(_wake.wait(), delay)
+        except asyncio.TimeoutError:
+            pass
+        _wake.clear()
+
+
+def wake_scheduler():
+    """Re-plan the scheduler's sleep, e.g. after a rate card with a later start was published."""
+    if _wake is not None:
+        _wake.set()
+
+
+def start_scheduler():
+    """Apply rate cards as they become due in this worker (PRICE_SCHEDULER_INTERVAL 0 disables)."""
+    global _scheduler, _wake
+    if config.PRICE_SCHEDULER_INTERVAL > 0 and _scheduler is None:
+        _wake = asyncio.Event()
+        _scheduler = asyncio.get_running_loop().create_task(_schedule_forever(config.PRICE_SCHEDULER_INTERVAL))
+
+
+def stop_scheduler():
+    global _scheduler, _wake
+    if _scheduler is not None:
+        _scheduler.cancel()
+        _scheduler = None
+        _wake = None
@@ -0,0 +1,151 @@
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from types import MappingProxyType
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session, aliased
+
+from app.models.catalog_version import CatalogVersion
+from app.models.inventory import Inventory
+from app.models.price_schedule import PriceSchedule
+
+# Process-local table of each shop's prices, including the rate cards that
+# are scheduled to start or expire. Reads resolve the price in effect right
+# now from memory, so a card goes live at its exact start time even before
+# the scheduler has written it to the inventory row.
+#
+# Like the catalog cache, a shop's table is rebuilt only when its version row
+# (catalog_versions "prices:<user_id>") moves; every price write bumps it in
+# the same transaction.
+
+
+@dataclass(frozen=True)
+class ActivePrice:
+    price_per_kg: float
+    wholesale_price: float
+    retail_price: float
+    start_time: Optional[str] = None
+    expiry_date: Optional[str] = None
+    price_updated_at: Optional[datetime] = None
+
+
+@dataclass(frozen=True)
+class PriceTimeline:
+    current: ActivePrice
+    # Prices from before any rate card, and when the card behind `current` expires
+    base: ActivePrice
+    current_expires_at: Optional[datetime]
+    # Pending cards as (starts_at, expires_at, price), oldest first
+    upcoming: Tuple[Tuple[datetime, Optional[datetime], ActivePrice], ...]
+
+    def at(self, now: datetime) -> ActivePrice:
+        # As in the scheduler: the latest card to start wins, and once it expires the base prices apply
+        for starts_at, expires_at, price in reversed(self.upcoming):
+            if starts_at <= now:
+                return price if expires_at is None or expires_at > now else self.base
+        if self.current_expires_at is not None and self.current_expires_at <= now:
+            return self.base
+        return self.current
+
+
+@dataclass(frozen=True)
+class ShopPrices:
+    version: int
+    timelines: MappingProxyType
+
+    def price(self, vegetable_id: int, now: Optional[datetime] = None) -> Optional[ActivePrice]:
+        timeline = self.timelines.get(vegetable_id)
+        return timeline.at(now or datetime.utcnow()) if timeline else None
+
+
+_lock = threading.Lock()
+_tables: Dict[int, ShopPrices] = {}
+_stats: Dict[str, int] = {"hits": 0, "misses": 0}
+
+
+def _version_name(user_id: int) -> str:
+    return f"prices:{user_id}"
+
+
+def current_price_version(db: Session, user_id: int) -> int:
+    version = db.query(CatalogVersion.version).filter(CatalogVersion.name == _version_name(user_id)).scalar()
+    return version or 0
+
+
+def bump_price_version(db: Session, user_id: int):
+    """Invalidate every worker's price table for a shop. Call in the transaction that changes its prices."""
+    stmt = pg_insert(CatalogVersion).values(name=_version_name(user_id), version=1)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[CatalogVersion.name],
+        set_={"version": CatalogVersion.version + 1}
+    ))
+
+
+def _card_price(card) -> ActivePrice:
+    return ActivePrice(
+        price_per_kg=card.retail_price, wholesale_price=card.wholesale_price, retail_price=card.retail_price,
+        start_time=card.start_time, expiry_date=card.expiry_date
+    )
+
+
+def _build_table(db: Session, user_id: int, version: int) -> ShopPrices:
+    active = aliased(PriceSchedule)
+    rows = db.query(
+        Inventory.vegetable_id, Inventory.price_per_kg, Inventory.wholesale_price, Inventory.retail_price,
+        Inventory.start_time, Inventory.expiry_date, Inventory.price_updated_at,
+        active.id.label("card_id"), active.expires_at,
+        active.prev_price_per_kg, active.prev_wholesale_price, active.prev_retail_price
+    ).outerjoin(active, active.id == Inventory.price_schedule_id).filter(Inventory.user_id == user_id).all()
+
+    upcoming: Dict[int, list] = {}
+    for card in db.query(PriceSchedule).filter(
+        PriceSchedule.user_id == user_id, PriceSchedule.status == "pending"
+    ).order_by(PriceSchedule.starts_at, PriceSchedule.id):
+        upcoming.setdefault(card.vegetable_id, []).append(
+            (card.starts_at, card.expires_at, _card_price(card))
+        )
+
+    timelines = {}
+    for row in rows:
+        current = ActivePrice(
+            price_per_kg=row.price_per_kg, wholesale_price=row.wholesale_price, retail_price=row.retail_price,
+            start_time=row.start_time, expiry_date=row.expiry_date, price_updated_at=row.price_updated_at
+        )
+        base = current
+        if row.card_id is not None:
+            base = ActivePrice(
+                price_per_kg=row.prev_price_per_kg, wholesale_price=row.prev_wholesale_price,
+                retail_price=row.prev_retail_price
+            )
+        timelines[row.vegetable_id] = PriceTimeline(
+            current=current,
+            base=base,
+            current_expires_at=row.expires_at,
+            upcoming=tuple(upcoming.get(row.vegetable_id, ())),
+        )
+    return ShopPrices(version=version, timelines=MappingProxyType(timelines))
+
+
+def get_price_table(db: Session, user_id: int) -> ShopPrices:
+    """Return the shop's price table, rebuilding it if a price write bumped its version."""
+    version = current_price_version(db, user_id)
+    table = _tables.get(user_id)
+    if table is not None and table.version == version:
+        _stats["hits"] += 1
+        return table
+
+    # As in the catalog cache: build outside the lock, which only guards the swap
+    table = _build_table(db, user_id, version)
+    with _lock:
+        _stats["misses"] += 1
+        cached = _tables.get(user_id)
+        if cached is not None and cached.version == version:
+            return cached
+        _tables[user_id] = table
+        return table
+
+
+def price_table_stats() -> Dict[str, int]:
+    return {**_stats, "shops": len(_tables)}
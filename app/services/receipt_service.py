@@ -0,0 +1,277 @@
+import logging
+from dataclasses import dataclass
+from functools import lru_cache
+from io import BytesIO
+from typing import Dict, List, Optional
+
+from PIL import Image, ImageDraw, ImageFont, features
+from reportlab.lib.units import mm
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+
+from app.models.bill import Bill
+from app.services.pdf_service import BOLD_FONT_NAME, FONT_NAME, TAMIL_FONT_PATH, format_qty
+
+# Thermal receipt output for 58mm and 80mm counter printers.
+#
+# Two formats are built from the same Bill/BillItem data:
+#   * ESC/POS bytes sent straight to the printer
+#   * a narrow PDF (one long page) for printers driven through the OS
+# The static parts (init, shop header, dividers, cut) are compiled once per
+# paper width at import. Tamil text is never shaped at print time: each
+# distinct string is rasterised once into a 1-bit glyph strip and cached, and
+# both formats reuse that strip (GS v 0 raster for ESC/POS, an image in PDF).
+
+logger = logging.getLogger(__name__)
+
+SHOP_NAME = "Suji Vegetables"
+SHOP_ADDRESS = "Pondy - Tindivanam Main Raod, Kiliyanur"
+SHOP_PHONE = "Phone: +91 9095938085"
+
+PRINTER_DPI = 203
+TAMIL_FONT_PX = 22
+
+ESC_INIT = b"\x1b@"
+ESC_ALIGN_LEFT = b"\x1ba\x00"
+ESC_ALIGN_CENTER = b"\x1ba\x01"
+ESC_BOLD_ON = b"\x1bE\x01"
+ESC_BOLD_OFF = b"\x1bE\x00"
+ESC_DOUBLE_ON = b"\x1d!\x11"
+ESC_DOUBLE_OFF = b"\x1d!\x00"
+ESC_FEED_CUT = b"\x1dVB\x03"  # feed 3 lines, partial cut
+
+# C0 controls and DEL: ESC (0x1b), GS (0x1d), DLE (0x10)... would let a
+# customer or vegetable name send printer commands (cut, drawer kick)
+_CONTROL_CHARS = {code: " " for code in (*range(0x20), 0x7F)}
+
+PDF_MARGIN = 3 * mm
+PDF_FONT_SIZE = 8
+PDF_LEADING = 10
+
+
+@dataclass(frozen=True)
+class ReceiptTemplate:
+    width_mm: int
+    columns: int
+    dots: int
+    header: bytes
+    divider: bytes
+    footer: bytes
+
+
+@dataclass(frozen=True)
+class GlyphStrip:
+    width: int
+    height: int
+    escpos: bytes
+    image: ImageReader
+
+
+def _compile_template(width_mm: int, columns: int, dots: int) -> ReceiptTemplate:
+    divider = ("-" * columns + "\n").encode("ascii")
+    header = b"".join([
+        ESC_INIT,
+        ESC_ALIGN_CENTER,
+        ESC_BOLD_ON, ESC_DOUBLE_ON, SHOP_NAME.encode("ascii"), b"\n", ESC_DOUBLE_OFF, ESC_BOLD_OFF,
+        _wrap(SHOP_ADDRESS, columns).encode("ascii"),
+        SHOP_PHONE.encode("ascii"), b"\n",
+        ESC_ALIGN_LEFT,
+        divider,
+    ])
+    footer = b"".join([divider, ESC_ALIGN_CENTER, b"Thank you! Visit again\n", ESC_ALIGN_LEFT, ESC_FEED_CUT])
+    return ReceiptTemplate(width_mm, columns, dots, header, divider, footer)
+
+
+def _wrap(text: str, columns: int) -> str:
+    lines, line = [], ""
+    for word in text.split():
+        if line and len(line) + 1 + len(word) > columns:
+            lines.append(line)
+            line = word
+        else:
+            line = f"{line} {word}" if line else word
+    lines.append(line)
+    return "".join(f"{line}\n" for line in lines)
+
+
+TEMPLATES: Dict[int, ReceiptTemplate] = {
+    58: _compile_template(58, columns=32, dots=384),
+    80: _compile_template(80, columns=48, dots=576),
+}
+
+
+def _load_tamil_font() -> Optional[ImageFont.FreeTypeFont]:
+    layout = ImageFont.Layout.RAQM if features.check("raqm") else ImageFont.Layout.BASIC
+    try:
+        return ImageFont.truetype(TAMIL_FONT_PATH, TAMIL_FONT_PX, layout_engine=layout)
+    except OSError as e:
+        logger.warning(
+            "Tamil receipt font not loaded (%s): %s; receipts will print without Tamil names",
+            TAMIL_FONT_PATH, e
+        )
+        return None
+
+
+_tamil_font = _load_tamil_font()
+
+
+@lru_cache(maxsize=4096)
+def tamil_strip(text: str, max_dots: int) -> Optional[GlyphStrip]:
+    """Rasterise `text` once into a 1-bit strip no wider than the paper."""
+    if _tamil_font is None or not text:
+        return None
+    left, top, right, bottom = _tamil_font.getbbox(text)
+    width = min(max_dots, max(8, (right - left + 7) // 8 * 8))
+    height = max(1, bottom - top)
+    # Printer convention: bit set = black dot
+    bitmap = Image.new("1", (width, height), 0)
+    ImageDraw.Draw(bitmap).text((-left, -top), text, font=_tamil_font, fill=1)
+    raster = bitmap.tobytes()
+    escpos = b"\x1dv0\x00" + bytes([
+        (width // 8) & 0xFF, (width // 8) >> 8, height & 0xFF, height >> 8
+    ]) + raster
+    # Black on white copy for the PDF variant
+    image = ImageReader(bitmap.point(lambda value: 0 if value else 255).convert("L"))
+    return GlyphStrip(width, height, escpos, image)
+
+
+def _columns(left: str, right: str, columns: int) -> str:
+    space = max(1, columns - len(left) - len(right))
+    return f"{left}{' ' * space}{right}"[:columns]
+
+
+def _ascii(text: str) -> bytes:
+    """Printable ASCII only; user text must never carry ESC/POS commands."""
+    return text.translate(_CONTROL_CHARS).encode("ascii", "replace")
+
+
+def _receipt_lines(bill: Bill, columns: int) -> List[tuple]:
+    """
+    Layout shared by both formats: a list of (kind, value) where kind is
+    "text", "bold", "strip" (Tamil text), "divider", or "row"/"total" whose
+    value is a (left, right) pair printed flush to both edges.
+    """
+    lines = [
+        ("text", f"Bill No: {bill.bill_number}"),
+        ("text", f"Date: {bill.created_at.strftime('%d/%m/%Y %H:%M')}"),
+    ]
+    customer = bill.customer_name or "Walking Customer"
+    if customer.isascii():
+        lines.append(("text", f"Bill To: {customer}"[:columns]))
+    else:
+        lines.append(("text", "Bill To:"))
+        lines.append(("strip", customer))
+    if bill.customer_mobile:
+        lines.append(("text", f"Contact: {bill.customer_mobile}"))
+    lines.append(("text", f"Type: {bill.billing_type}"))
+    lines.append(("divider", None))
+
+    for item in bill.items:
+        lines.append(("bold", (item.vegetable_name or "")[:columns]))
+        if item.tamil_name:
+            lines.append(("strip", item.tamil_name))
+        lines.append(("row", (f"  {format_qty(item.qty_kg)} x {item.price:.2f}", f"{item.subtotal:.2f}")))
+
+    lines.append(("divider", None))
+    lines.append(("row", ("Subtotal", f"Rs.{bill.subtotal or 0.0:.2f}")))
+    if (bill.tax_amount or 0) > 0:
+        lines.append(("row", ("Tax", f"Rs.{bill.tax_amount:.2f}")))
+    if (bill.discount_amount or 0) > 0:
+        lines.append(("row", ("Discount", f"-Rs.{bill.discount_amount:.2f}")))
+    lines.append(("total", ("TOTAL", f"Rs.{bill.total_amount or 0.0:.2f}")))
+    return lines
+
+
+def render_escpos(bill: Bill, width_mm: int = 58) -> bytes:
+    template = TEMPLATES[width_mm]
+    out = [template.header]
+    for kind, value in _receipt_lines(bill, template.columns):
+        if kind == "divider":
+            out.append(template.divider)
+        elif kind == "strip":
+            strip = tamil_strip(value, template.dots)
+            if strip:
+                out.append(strip.escpos)
+        elif kind == "bold":
+            out.append(ESC_BOLD_ON + _ascii(value) + b"\n" + ESC_BOLD_OFF)
+        elif kind == "row":
+            out.append(_ascii(_columns(*value, template.columns)) + b"\n")
+        elif kind == "total":
+            # Double width halves the columns
+            out.append(ESC_BOLD_ON + ESC_DOUBLE_ON + _ascii(_columns(*value, template.columns // 2))
+                       + b"\n" + ESC_DOUBLE_OFF + ESC_BOLD_OFF)
+        else:
+            out.append(_ascii(value) + b"\n")
+    out.append(template.footer)
+    return b"".join(out)
+
+
+def render_receipt_pdf(bill: Bill, width_mm: int = 58) -> bytes:
+    """Single long page sized to the receipt, drawn directly on a canvas."""
+    template = TEMPLATES[width_mm]
+    lines = _receipt_lines(bill, template.columns)
+    dot = 72 / PRINTER_DPI
+    strips = {
+        value: tamil_strip(value, template.dots)
+        for kind, value in lines if kind == "strip"
+    }
+
+    header_height = 3 * PDF_LEADING + 2 * PDF_LEADING
+    body_height = 0
+    for kind, value in lines:
+        if kind == "strip":
+            strip = strips[value]
+            body_height += strip.height * dot + 2 if strip else 0
+        else:
+            body_height += 2 * PDF_LEADING if kind == "total" else PDF_LEADING
+    page_width = width_mm * mm
+    page_height = header_height + body_height + 2 * PDF_LEADING + 2 * PDF_MARGIN
+
+    buffer = BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=(page_width, page_height), pageCompression=1)
+    y = page_height - PDF_MARGIN - PDF_LEADING
+    center = page_width / 2
+    right = page_width - PDF_MARGIN
+
+    pdf.setFont(BOLD_FONT_NAME, PDF_FONT_SIZE + 4)
+    pdf.drawCentredString(center, y, SHOP_NAME)
+    y -= PDF_LEADING + 4
+    pdf.setFont(FONT_NAME, PDF_FONT_SIZE - 1)
+    for text in (SHOP_ADDRESS, SHOP_PHONE):
+        pdf.drawCentredString(center, y, text)
+        y -= PDF_LEADING
+    pdf.line(PDF_MARGIN, y + PDF_LEADING / 2, right, y + PDF_LEADING / 2)
+    y -= PDF_LEADING / 2
+
+    for kind, value in lines:
+        if kind == "divider":
+            pdf.setDash(1, 2)
+            pdf.line(PDF_MARGIN, y + PDF_LEADING / 2, right, y + PDF_LEADING / 2)
+            pdf.setDash()
+            y -= PDF_LEADING
+        elif kind == "strip":
+            strip = strips[value]
+            if strip:
+                height = strip.height * dot
+                pdf.drawImage(strip.image, PDF_MARGIN, y - height + PDF_FONT_SIZE, strip.width * dot, height)
+                y -= height + 2
+        elif kind == "total":
+            pdf.setFont(BOLD_FONT_NAME, PDF_FONT_SIZE * 2)
+            pdf.drawString(PDF_MARGIN, y - PDF_LEADING, value[0])
+            pdf.drawRightString(right, y - PDF_LEADING, value[1])
+            y -= 2 * PDF_LEADING
+        elif kind == "row":
+            pdf.setFont(FONT_NAME, PDF_FONT_SIZE)
+            pdf.drawString(PDF_MARGIN, y, value[0])
+            pdf.drawRightString(right, y, value[1])
+            y -= PDF_LEADING
+        else:
+            pdf.setFont(BOLD_FONT_NAME if kind == "bold" else FONT_NAME, PDF_FONT_SIZE)
+            pdf.drawString(PDF_MARGIN, y, value)
+            y -= PDF_LEADING
+
+    pdf.setFont(FONT_NAME, PDF_FONT_SIZE)
+    pdf.drawCentredString(center, y - PDF_LEADING / 2, "Thank you! Visit again")
+    pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
@@ -0,0 +1,178 @@
+from collections import defaultdict
+from datetime import date
+from typing import Dict, List, Optional
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.models.bill import Bill, BillItem
+from app.models.sales_rollup import DailySalesRollup, DailyVegetableRollup
+
+# Tolerance used by the consistency checker when comparing float sums
+AMOUNT_TOLERANCE = 0.01
+
+
+def apply_bill_to_rollup(
+    db: Session,
+    user_id: int,
+    day: date,
+    billing_type: str,
+    total_amount: float,
+    lines: List[dict],
+    sign: int = 1
+):
+    """
+    Add (sign=1) or remove (sign=-1) one bill's contribution to the daily
+    rollups. `lines` are dicts with vegetable_id, vegetable_name and qty_kg,
+    i.e. the same rows that were inserted into bill_items.
+    Issues at most two upserts regardless of the number of lines.
+    """
+    sales = pg_insert(DailySalesRollup).values(
+        user_id=user_id,
+        date=day,
+        billing_type=billing_type or "Retail",
+        bill_count=sign,
+        total_amount=sign * (total_amount or 0.0)
+    )
+    db.execute(sales.on_conflict_do_update(
+        index_elements=[DailySalesRollup.user_id, DailySalesRollup.date, DailySalesRollup.billing_type],
+        set_={
+            "bill_count": DailySalesRollup.bill_count + sales.excluded.bill_count,
+            "total_amount": DailySalesRollup.total_amount + sales.excluded.total_amount,
+        }
+    ))
+
+    per_vegetable: Dict[int, dict] = {}
+    for line in lines:
+        row = per_vegetable.setdefault(line["vegetable_id"], {
+            "user_id": user_id,
+            "date": day,
+            "vegetable_id": line["vegetable_id"],
+            "vegetable_name": line["vegetable_name"],
+            "line_count": 0,
+            "qty_kg": 0.0,
+        })
+        row["line_count"] += sign
+        row["qty_kg"] += sign * (line["qty_kg"] or 0.0)
+    if not per_vegetable:
+        return
+
+    vegetables = pg_insert(DailyVegetableRollup).values(
+        [per_vegetable[veg_id] for veg_id in sorted(per_vegetable)]
+    )
+    db.execute(vegetables.on_conflict_do_update(
+        index_elements=[DailyVegetableRollup.user_id, DailyVegetableRollup.date, DailyVegetableRollup.vegetable_id],
+        set_={
+            "vegetable_name": vegetables.excluded.vegetable_name,
+            "line_count": DailyVegetableRollup.line_count + vegetables.excluded.line_count,
+            "qty_kg": DailyVegetableRollup.qty_kg + vegetables.excluded.qty_kg,
+        }
+    ))
+
+
+def _raw_sales_query(user_id: Optional[int]):
+    bill_date = func.date(Bill.created_at)
+    query = select(
+        Bill.user_id,
+        bill_date.label("date"),
+        func.coalesce(Bill.billing_type, "Retail").label("billing_type"),
+        func.count(Bill.id).label("bill_count"),
+        func.coalesce(func.sum(Bill.total_amount), 0.0).label("total_amount")
+    ).where(Bill.user_id.isnot(None), Bill.created_at.isnot(None))
+    if user_id is not None:
+        query = query.where(Bill.user_id == user_id)
+    return query.group_by(Bill.user_id, bill_date, func.coalesce(Bill.billing_type, "Retail"))
+
+
+def _raw_vegetable_query(user_id: Optional[int]):
+    bill_date = func.date(Bill.created_at)
+    query = select(
+        Bill.user_id,
+        bill_date.label("date"),
+        BillItem.vegetable_id,
+        func.max(BillItem.vegetable_name).label("vegetable_name"),
+        func.count(BillItem.id).label("line_count"),
+        func.coalesce(func.sum(BillItem.qty_kg), 0.0).label("qty_kg")
+    ).join(Bill, BillItem.bill_id == Bill.id).where(
+        Bill.user_id.isnot(None),
+        Bill.created_at.isnot(None),
+        BillItem.vegetable_id.isnot(None)
+    )
+    if user_id is not None:
+        query = query.where(Bill.user_id == user_id)
+    return query.group_by(Bill.user_id, bill_date, BillItem.vegetable_id)
+
+
+def rebuild_rollup(db: Session, user_id: Optional[int] = None):
+    """
+    Recompute the rollups from raw bills, for one shop or for all shops.
+    Used for the initial backfill and to repair drift found by check_rollup.
+    """
+    sales_delete = delete(DailySalesRollup)
+    vegetable_delete = delete(DailyVegetableRollup)
+    if user_id is not None:
+        sales_delete = sales_delete.where(DailySalesRollup.user_id == user_id)
+        vegetable_delete = vegetable_delete.where(DailyVegetableRollup.user_id == user_id)
+    db.execute(sales_delete)
+    db.execute(vegetable_delete)
+
+    db.execute(insert(DailySalesRollup).from_select(
+        ["user_id", "date", "billing_type", "bill_count", "total_amount"],
+        _raw_sales_query(user_id)
+    ))
+    db.execute(insert(DailyVegetableRollup).from_select(
+        ["user_id", "date", "vegetable_id", "vegetable_name", "line_count", "qty_kg"],
+        _raw_vegetable_query(user_id)
+    ))
+    db.commit()
+
+
+def check_rollup(db: Session, user_id: Optional[int] = None) -> List[str]:
+    """
+    Compare the rollups with aggregates computed from raw bills.
+    Returns a list of human readable mismatches (empty when consistent).
+    Rollup rows that net out to zero (e.g. after an edit moved every line
+    away) are treated the same as missing rows.
+    """
+    problems = []
+
+    expected = defaultdict(lambda: (0, 0.0))
+    for row in db.execute(_raw_sales_query(user_id)):
+        expected[(row.user_id, row.date, row.billing_type)] = (row.bill_count, row.total_amount)
+    actual = defaultdict(lambda: (0, 0.0))
+    query = db.query(DailySalesRollup)
+    if user_id is not None:
+        query = query.filter(DailySalesRollup.user_id == user_id)
+    for row in query:
+        actual[(row.user_id, row.date, row.billing_type)] = (row.bill_count, row.total_amount)
+
+    for key in sorted(set(expected) | set(actual), key=str):
+        exp_count, exp_total = expected[key]
+        act_count, act_total = actual[key]
+        if exp_count != act_count or abs(exp_total - act_total) > AMOUNT_TOLERANCE:
+            problems.append(
+                f"sales {key}: bills expected={exp_count} actual={act_count}, "
+                f"total expected={exp_total:.2f} actual={act_total:.2f}"
+            )
+
+    expected = defaultdict(lambda: (0, 0.0))
+    for row in db.execute(_raw_vegetable_query(user_id)):
+        expected[(row.user_id, row.date, row.vegetable_id)] = (row.line_count, row.qty_kg)
+    actual = defaultdict(lambda: (0, 0.0))
+    query = db.query(DailyVegetableRollup)
+    if user_id is not None:
+        query = query.filter(DailyVegetableRollup.user_id == user_id)
+    for row in query:
+        actual[(row.user_id, row.date, row.vegetable_id)] = (row.line_count, row.qty_kg)
+
+    for key in sorted(set(expected) | set(actual), key=str):
+        exp_count, exp_qty = expected[key]
+        act_count, act_qty = actual[key]
+        if exp_count != act_count or abs(exp_qty - act_qty) > AMOUNT_TOLERANCE:
+            problems.append(
+                f"vegetable {key}: lines expected={exp_count} actual={act_count}, "
+                f"qty expected={exp_qty:.3f} actual={act_qty:.3f}"
+            )
+
+    return problems
@@ -0,0 +1,274 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import column, func, insert, literal, select, update, values, Float, Integer
+from sqlalchemy.orm import Session
+
+from app.core import config
+from app.database.database import AsyncSessionLocal
+from app.models.inventory import Inventory
+from app.models.stock_movement import StockMovement
+
+# Stock changes are appended to stock_movements instead of rewriting
+# inventory.stock_kg, so concurrent counters selling the same vegetable only
+# insert rows and never queue on the inventory row. Current stock is the
+# snapshot in inventory.stock_kg plus the uncompacted tail of movements;
+# compact_stock_movements periodically folds that tail into the snapshot.
+#
+# Compaction marks the movements it folds (compacted = true) in the same
+# statement that adds them to the snapshot, so a movement whose transaction
+# commits while compaction runs is simply picked up by the next pass.
+#
+# Shops choose what a sale beyond stock does (users.oversell_policy):
+#   allow   append the sale to the ledger only; stock may go negative and no
+#           inventory row is touched, so counters never wait on each other
+#   warn    decrement the snapshot atomically and report lines that went
+#           below zero, but keep the bill
+#   reject  decrement atomically and refuse the whole bill if any line went
+#           below zero (StockShortage, rolled back by the caller)
+# warn and reject hold the sold rows' locks until the bill commits, which is
+# the price of an exact check.
+
+logger = logging.getLogger(__name__)
+
+SALE = "sale"
+RECEIPT = "receipt"
+ADJUSTMENT = "adjustment"
+WASTAGE = "wastage"
+KINDS = (SALE, RECEIPT, ADJUSTMENT, WASTAGE)
+
+OVERSELL_ALLOW = "allow"
+OVERSELL_WARN = "warn"
+OVERSELL_REJECT = "reject"
+OVERSELL_POLICIES = (OVERSELL_ALLOW, OVERSELL_WARN, OVERSELL_REJECT)
+
+# Float slack when deciding whether a line oversold
+STOCK_TOLERANCE = 1e-6
+
+
+class StockShortage(Exception):
+    def __init__(self, shortages: List[dict]):
+        super().__init__("Not enough stock")
+        self.shortages = shortages
+
+
+# Any constant works; only one session may compact at a time
+_COMPACTION_LOCK_ID = 0x5707C4
+
+
+def pending_stock(user_id: Optional[int] = None):
+    """Subquery of (user_id, vegetable_id, qty_kg) for movements not folded into the snapshot yet."""
+    query = select(
+        StockMovement.user_id,
+        StockMovement.vegetable_id,
+        func.sum(StockMovement.qty_kg).label("qty_kg")
+    ).where(StockMovement.compacted.is_(False))
+    if user_id is not None:
+        query = query.where(StockMovement.user_id == user_id)
+    return query.group_by(StockMovement.user_id, StockMovement.vegetable_id).subquery("pending")
+
+
+def with_current_stock(query, pending):
+    """
+    Outer-join `pending` onto a query over Inventory. Select
+    current_stock(pending) in it to read snapshot + tail.
+    """
+    return query.outerjoin(pending, (pending.c.user_id == Inventory.user_id) & (
+        pending.c.vegetable_id == Inventory.vegetable_id
+    ))
+
+
+def current_stock(pending):
+    return Inventory.stock_kg + func.coalesce(pending.c.qty_kg, 0.0)
+
+
+def record_sales(db: Session, user_id: int, bill_id: int, quantities: Dict[int, float], at: datetime = None,
+                 compacted: bool = False):
+    """
+    Append one sale movement per sold vegetable in a single INSERT ... SELECT.
+    Vegetables the shop has no inventory row for are skipped, as before.
+    Pass compacted=True when the snapshot already has the sale taken off.
+    """
+    if not quantities:
+        return
+    sold = values(column("vegetable_id", Integer), column("qty", Float), name="sold").data(
+        sorted(quantities.items())
+    )
+    db.execute(insert(StockMovement).from_select(
+        ["user_id", "vegetable_id", "kind", "qty_kg", "bill_id", "created_at", "compacted"],
+        select(
+            Inventory.user_id, Inventory.vegetable_id, literal(SALE), -sold.c.qty,
+            literal(bill_id), literal(at or datetime.utcnow()), literal(compacted)
+        ).join(sold, sold.c.vegetable_id == Inventory.vegetable_id).where(Inventory.user_id == user_id)
+    ))
+
+
+def decrement_stock(db: Session, user_id: int, quantities: Dict[int, float]) -> List[dict]:
+    """
+    Take every sold quantity off the snapshot in one UPDATE ... FROM ...
+    RETURNING, folding the rows' pending movements in first so the result is
+    the true remaining stock. Rows are locked until the caller commits;
+    lines are sent in vegetable_id order so overlapping bills lock rows in
+    the same order. Returns the lines that went below zero as dicts with
+    vegetable_id, requested and available.
+    """
+    if not quantities:
+        return []
+    vegetable_ids = sorted(quantities)
+    sold = values(column("vegetable_id", Integer), column("qty", Float), name="sold").data(
+        [(veg_id, quantities[veg_id]) for veg_id in vegetable_ids]
+    )
+    folded = update(StockMovement).where(
+        StockMovement.user_id == user_id,
+        StockMovement.vegetable_id.in_(vegetable_ids),
+        StockMovement.compacted.is_(False)
+    ).values(compacted=True).returning(StockMovement.vegetable_id, StockMovement.qty_kg).cte("folded")
+    tail = select(
+        folded.c.vegetable_id, func.sum(folded.c.qty_kg).label("qty_kg")
+    ).group_by(folded.c.vegetable_id).cte("tail")
+    lines = select(
+        sold.c.vegetable_id, sold.c.qty, func.coalesce(tail.c.qty_kg, 0.0).label("pending")
+    ).select_from(sold.outerjoin(tail, tail.c.vegetable_id == sold.c.vegetable_id)).subquery("lines")
+
+    remaining = db.execute(
+        update(Inventory)
+        .where(Inventory.user_id == user_id, Inventory.vegetable_id == lines.c.vegetable_id)
+        .values(stock_kg=Inventory.stock_kg + lines.c.pending - lines.c.qty)
+        .returning(Inventory.vegetable_id, Inventory.stock_kg, lines.c.qty),
+        execution_options={"synchronize_session": False}
+    )
+    return [
+        {"vegetable_id": veg_id, "requested": qty, "available": stock + qty}
+        for veg_id, stock, qty in remaining
+        if stock < -STOCK_TOLERANCE
+    ]
+
+
+def apply_sale(db: Session, user_id: int, bill_id: int, quantities: Dict[int, float],
+               policy: str = OVERSELL_ALLOW) -> List[dict]:
+    """
+    Book a bill's sold quantities under the shop's oversell policy.
+    Returns the oversold lines (always empty for allow); raises
+    StockShortage instead under reject.
+    """
+    if policy not in (OVERSELL_WARN, OVERSELL_REJECT):
+        record_sales(db, user_id, bill_id, quantities)
+        return []
+    shortages = decrement_stock(db, user_id, quantities)
+    if shortages and policy == OVERSELL_REJECT:
+        raise StockShortage(shortages)
+    record_sales(db, user_id, bill_id, quantities, compacted=True)
+    return shortages
+
+
+def record_movements(db: Session, user_id: int, rows: List[dict]):
+    """Append receipts, wastage or adjustments (dicts with vegetable_id, kind, qty_kg, note) in one INSERT."""
+    if not rows:
+        return
+    now = datetime.utcnow()
+    db.execute(insert(StockMovement), [
+        {"note": None, **row, "user_id": user_id, "created_at": now} for row in rows
+    ])
+
+
+def set_stock_levels(db: Session, user_id: int, levels: Dict[int, float], note: Optional[str] = None):
+    """
+    Record counted stock levels (setup, bulk sync, manual edits) as adjustment
+    movements of (counted - current) in a single INSERT ... SELECT.
+    Vegetables without an inventory row and unchanged levels are skipped.
+    """
+    if not levels:
+        return
+    counted = values(column("vegetable_id", Integer), column("qty", Float), name="counted").data(
+        sorted(levels.items())
+    )
+    pending = pending_stock(user_id)
+    delta = counted.c.qty - current_stock(pending)
+    db.execute(insert(StockMovement).from_select(
+        ["user_id", "vegetable_id", "kind", "qty_kg", "note", "created_at"],
+        with_current_stock(
+            select(
+                Inventory.user_id, Inventory.vegetable_id, literal(ADJUSTMENT), delta,
+                literal(note), literal(datetime.utcnow())
+            ).join(counted, counted.c.vegetable_id == Inventory.vegetable_id),
+            pending
+        ).where(Inventory.user_id == user_id, delta != 0)
+    ))
+
+
+def compact_stock_movements(db: Session, user_id: Optional[int] = None) -> int:
+    """
+    Fold uncompacted movements into inventory.stock_kg in one statement and
+    mark them compacted. Returns the number of inventory rows updated, or 0
+    if another session is compacting right now. The caller commits.
+    """
+    if not db.execute(select(func.pg_try_advisory_xact_lock(_COMPACTION_LOCK_ID))).scalar():
+        return 0
+    folded = update(StockMovement).where(StockMovement.compacted.is_(False))
+    if user_id is not None:
+        folded = folded.where(StockMovement.user_id == user_id)
+    folded = folded.values(compacted=True).returning(
+        StockMovement.user_id, StockMovement.vegetable_id, StockMovement.qty_kg
+    ).cte("folded")
+    totals = select(
+        folded.c.user_id, folded.c.vegetable_id, func.sum(folded.c.qty_kg).label("qty_kg")
+    ).group_by(folded.c.user_id, folded.c.vegetable_id).cte("totals")
+    result = db.execute(
+        update(Inventory)
+        .where(Inventory.user_id == totals.c.user_id, Inventory.vegetable_id == totals.c.vegetable_id)
+        .values(stock_kg=Inventory.stock_kg + totals.c.qty_kg),
+        execution_options={"synchronize_session": False}
+    )
+    return result.rowcount
+
+
+def stock_report(db: Session, user_id: int, start: datetime, end: datetime) -> Dict[int, Dict[str, float]]:
+    """
+    Net kg per vegetable and movement kind for [start, end), read with an
+    index-only scan of ix_stock_movements_user_created.
+    """
+    rows = db.execute(
+        select(StockMovement.vegetable_id, StockMovement.kind, func.sum(StockMovement.qty_kg))
+        .where(
+            StockMovement.user_id == user_id,
+            StockMovement.created_at >= start,
+            StockMovement.created_at < end
+        )
+        .group_by(StockMovement.vegetable_id, StockMovement.kind)
+    )
+    report: Dict[int, Dict[str, float]] = {}
+    for vegetable_id, kind, qty in rows:
+        report.setdefault(vegetable_id, {})[kind] = qty
+    return report
+
+
+_compactor: Optional[asyncio.Task] = None
+
+
+async def _compact_forever(interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with AsyncSessionLocal() as db:
+                rows = await db.run_sync(compact_stock_movements)
+                await db.commit()
+            if rows:
+                logger.debug("Compacted stock movements into %d inventory rows", rows)
+        except Exception:
+            logger.exception("Stock ledger compaction failed; retrying in %ss", interval)
+
+
+def start_compactor():
+    """Run compaction every STOCK_COMPACT_INTERVAL seconds in this worker (0 disables)."""
+    global _compactor
+    if config.STOCK_COMPACT_INTERVAL > 0 and _compactor is None:
+        _compactor = asyncio.get_running_loop().create_task(_compact_forever(config.STOCK_COMPACT_INTERVAL))
+
+
+def stop_compactor():
+    global _compactor
+    if _compactor is not None:
+        _compactor.cancel()
+        _compactor = None
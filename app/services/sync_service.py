@@ -0,0 +1,163 @@
+from datetime import datetime
+from typing import Iterable, Optional, Tuple
+
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.models.catalog_version import CatalogVersion
+from app.models.inventory import Inventory, InventoryTombstone
+from app.models.stock_movement import StockMovement
+from app.models.vegetable import Vegetable
+from app.services.inventory_service import list_inventory
+
+# Delta sync for POS clients. Writes that change what GET /inventory or
+# GET /vegetables return stamp the rows with a revision: inventory rows and
+# tombstones from the shop's own counter (catalog_versions "sync:<user_id>"),
+# master list rows from the catalog counter ("sync:vegetables"). Taking a
+# revision locks that counter row until commit, so revisions become visible
+# in order and a cursor never skips a write that commits later. Only writers
+# of the same shop (or of the master list) queue on it; take it last, right
+# before commit, to keep that window short.
+#
+# Sales never touch the inventory row (see stock_ledger_service), so they
+# are tracked through the ledger instead: every movement carries the id of
+# the transaction that wrote it, and a sync returns the rows of vegetables
+# moved by any transaction not yet finished when the previous sync read.
+#
+# The client's cursor is "<shop revision>.<catalog revision>.<ledger xmin>";
+# it is opaque to the client, which only sends back the last one it got.
+
+CATALOG_SYNC_NAME = "sync:vegetables"
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _sync_name(user_id: int) -> str:
+    return f"sync:{user_id}"
+
+
+def _next(db: Session, name: str) -> int:
+    stmt = pg_insert(CatalogVersion).values(name=name, version=1)
+    return db.execute(stmt.on_conflict_do_update(
+        index_elements=[CatalogVersion.name],
+        set_={"version": CatalogVersion.version + 1}
+    ).returning(CatalogVersion.version)).scalar_one()
+
+
+def next_revision(db: Session, user_id: int) -> int:
+    """Allocate the shop's next sync revision for this transaction's writes."""
+    return _next(db, _sync_name(user_id))
+
+
+def next_catalog_revision(db: Session) -> int:
+    """Allocate the master list's next sync revision for this transaction's writes."""
+    return _next(db, CATALOG_SYNC_NAME)
+
+
+def current_revisions(db: Session, user_id: int) -> Tuple[int, int]:
+    """The shop's and the master list's latest revisions."""
+    versions = dict(db.query(CatalogVersion.name, CatalogVersion.version).filter(
+        CatalogVersion.name.in_([_sync_name(user_id), CATALOG_SYNC_NAME])
+    ).all())
+    return versions.get(_sync_name(user_id), 0), versions.get(CATALOG_SYNC_NAME, 0)
+
+
+def stamp_inventory(db: Session, user_id: int, vegetable_ids: Iterable[int], revision: Optional[int] = None) -> int:
+    """Mark the shop's rows for `vegetable_ids` as changed at `revision` (allocated if None); returns it."""
+    vegetable_ids = sorted(set(vegetable_ids))
+    revision = revision or next_revision(db, user_id)
+    if vegetable_ids:
+        db.execute(
+            update(Inventory)
+            .where(Inventory.user_id == user_id, Inventory.vegetable_id.in_(vegetable_ids))
+            .values(revision=revision),
+            execution_options={"synchronize_session": False}
+        )
+    return revision
+
+
+def stamp_vegetables(db: Session, vegetable_ids: Iterable[int], revision: Optional[int] = None) -> int:
+    """Mark master list rows as changed at `revision` (allocated if None); returns it."""
+    vegetable_ids = sorted(set(vegetable_ids))
+    revision = revision or next_catalog_revision(db)
+    if vegetable_ids:
+        db.execute(
+            update(Vegetable).where(Vegetable.id.in_(vegetable_ids)).values(revision=revision),
+            execution_options={"synchronize_session": False}
+        )
+    return revision
+
+
+def mark_deleted(db: Session, user_id: int, vegetable_id: int, revision: Optional[int] = None) -> int:
+    """Leave a tombstone for a deleted inventory item; returns the revision."""
+    revision = revision or next_revision(db, user_id)
+    stmt = pg_insert(InventoryTombstone).values(
+        user_id=user_id, vegetable_id=vegetable_id, revision=revision, deleted_at=datetime.utcnow()
+    )
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[InventoryTombstone.user_id, InventoryTombstone.vegetable_id],
+        set_={"revision": stmt.excluded.revision, "deleted_at": stmt.excluded.deleted_at}
+    ))
+    return revision
+
+
+def parse_cursor(cursor: Optional[str]) -> Optional[Tuple[int, int, int]]:
+    """(shop, catalog, ledger) from a cursor, or None for a first sync ("" or "0")."""
+    if not cursor or cursor == "0":
+        return None
+    try:
+        parts = tuple(int(part) for part in cursor.split("."))
+    except ValueError:
+        raise InvalidCursor(cursor)
+    if len(parts) != 3 or min(parts) < 0:
+        raise InvalidCursor(cursor)
+    return parts
+
+
+def changes_since(db: Session, user_id: int, cursor: Optional[str]) -> dict:
+    """
+    Inventory rows, deleted vegetable ids and master list rows changed after
+    `cursor`, plus the cursor to send next time. No cursor, or one ahead of
+    the server (e.g. after a database reset), returns everything with
+    full=True and no tombstones. Raises InvalidCursor for a malformed one.
+    """
+    since = parse_cursor(cursor)
+    # Read the counters first: a write that commits meanwhile is at most sent twice, never missed
+    revision, catalog_revision = current_revisions(db, user_id)
+    # Every transaction older than this had finished when the reads below started
+    ledger_xmin = db.execute(select(func.txid_snapshot_xmin(func.txid_current_snapshot()))).scalar_one()
+    full = since is None or since[0] > revision or since[1] > catalog_revision or since[2] > ledger_xmin
+
+    deleted = []
+    moved = []
+    if not full:
+        shop_since, catalog_since, ledger_since = since
+        deleted = list(db.execute(
+            select(InventoryTombstone.vegetable_id)
+            .where(InventoryTombstone.user_id == user_id, InventoryTombstone.revision > shop_since)
+            # Deleted and added back: the live row is sent instead
+            .where(~select(Inventory.id).where(
+                Inventory.user_id == user_id, Inventory.vegetable_id == InventoryTombstone.vegetable_id
+            ).exists())
+            .order_by(InventoryTombstone.vegetable_id)
+        ).scalars())
+        # Stock sold, received or adjusted since: an index-only scan of ix_stock_movements_user_txid
+        moved = list(db.execute(
+            select(StockMovement.vegetable_id).distinct()
+            .where(StockMovement.user_id == user_id, StockMovement.txid >= ledger_since)
+        ).scalars())
+
+    vegetables = select(Vegetable).order_by(Vegetable.id)
+    if not full:
+        vegetables = vegetables.where(Vegetable.revision > catalog_since)
+
+    return {
+        "cursor": f"{revision}.{catalog_revision}.{ledger_xmin}",
+        "full": full,
+        "inventory": list_inventory(db, user_id, None if full else shop_since, moved),
+        "deleted": deleted,
+        "vegetables": db.execute(vegetables).scalars().all(),
+    }
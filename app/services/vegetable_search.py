@@ -0,0 +1,225 @@
+import heapq
+import math
+import re
+import threading
+import unicodedata
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from itertools import chain
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models.usage import VegetableUsage
+from app.services.catalog_cache import CatalogSnapshot, get_catalog
+
+# In-memory type-ahead index over English, Tamil and Tanglish vegetable names.
+#
+# Counter staff type things like "vendakai" or "thakali", so Latin-script keys
+# are also folded phonetically (doubled letters, th/dh, long vowels) before
+# indexing. Lookups go through two structures:
+#   * a sorted list of unique keys, searched with bisect, for exact and prefix hits
+#   * a trigram -> key postings map, for typo tolerant candidates that are
+#     then verified with a banded edit distance
+# Results are ranked by match quality, then boosted by the shop's usage counts.
+
+MAX_FUZZY_CANDIDATES = 25
+
+SCORE_EXACT = 100.0
+SCORE_PREFIX = 80.0
+SCORE_WORD_PREFIX = 70.0
+SCORE_SUBSTRING = 55.0
+SCORE_FUZZY = 50.0
+FUZZY_PENALTY = 12.0
+USAGE_WEIGHT = 3.0
+
+_LATIN_FOLDS = [
+    (re.compile(r"(.)\1+"), r"\1"),   # kk -> k, ll -> l, ee -> e
+    (re.compile(r"th"), "t"),
+    (re.compile(r"dh"), "d"),
+    (re.compile(r"zh"), "l"),
+    (re.compile(r"sh"), "s"),
+    (re.compile(r"w"), "v"),
+    (re.compile(r"y$"), "i"),
+]
+_NON_WORD = re.compile(r"[^\w\s]+")
+
+
+def normalize(text: str) -> str:
+    """Lowercase, strip punctuation and collapse whitespace. Tamil letters are kept as-is."""
+    text = unicodedata.normalize("NFC", text or "").lower()
+    return " ".join(_NON_WORD.sub(" ", text).split())
+
+
+def fold_latin(text: str) -> str:
+    """Phonetic folding for romanised (English/Tanglish) text."""
+    if not text.isascii():
+        return text
+    for pattern, replacement in _LATIN_FOLDS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+def trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def bounded_edit_distance(a: str, b: str, limit: int) -> int:
+    """
+    Levenshtein distance restricted to a diagonal band of width `limit`,
+    returning limit + 1 as soon as the distance must exceed it.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    over = limit + 1
+    previous = [j if j <= limit else over for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        char_a = a[i - 1]
+        low = max(1, i - limit)
+        high = min(len(b), i + limit)
+        current = [over] * (len(b) + 1)
+        if i <= limit:
+            current[0] = i
+        row_min = current[0]
+        for j in range(low, high + 1):
+            cost = previous[j - 1] + (char_a != b[j - 1])
+            if previous[j] + 1 < cost:
+                cost = previous[j] + 1
+            if current[j - 1] + 1 < cost:
+                cost = current[j - 1] + 1
+            current[j] = cost
+            if cost < row_min:
+                row_min = cost
+        if row_min > limit:
+            return over
+        previous = current
+    return min(previous[-1], over)
+
+
+def typo_budget(query: str) -> int:
+    if len(query) <= 3:
+        return 0
+    if len(query) <= 6:
+        return 1
+    return 2
+
+
+class VegetableSearchIndex:
+    def __init__(self, vegetables: Sequence):
+        self.vegetables = {veg.id: veg for veg in vegetables}
+        self.names = {veg.id: veg.name for veg in vegetables}
+        key_vegetables: Dict[str, Dict[int, bool]] = defaultdict(dict)
+        for veg in vegetables:
+            for source in (veg.name, veg.tamil_name, getattr(veg, "tanglish_name", None)):
+                full = normalize(source)
+                if not full:
+                    continue
+                full_keys = {full, fold_latin(full), full.replace(" ", "")}
+                keys = set(full_keys)
+                for word in full.split():
+                    keys.add(word)
+                    keys.add(fold_latin(word))
+                for key in keys:
+                    is_full = key in full_keys
+                    key_vegetables[key][veg.id] = key_vegetables[key].get(veg.id, False) or is_full
+
+        # Unique keys, sorted for bisect prefix scans. Shared words ("tomato")
+        # are stored once and fan out to every vegetable that contains them.
+        self.keys: List[str] = sorted(key_vegetables)
+        self.key_vegetables: List[Tuple[Tuple[int, bool], ...]] = [
+            tuple(key_vegetables[key].items()) for key in self.keys
+        ]
+        postings = defaultdict(list)
+        for key_id, key in enumerate(self.keys):
+            for gram in trigrams(key):
+                postings[gram].append(key_id)
+        # Grams shared by a large share of keys carry no signal; skip them when counting
+        stop_size = max(50, len(self.keys) // 5)
+        self.postings: Dict[str, Tuple[int, ...]] = {
+            gram: tuple(ids) for gram, ids in postings.items() if len(ids) <= stop_size
+        }
+
+    def _score_key(self, key_id: int, score: float, exact_score: float, scores: Dict[int, float]):
+        for veg_id, is_full in self.key_vegetables[key_id]:
+            value = exact_score if is_full else score
+            if value > scores.get(veg_id, 0.0):
+                scores[veg_id] = value
+
+    def _prefix_hits(self, query: str, scores: Dict[int, float]):
+        start = bisect_left(self.keys, query)
+        for key_id in range(start, len(self.keys)):
+            key = self.keys[key_id]
+            if not key.startswith(query):
+                break
+            if key == query:
+                self._score_key(key_id, SCORE_PREFIX + 5, SCORE_EXACT, scores)
+            else:
+                self._score_key(key_id, SCORE_WORD_PREFIX, SCORE_PREFIX, scores)
+
+    def _fuzzy_hits(self, query: str, scores: Dict[int, float]):
+        grams = trigrams(query)
+        overlap = Counter(chain.from_iterable(self.postings.get(gram, ()) for gram in grams))
+        if not overlap:
+            return
+        limit = typo_budget(query)
+        # q-gram lemma: every edit destroys at most 3 trigrams
+        required = max(1, len(grams) - 3 * max(limit, 1))
+        for key_id, shared in overlap.most_common(MAX_FUZZY_CANDIDATES):
+            if shared < required:
+                break
+            key = self.keys[key_id]
+            if query in key:
+                self._score_key(key_id, SCORE_SUBSTRING, SCORE_SUBSTRING, scores)
+            elif limit:
+                # Compare against the key's prefix too, so half-typed words still match
+                target = key[:len(query)] if len(key) > len(query) + limit else key
+                distance = bounded_edit_distance(query, target, limit)
+                if distance <= limit:
+                    value = SCORE_FUZZY - FUZZY_PENALTY * distance
+                    self._score_key(key_id, value, value, scores)
+
+    def search(self, text: str, limit: int = 10, usage: Optional[Dict[int, int]] = None) -> List:
+        query = normalize(text)
+        if not query:
+            return []
+        scores: Dict[int, float] = {}
+        variants = {query, fold_latin(query), query.replace(" ", "")}
+        for variant in variants:
+            self._prefix_hits(variant, scores)
+        if len(scores) < limit:
+            for variant in variants:
+                if len(variant) >= 3:
+                    self._fuzzy_hits(variant, scores)
+
+        usage = usage or {}
+        names = self.names
+        ranked = heapq.nsmallest(limit, [
+            (-(score + USAGE_WEIGHT * math.log1p(usage.get(veg_id, 0))), names[veg_id], veg_id)
+            for veg_id, score in scores.items()
+        ])
+        return [self.vegetables[veg_id] for _, _, veg_id in ranked]
+
+
+_lock = threading.Lock()
+_index: Optional[Tuple[int, VegetableSearchIndex]] = None
+
+
+def get_search_index(db: Session = None, catalog: CatalogSnapshot = None) -> VegetableSearchIndex:
+    """Search index for the current catalog snapshot, rebuilt only when the catalog version changes."""
+    global _index
+    catalog = catalog or get_catalog(db)
+    cached = _index
+    if cached is not None and cached[0] == catalog.version:
+        return cached[1]
+    with _lock:
+        if _index is None or _index[0] != catalog.version:
+            _index = (catalog.version, VegetableSearchIndex(catalog.vegetables))
+        return _index[1]
+
+
+def shop_usage_counts(db: Session, user_id: int) -> Dict[int, int]:
+    rows = db.query(VegetableUsage.vegetable_id, VegetableUsage.usage_count)\
+        .filter(VegetableUsage.user_id == user_id)\
+        .all()
+    return {veg_id: count or 0 for veg_id, count in rows}
@@ -0,0 +1,21 @@
+from typing import Optional
+
+from fastapi import Request, Response, status
+
+
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    """Return a 304 response if the client's If-None-Match already matches etag."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        candidates = {tag.strip() for tag in if_none_match.split(",")}
+        if etag in candidates or f"W/{etag}" in candidates or "*" in candidates:
+            response = Response(status_code=status.HTTP_304_NOT_MODIFIED)
+            set_etag(response, etag)
+            return response
+    return None
+
+
+def set_etag(response: Response, etag: str):
+    response.headers["ETag"] = etag
+    # Let clients keep the body but always revalidate with If-None-Match
+    response.headers["Cache-Control"] = "no-cache"
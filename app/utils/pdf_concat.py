@@ -0,0 +1,112 @@
+import re
+from typing import Dict, List
+
+# Streaming concatenation of PDFs produced by generate_bill_pdf.
+#
+# ReportLab writes classic PDFs: plain "N 0 obj ... endobj" objects, direct
+# stream lengths and a single flat page tree. That lets us append each bill's
+# objects to one output file as soon as the bill is rendered, renumbering
+# references and re-parenting its pages under a shared page tree that is
+# written last. Only the xref offsets and page ids are kept between bills, so
+# memory stays flat however many bills are exported. This is not a general
+# purpose PDF merger.
+
+_OBJ_HEADER = re.compile(rb"(\d+) 0 obj")
+_REF = re.compile(rb"(\d+) 0 R")
+_TRAILER_REF = re.compile(rb"/(Root|Info) (\d+) 0 R")
+_KIDS = re.compile(rb"/Kids \[([^\]]*)\]")
+_PAGES = re.compile(rb"/Pages (\d+) 0 R")
+_OUTLINES = re.compile(rb"/Outlines (\d+) 0 R")
+
+PAGES_ID = 1
+CATALOG_ID = 2
+
+
+class PdfConcatenator:
+    def __init__(self):
+        self._position = 0
+        self._offsets: Dict[int, int] = {}
+        self._kids: List[int] = []
+        self._last_id = CATALOG_ID
+
+    def _emit(self, data: bytes) -> bytes:
+        self._position += len(data)
+        return data
+
+    def start(self) -> bytes:
+        return self._emit(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def _objects(self, pdf: bytes) -> Dict[int, bytes]:
+        """Object id -> "N 0 obj ... endobj" bytes, located through the xref table."""
+        xref_start = int(pdf[pdf.rindex(b"startxref") + 9:].split()[0])
+        lines = pdf[xref_start:pdf.index(b"trailer", xref_start)].split(b"\n")
+        first, count = (int(value) for value in lines[1].split())
+        offsets = {}
+        for index, line in enumerate(lines[2:2 + count]):
+            offset, _, kind = line.split()[:3]
+            if kind == b"n":
+                offsets[first + index] = int(offset)
+        ordered = sorted(offsets.items(), key=lambda entry: entry[1])
+        objects = {}
+        for position, (obj_id, offset) in enumerate(ordered):
+            end = ordered[position + 1][1] if position + 1 < len(ordered) else xref_start
+            body = pdf[offset:end]
+            objects[obj_id] = body[:body.rindex(b"endobj") + 6]
+        return objects
+
+    def add(self, pdf: bytes) -> bytes:
+        """Append one PDF's pages; returns the bytes to send."""
+        objects = self._objects(pdf)
+        trailer = dict((name, int(obj_id)) for name, obj_id in _TRAILER_REF.findall(pdf[pdf.rindex(b"trailer"):]))
+        catalog = objects[trailer[b"Root"]]
+        pages_root = int(_PAGES.search(catalog).group(1))
+        kids = [int(obj_id) for obj_id in _REF.findall(_KIDS.search(objects[pages_root]).group(1))]
+
+        skipped = {trailer[b"Root"], trailer.get(b"Info"), pages_root}
+        outlines = _OUTLINES.search(catalog)
+        if outlines:
+            skipped.add(int(outlines.group(1)))
+
+        base = self._last_id
+        renumber = lambda match: b"%d 0 R" % (
+            PAGES_ID if int(match.group(1)) == pages_root else base + int(match.group(1))
+        )
+        chunks = []
+        for obj_id in sorted(objects):
+            if obj_id in skipped:
+                continue
+            body = objects[obj_id]
+            # Only rewrite the dictionary; stream data is copied byte for byte
+            split = body.find(b"stream")
+            head, tail = (body, b"") if split < 0 else (body[:split], body[split:])
+            head = _OBJ_HEADER.sub(b"%d 0 obj" % (base + obj_id), head, count=1)
+            head = _REF.sub(renumber, head)
+            self._offsets[base + obj_id] = self._position
+            chunks.append(self._emit(head + tail + b"\n"))
+
+        self._kids.extend(base + kid for kid in kids)
+        self._last_id = base + max(objects)
+        return b"".join(chunks)
+
+    def finish(self) -> bytes:
+        """Write the shared page tree, catalog, xref and trailer."""
+        kids = b" ".join(b"%d 0 R" % kid for kid in self._kids)
+        chunks = []
+        self._offsets[PAGES_ID] = self._position
+        chunks.append(self._emit(
+            b"%d 0 obj\n<<\n/Count %d /Kids [ %s ] /Type /Pages\n>>\nendobj\n" % (PAGES_ID, len(self._kids), kids)
+        ))
+        self._offsets[CATALOG_ID] = self._position
+        chunks.append(self._emit(
+            b"%d 0 obj\n<<\n/PageMode /UseNone /Pages %d 0 R /Type /Catalog\n>>\nendobj\n" % (CATALOG_ID, PAGES_ID)
+        ))
+
+        xref_start = self._position
+        size = self._last_id + 1
+        entries = [b"xref\n0 %d\n" % size, b"0000000000 65535 f \n"]
+        for obj_id in range(1, size):
+            offset = self._offsets.get(obj_id)
+            entries.append(b"%010d 00000 n \n" % offset if offset is not None else b"0000000000 65535 f \n")
+        entries.append(b"trailer\n<<\n/Root %d 0 R /Size %d\n>>\nstartxref\n%d\n%%%%EOF\n" % (CATALOG_ID, size, xref_start))
+        chunks.append(self._emit(b"".join(entries)))
+        return b"".join(chunks)
@@ -1,5 +1,6 @@
 from sqlalchemy.orm import Session
 from app.models.vegetable import Vegetable
+from app.services.catalog_cache import bump_catalog_version
 
 def seed_vegetables(db: Session):
     vegetables_data = [
@@ -34,4 +35,5 @@ def seed_vegetables(db: Session):
             image_url = f"https://source.unsplash.com/featured/?{name.replace(' ', ',')},vegetable"
             db_veg = Vegetable(name=name, tamil_name=tamil_name, image_url=image_url)
             db.add(db_veg)
+    bump_catalog_version(db)
     db.commit()
@@ -0,0 +1,23 @@
+import sys
+import os
+import argparse
+import time
+from app.services.phone_index_service import backfill_phone_index
+
+# Ensure we can import from app
+sys.path.append(os.getcwd())
+
+def main():
+    parser = argparse.ArgumentParser(description="Fill users.mobile_index (phone blind index) for existing users.")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--rebuild", action="store_true", help="Re-index every user, e.g. after changing PHONE_INDEX_KEY")
+    args = parser.parse_args()
+
+    print("Backfilling users.mobile_index...")
+    start = time.perf_counter()
+    written = backfill_phone_index(args.batch_size, args.workers, args.rebuild)
+    print(f"Backfill complete: {written} users indexed in {time.perf_counter() - start:.1f}s.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Concurrent client load test: sync Session routes vs. the AsyncSession routes.
+
+Drives the POS start-up reads (GET /inventory and GET /vegetables/top15,
+authenticated) with 50, 200 and 500 concurrent clients and reports
+throughput and latency for two apps:
+
+  * sync   - plain `def` handlers on the blocking Session, run in the
+             threadpool (10 + 20 connection pool). The previous routes were
+             `async def` with blocking queries, which stalls the event loop
+             and cannot return pooled connections under this load at all.
+  * async  - the real app routes on the asyncpg engine
+
+Requests are sent in-process through the ASGI interface, so no HTTP server
+or client library is needed; client overhead is the same for both apps.
+Runs against the database configured in .env using a dedicated
+'bench_user' shop.
+
+    python -m benchmarks.bench_async_load --clients 50 200 500 --requests 10
+"""
+import argparse
+import asyncio
+import json
+import sys
+import os
+import time
+
+from fastapi import Depends, FastAPI, HTTPException
+from fastapi.security import OAuth2PasswordBearer
+from jose import JWTError, jwt
+from sqlalchemy import desc, select
+from sqlalchemy.orm import Session
+
+# Ensure we can import from app
+sys.path.append(os.getcwd())
+
+from app.database.database import Base, SessionLocal, async_engine, engine, get_db
+from app.models import bill, customer, inventory, usage, user, vegetable  # Register models
+from app.models.inventory import Inventory
+from app.models.usage import VegetableUsage
+from app.models.user import User
+from app.models.vegetable import Vegetable
+from app.core.auth import ALGORITHM, SECRET_KEY, create_access_token, get_password_hash
+from app.main import app as async_app
+from app.utils.seed_vegetables import seed_vegetables
+from benchmarks.common import asgi_request, percentile
+
+BENCH_USER = "bench_user"
+PATHS = ["/api/v1/inventory/", "/api/v1/vegetables/top15"]
+
+INVENTORY_COLUMNS = [
+    Inventory.price_per_kg, Inventory.stock_kg, Inventory.wholesale_price, Inventory.retail_price,
+    Vegetable.id, Vegetable.name, Vegetable.tamil_name, Vegetable.category, Vegetable.image_url,
+]
+TOP15_COLUMNS = [
+    Vegetable.id, Vegetable.name, Vegetable.tamil_name, Vegetable.image_url,
+    Vegetable.price_per_kg, VegetableUsage.usage_count,
+]
+
+
+def build_sync_app() -> FastAPI:
+    """Same queries as the real routes, on the blocking Session."""
+    sync_app = FastAPI()
+    oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
+
+    def current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+        try:
+            username = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+        except JWTError:
+            raise HTTPException(status_code=401)
+        found = db.query(User).filter(User.username == username).first()
+        if found is None:
+            raise HTTPException(status_code=401)
+        return found
+
+    @sync_app.get(PATHS[0])
+    def get_inventory(db: Session = Depends(get_db), shop: User = Depends(current_user)):
+        rows = db.execute(
+            select(*INVENTORY_COLUMNS)
+            .join(Vegetable, Vegetable.id == Inventory.vegetable_id)
+            .where(Inventory.user_id == shop.id)
+        )
+        return [dict(row._mapping) for row in rows]
+
+    @sync_app.get(PATHS[1])
+    def get_top15(db: Session = Depends(get_db), shop: User = Depends(current_user)):
+        rows = db.execute(
+            select(*TOP15_COLUMNS)
+            .join(Vegetable, Vegetable.id == VegetableUsage.vegetable_id)
+            .where(VegetableUsage.user_id == shop.id)
+            .order_by(desc(VegetableUsage.usage_count))
+            .limit(15)
+        )
+        return [dict(row._mapping) for row in rows]
+
+    return sync_app
+
+
+def setup_shop():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        seed_vegetables(db)
+        shop = db.query(User).filter(User.username == BENCH_USER).first()
+        if not shop:
+            shop = User(username=BENCH_USER, hashed_password=get_password_hash("bench"), shop_name="Bench Shop")
+            db.add(shop)
+            db.commit()
+        db.query(Inventory).filter(Inventory.user_id == shop.id).delete()
+        db.query(VegetableUsage).filter(VegetableUsage.user_id == shop.id).delete()
+        for i, veg in enumerate(db.query(Vegetable).order_by(Vegetable.id).limit(60)):
+            db.add(Inventory(user_id=shop.id, vegetable_id=veg.id, price_per_kg=30, stock_kg=50))
+            db.add(VegetableUsage(user_id=shop.id, vegetable_id=veg.id, usage_count=i + 1))
+        db.commit()
+        return create_access_token({"sub": shop.username})
+    finally:
+        db.close()
+
+
+async def asgi_get(app, path: str, token: str) -> int:
+    status, body = await asgi_request(app, "GET", path, [(b"authorization", f"Bearer {token}".encode())])
+    json.loads(body)
+    return status
+
+
+async def client(app, token, requests, timings, errors):
+    for i in range(requests):
+        start = time.perf_counter()
+        try:
+            status = await asgi_get(app, PATHS[i % len(PATHS)], token)
+        except Exception:
+            status = 0
+        timings.append((time.perf_counter() - start) * 1000)
+        if status != 200:
+            errors.append(status)
+
+
+async def run(clients_list, requests, deadline):
+    token = setup_shop()
+    apps = {"sync": build_sync_app(), "async": async_app}
+    stalled = set()
+
+    print(f"{requests} requests per client, alternating {' / '.join(PATHS)}")
+    print(f"{'Clients':>7} {'Path':<6} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'Errors':>7}")
+    print("-" * 60)
+    try:
+        for clients in clients_list:
+            for name, app in apps.items():
+                if name in stalled:
+                    print(f"{clients:>7} {name:<6} {'skipped, stalled at fewer clients':>44}")
+                    continue
+                # Fill the pools so connection set-up is not measured
+                await asyncio.gather(*[asgi_get(app, PATHS[0], token) for _ in range(min(clients, 50))])
+                timings, errors = [], []
+                start = time.perf_counter()
+                try:
+                    await asyncio.wait_for(
+                        asyncio.gather(*[client(app, token, requests, timings, errors) for _ in range(clients)]),
+                        timeout=deadline
+                    )
+                except asyncio.TimeoutError:
+                    # Threadpool workers all waiting on a pool connection that only
+                    # another threadpool worker can return
+                    stalled.add(name)
+                    print(f"{clients:>7} {name:<6} stalled: {len(timings)} of {clients * requests} "
+                          f"requests done in {deadline:.0f}s")
+                    continue
+                elapsed = time.perf_counter() - start
+                print(f"{clients:>7} {name:<6} {len(timings) / elapsed:>8.1f} {percentile(timings, 50):>9.2f} "
+                      f"{percentile(timings, 95):>9.2f} {percentile(timings, 99):>9.2f} {len(errors):>7}")
+                if errors:
+                    print(f"        statuses: {dict((s, errors.count(s)) for s in set(errors))}")
+    finally:
+        await async_engine.dispose()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, nargs="+", default=[50, 200, 500])
+    parser.add_argument("--requests", type=int, default=10)
+    parser.add_argument("--deadline", type=float, default=60, help="seconds before a run counts as stalled")
+    args = parser.parse_args()
+    asyncio.run(run(args.clients, args.requests, args.deadline))
@@ -0,0 +1,158 @@
+"""
+Bill create benchmark: SQL round trips and latency vs. number of bill lines.
+
+Compares the old per-item loop (4 queries per line) with the set-based
+path in app/services/billing_service.py. Runs against the database
+configured in .env, using a dedicated 'bench_user' shop.
+
+    python -m benchmarks.bench_bill_create --lines 1 5 10 20 40 80 --runs 30
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import os
+import time
+
+from sqlalchemy import event
+
+# Ensure we can import from app
+sys.path.append(os.getcwd())
+
+from app.database.database import AsyncSessionLocal, Base, SessionLocal, async_engine, engine
+from app.models import bill, customer, inventory, usage, user, vegetable  # Register models
+from app.models.bill import Bill, BillItem
+from app.models.inventory import Inventory
+from app.models.usage import VegetableUsage
+from app.models.user import User
+from app.models.vegetable import Vegetable
+from app.schema.bill import BillCreate
+from app.api.v1.billing.bill_create import create_bill
+from app.core.auth import get_password_hash
+from app.utils.seed_vegetables import seed_vegetables
+
+BENCH_USER = "bench_user"
+
+
+class StatementCounter:
+    def __init__(self):
+        self.count = 0
+        for target in (engine, async_engine.sync_engine):
+            event.listen(target, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+
+def setup_shop(db):
+    Base.metadata.create_all(bind=engine)
+    seed_vegetables(db)
+    shop = db.query(User).filter(User.username == BENCH_USER).first()
+    if not shop:
+        shop = User(username=BENCH_USER, hashed_password=get_password_hash("bench"), shop_name="Bench Shop")
+        db.add(shop)
+        db.commit()
+    vegetables = db.query(Vegetable).order_by(Vegetable.id).all()
+    for veg in vegetables:
+        exists = db.query(Inventory).filter(
+            Inventory.user_id == shop.id, Inventory.vegetable_id == veg.id
+        ).first()
+        if not exists:
+            db.add(Inventory(user_id=shop.id, vegetable_id=veg.id, price_per_kg=30, stock_kg=1_000_000))
+    db.commit()
+    return shop, vegetables
+
+
+def make_bill(vegetables, lines):
+    return BillCreate(
+        customerName="Bench Customer",
+        mode="Wholesale",
+        items=[
+            {
+                "id": veg.id,
+                "name": veg.name,
+                "tamilName": veg.tamil_name,
+                "quantity": 2.5,
+                "price": 30,
+                "total": 75,
+            }
+            for veg in (vegetables[i % len(vegetables)] for i in range(lines))
+        ],
+    )
+
+
+def legacy_create_bill(db, shop, bill_in):
+    """The pre-batching per-item loop, kept here only as a baseline."""
+    db_bill = Bill(bill_number=None, user_id=shop.id, shop_name=shop.shop_name, total_amount=0,
+                   billing_type=bill_in.billing_type)
+    db.add(db_bill)
+    db.flush()
+    total_amount = 0
+    for item in bill_in.items:
+        veg = db.query(Vegetable).filter(Vegetable.id == item.vegetable_id).first()
+        inv = db.query(Inventory).filter(
+            Inventory.user_id == shop.id, Inventory.vegetable_id == veg.id
+        ).with_for_update().first()
+        if inv:
+            inv.stock_kg -= item.quantity
+        total_amount += item.total
+        db.add(BillItem(bill_id=db_bill.id, vegetable_id=veg.id, vegetable_name=veg.name,
+                        tamil_name=veg.tamil_name, qty_kg=item.quantity, price=item.price,
+                        subtotal=item.total))
+        usage_row = db.query(VegetableUsage).filter(
+            VegetableUsage.user_id == shop.id, VegetableUsage.vegetable_id == veg.id
+        ).first()
+        if usage_row:
+            usage_row.usage_count += 1
+    db_bill.total_amount = total_amount
+    db.commit()
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run(lines_list, runs):
+    counter = StatementCounter()
+    db = SessionLocal()
+    try:
+        shop, vegetables = setup_shop(db)
+        print(f"{'Lines':>6} {'Path':<8} {'Stmts':>6} {'p50 ms':>9} {'p95 ms':>9}")
+        print("-" * 42)
+        for lines in lines_list:
+            bill_in = make_bill(vegetables, lines)
+            for name in ("legacy", "batched"):
+                timings, statements = [], []
+                for _ in range(runs):
+                    if name == "legacy":
+                        session = SessionLocal()
+                        current = session.get(User, shop.id)
+                        before = counter.count
+                        start = time.perf_counter()
+                        legacy_create_bill(session, current, bill_in)
+                        elapsed = time.perf_counter() - start
+                        session.close()
+                    else:
+                        async with AsyncSessionLocal() as session:
+                            current = await session.get(User, shop.id)
+                            before = counter.count
+                            start = time.perf_counter()
+                            await create_bill(bill_in, session, current)
+                            elapsed = time.perf_counter() - start
+                    timings.append(elapsed * 1000)
+                    statements.append(counter.count - before)
+                print(f"{lines:>6} {name:<8} {statistics.median(statements):>6.0f} "
+                      f"{percentile(timings, 50):>9.2f} {percentile(timings, 95):>9.2f}")
+    finally:
+        db.close()
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, nargs="+", default=[1, 5, 10, 20, 40, 80])
+    parser.add_argument("--runs", type=int, default=30)
+    args = parser.parse_args()
+    asyncio.run(run(args.lines, args.runs))
@@ -0,0 +1,122 @@
+"""
+Login throughput benchmark: PBKDF2 hashes and full logins per second per core.
+
+Part 1 pushes password verifications straight through the KDF pool with
+1, 2, ... KDF_WORKERS threads (no database) and reports verifications/s and
+verifications/s per busy core. Part 2 sends concurrent POST /auth/login
+requests through the ASGI app, each from its own client IP, and reports
+logins/s, latency, rejections (429/503) and the pool's queue wait.
+Runs against the database configured in .env using 'bench_login_<n>' users.
+
+    python -m benchmarks.bench_login --hashes 64 --logins 200 --concurrency 50
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from urllib.parse import urlencode
+
+# Ensure we can import from app
+sys.path.append(os.getcwd())
+
+from app.core import config, kdf
+from app.core.auth import hash_password_sync, verify_password_sync
+from app.database.database import Base, SessionLocal, async_engine, engine
+from app.models.user import User
+from app.main import app
+from benchmarks.common import asgi_request, percentile
+
+BENCH_PREFIX = "bench_login_"
+PASSWORD = "bench-password"
+
+
+def worker_counts(limit):
+    counts, workers = [], 1
+    while workers < limit:
+        counts.append(workers)
+        workers *= 2
+    return counts + [limit]
+
+
+async def hash_throughput(hashes, max_workers):
+    stored = hash_password_sync(PASSWORD)
+    cores = os.cpu_count() or 1
+    print(f"KDF pool, {hashes} verifications of {kdf.KDF_ITERATIONS} iterations, {cores} cores")
+    print(f"{'Workers':>7} {'verify/s':>9} {'per core':>9} {'p50 ms':>8}")
+    print("-" * 37)
+    for workers in worker_counts(max_workers):
+        kdf.shutdown()
+        config.KDF_WORKERS = workers
+        config.KDF_QUEUE_SIZE = hashes
+        start = time.perf_counter()
+        await asyncio.gather(*[kdf.run_kdf(verify_password_sync, PASSWORD, stored) for _ in range(hashes)])
+        elapsed = time.perf_counter() - start
+        stats = kdf.kdf_stats()
+        print(f"{workers:>7} {hashes / elapsed:>9.1f} {hashes / elapsed / min(workers, cores):>9.1f} "
+              f"{stats['hash_ms_p50']:>8.1f}")
+    kdf.shutdown()
+
+
+def setup_users(count):
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        existing = {
+            name for (name,) in db.query(User.username).filter(User.username.like(f"{BENCH_PREFIX}%"))
+        }
+        hashed = hash_password_sync(PASSWORD)
+        for i in range(count):
+            if f"{BENCH_PREFIX}{i}" not in existing:
+                db.add(User(username=f"{BENCH_PREFIX}{i}", hashed_password=hashed, shop_name=f"Bench {i}"))
+        db.commit()
+    finally:
+        db.close()
+
+
+async def login_throughput(logins, concurrency, users):
+    setup_users(users)
+    kdf.shutdown()
+    config.KDF_WORKERS = max(1, os.cpu_count() or 1)
+    config.KDF_QUEUE_SIZE = config.KDF_WORKERS * 16
+    headers = [(b"content-type", b"application/x-www-form-urlencoded")]
+    slots = asyncio.Semaphore(concurrency)
+    timings, statuses = [], {}
+
+    async def one(i):
+        body = urlencode({"username": f"{BENCH_PREFIX}{i % users}", "password": PASSWORD}).encode()
+        async with slots:
+            start = time.perf_counter()
+            status, _ = await asgi_request(app, "POST", "/api/v1/auth/login", headers, body, client=(f"10.0.{i // 250}.{i % 250}", 1))
+            timings.append((time.perf_counter() - start) * 1000)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[one(i) for i in range(logins)])
+    elapsed = time.perf_counter() - start
+    ok = statuses.get(200, 0)
+    stats = kdf.kdf_stats()
+    cores = min(config.KDF_WORKERS, os.cpu_count() or 1)
+    print()
+    print(f"POST /auth/login x {logins}, {concurrency} concurrent, {config.KDF_WORKERS} KDF workers")
+    print(f"logins/s {ok / elapsed:.1f}  per core {ok / elapsed / cores:.1f}  "
+          f"p50 {percentile(timings, 50):.1f} ms  p95 {percentile(timings, 95):.1f} ms")
+    print(f"statuses {statuses}  queue wait p50 {stats['queue_ms_p50']:.1f} ms  p95 {stats['queue_ms_p95']:.1f} ms")
+    kdf.shutdown()
+    await async_engine.dispose()
+
+
+async def run(hashes, logins, concurrency, users):
+    await hash_throughput(hashes, max(1, os.cpu_count() or 1))
+    if logins:
+        await login_throughput(logins, concurrency, users)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hashes", type=int, default=64)
+    parser.add_argument("--logins", type=int, default=200, help="0 skips the database part")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--users", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(run(args.hashes, args.logins, args.concurrency, args.users))
@@ -0,0 +1,80 @@
+"""
+Bill PDF benchmark: renders per second before and after the cached pipeline.
+
+    rebuild   styles and header flowables rebuilt on every call (the old behaviour)
+    prebuilt  generate_bill_pdf with the process-wide styles and header
+    cached    render_bill_pdf hitting the (bill id, version) LRU
+
+Bills are built in memory, so no database is needed.
+
+    python -m benchmarks.bench_pdf_render --lines 5 20 60 --seconds 3
+"""
+import argparse
+import sys
+import os
+import time
+from datetime import datetime
+
+# Ensure we can import from app
+sys.path.append(os.getcwd())
+
+from app.models import bill, customer, inventory, usage, user, vegetable  # Register models
+from app.models.bill import Bill, BillItem
+from app.services import pdf_service
+from app.services.pdf_cache import pdf_cache_stats
+
+
+def make_bill(bill_id, lines):
+    sample = Bill(
+        id=bill_id, bill_number=f"BENCH{bill_id:05d}", customer_name="Bench Customer",
+        customer_mobile="9876543210", billing_type="Wholesale", subtotal=75.0 * lines,
+        tax_amount=0.0, discount_amount=0.0, total_amount=75.0 * lines, created_at=datetime.utcnow()
+    )
+    sample.items = [
+        BillItem(vegetable_name=f"Vegetable {i}", tamil_name="தக்காளி", qty_kg=2.5, price=30.0, subtotal=75.0)
+        for i in range(lines)
+    ]
+    return sample
+
+
+def rebuild_render(sample):
+    styles = pdf_service._build_styles()
+    pdf_service._build_header(styles)
+    return pdf_service.generate_bill_pdf(sample).getvalue()
+
+
+def prebuilt_render(sample):
+    return pdf_service.generate_bill_pdf(sample).getvalue()
+
+
+def cached_render(sample):
+    return pdf_service.render_bill_pdf(sample)
+
+
+def measure(render, sample, seconds):
+    render(sample)
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        render(sample)
+        count += 1
+    return count / (time.perf_counter() - start)
+
+
+def run(lines_list, seconds):
+    pdf_service.warm_up()
+    print(f"{'Lines':>6} {'Path':<9} {'renders/s':>10}")
+    print("-" * 27)
+    for lines in lines_list:
+        sample = make_bill(lines, lines)
+        for name, render in (("rebuild", rebuild_render), ("prebuilt", prebuilt_render), ("cached", cached_render)):
+            print(f"{lines:>6} {name:<9} {measure(render, sample, seconds):>10.1f}")
+    print(pdf_cache_stats())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, nargs="+", default=[5, 20, 60])
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+    run(args.lines, args.seconds)
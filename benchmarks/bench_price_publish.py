@@ -0,0 +1,168 @@
+"""
+Daily pricing publish benchmark: many shops publishing rate cards at once.
+
+Simulates the morning rush where every shop hits "Publish Rates" within a
+few minutes. Each shop publishes a full rate card through POST
+/inventory/daily-pricing, either with the old per-item loop (one SELECT and
+one UPDATE per item) or the rate card path in
+app/services/price_schedule_service.py (one INSERT ... SELECT for the card,
+then a fixed number of statements to apply it). Shops are created on first run as
+'bench_shop_<n>' users.
+
+    python -m benchmarks.bench_price_publish --shops 500 --items 100 --workers 16
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from sqlalchemy import event
+
+# Ensure we can import from app
+sys.path.append(os.getcwd())
+
+from app.database.database import AsyncSessionLocal, Base, SessionLocal, async_engine, engine
+from app.models import bill, customer, inventory, usage, user, vegetable  # Register models
+from app.models.inventory import Inventory
+from app.models.user import User
+from app.models.vegetable import Vegetable
+from app.schema.inventory import DailyPriceUpdate
+from app.api.v1.inventory.inventory_api import publish_daily_pricing
+from app.core.auth import get_password_hash
+from app.services.inventory_service import upsert_inventory
+
+SHOP_PREFIX = "bench_shop_"
+
+
+class StatementCounter:
+    def __init__(self):
+        self.count = 0
+        for target in (engine, async_engine.sync_engine):
+            event.listen(target, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+
+def setup_shops(db, shops, items):
+    Base.metadata.create_all(bind=engine)
+    names = [f"Bench Veg {i:04d}" for i in range(items)]
+    existing = {name for (name,) in db.query(Vegetable.name).filter(Vegetable.name.in_(names))}
+    db.add_all([Vegetable(name=name, tamil_name=name, category="Bench", price_per_kg=30) for name in names if name not in existing])
+    db.commit()
+    veg_ids = [veg_id for (veg_id,) in db.query(Vegetable.id).filter(Vegetable.name.in_(names)).order_by(Vegetable.id)]
+
+    usernames = [f"{SHOP_PREFIX}{n}" for n in range(shops)]
+    existing = {name for (name,) in db.query(User.username).filter(User.username.in_(usernames))}
+    password = get_password_hash("bench")
+    db.add_all([
+        User(username=name, hashed_password=password, shop_name=name)
+        for name in usernames if name not in existing
+    ])
+    db.commit()
+    shop_ids = [shop_id for (shop_id,) in db.query(User.id).filter(User.username.in_(usernames)).order_by(User.id)]
+    for shop_id in shop_ids:
+        upsert_inventory(db, shop_id, [
+            {"vegetable_id": veg_id, "price_per_kg": 30, "stock_kg": 1000} for veg_id in veg_ids
+        ], update_columns=["price_per_kg"])
+    db.commit()
+    return shop_ids, veg_ids
+
+
+def make_rate_card(veg_ids, round_no):
+    return DailyPriceUpdate(
+        startTime="06:00 AM",
+        expiryDate=datetime.utcnow().strftime("%d-%b-%Y"),
+        items=[
+            {"id": veg_id, "wholesale": 20 + round_no, "retail": 30 + round_no}
+            for veg_id in veg_ids
+        ],
+    )
+
+
+def legacy_publish(db, shop_id, pricing_in):
+    """The pre-bulk per-item loop, kept here only as a baseline."""
+    now = datetime.utcnow()
+    for item in pricing_in.items:
+        inv = db.query(Inventory).filter(
+            Inventory.user_id == shop_id, Inventory.vegetable_id == item.vegetable_id
+        ).first()
+        if inv:
+            inv.wholesale_price = item.wholesale
+            inv.retail_price = item.retail
+            inv.price_per_kg = item.retail
+            inv.start_time = pricing_in.start_time
+            inv.expiry_date = pricing_in.expiry_date
+            inv.price_updated_at = now
+    db.commit()
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def legacy_publish_once(shop_id, pricing_in):
+    session = SessionLocal()
+    try:
+        start = time.perf_counter()
+        legacy_publish(session, shop_id, pricing_in)
+        return (time.perf_counter() - start) * 1000
+    finally:
+        session.close()
+
+
+async def bulk_publish_once(shop_id, pricing_in, slots):
+    async with slots, AsyncSessionLocal() as session:
+        current = await session.get(User, shop_id)
+        start = time.perf_counter()
+        await publish_daily_pricing(pricing_in, session, current)
+        return (time.perf_counter() - start) * 1000
+
+
+async def bulk_publish_all(shop_ids, pricing_in, workers):
+    slots = asyncio.Semaphore(workers)
+    try:
+        return await asyncio.gather(*[bulk_publish_once(shop_id, pricing_in, slots) for shop_id in shop_ids])
+    finally:
+        await async_engine.dispose()
+
+
+def run(shops, items, workers):
+    counter = StatementCounter()
+    db = SessionLocal()
+    try:
+        shop_ids, veg_ids = setup_shops(db, shops, items)
+    finally:
+        db.close()
+
+    print(f"{len(shop_ids)} shops x {len(veg_ids)} items, {workers} concurrent publishers")
+    print(f"{'Path':<8} {'Stmts/pub':>10} {'pub/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'Total s':>8}")
+    print("-" * 57)
+    for round_no, path in enumerate(("legacy", "bulk"), start=1):
+        pricing_in = make_rate_card(veg_ids, round_no)
+        before = counter.count
+        start = time.perf_counter()
+        if path == "legacy":
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                timings = list(pool.map(lambda shop_id: legacy_publish_once(shop_id, pricing_in), shop_ids))
+        else:
+            timings = asyncio.run(bulk_publish_all(shop_ids, pricing_in, workers))
+        elapsed = time.perf_counter() - start
+        statements = (counter.count - before) / len(shop_ids)
+        print(f"{path:<8} {statements:>10.1f} {len(shop_ids) / elapsed:>8.1f} "
+              f"{percentile(timings, 50):>9.2f} {percentile(timings, 95):>9.2f} {elapsed:>8.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shops", type=int, default=500)
+    parser.add_argument("--items", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=16)
+    args = parser.parse_args()
+    run(args.shops, args.items, args.workers)
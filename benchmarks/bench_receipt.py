@@ -0,0 +1,57 @@
+"""
+Receipt benchmark: per-receipt latency of the thermal formats vs. the A4 PDF.
+
+    a4        generate_bill_pdf (ReportLab platypus, A4)
+    escpos    render_escpos (58mm ESC/POS bytes)
+    narrow    render_receipt_pdf (58mm single-page PDF)
+
+Bills are built in memory, so no database is needed. Tamil glyph strips are
+only exercised when the Tamil font from pdf_service is installed.
+
+    python -m benchmarks.bench_receipt --lines 5 20 60 --runs 200
+"""
+import argparse
+import sys
+import os
+import time
+
+# Ensure we can import from app
+sys.path.append(os.getcwd())
+
+from app.services import pdf_service, receipt_service
+from benchmarks.bench_pdf_render import make_bill
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run(lines_list, runs):
+    paths = (
+        ("a4", lambda bill: pdf_service.generate_bill_pdf(bill).getvalue()),
+        ("escpos", lambda bill: receipt_service.render_escpos(bill, 58)),
+        ("narrow", lambda bill: receipt_service.render_receipt_pdf(bill, 58)),
+    )
+    print(f"tamil strips: {'on' if receipt_service._tamil_font else 'off (font not found)'}")
+    print(f"{'Lines':>6} {'Path':<8} {'Bytes':>8} {'p50 ms':>9} {'p95 ms':>9}")
+    print("-" * 44)
+    for lines in lines_list:
+        bill = make_bill(lines, lines)
+        for name, render in paths:
+            size = len(render(bill))
+            timings = []
+            for _ in range(runs):
+                start = time.perf_counter()
+                render(bill)
+                timings.append((time.perf_counter() - start) * 1000)
+            print(f"{lines:>6} {name:<8} {size:>8} {percentile(timings, 50):>9.3f} {percentile(timings, 95):>9.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, nargs="+", default=[5, 20, 60])
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+    run(args.lines, args.runs)
@@ -0,0 +1,138 @@
+"""
+Hot-item contention benchmark: N counters of one shop billing the same
+vegetables at the same time, under each oversell policy.
+
+  allow   sales only append to the stock ledger; no inventory row is touched
+  warn    one conditional UPDATE ... RETURNING per bill, row locks held to commit
+  reject  as warn, and bills that would take stock below zero get 409
+
+Every round restocks the hot items to --stock kg, then --counters clients
+each send --bills bills of 1 kg of every hot item through the ASGI app.
+Reports bills/s, latency, rejected bills and the stock left afterwards
+(negative means oversold). Bills carry a client bill number so the shop's
+bill number counter is not part of what is measured.
+Runs against the database configured in .env using a 'bench_stock' shop.
+
+    python -m benchmarks.bench_stock_contention --counters 1 2 3 8 --bills 25
+"""
+import argparse
+import asyncio
+import json
+import sys
+import os
+import time
+import uuid
+
+from sqlalchemy import update
+
+# Ensure we can import from app
+sys.path.append(os.getcwd())
+
+from app.database.database import Base, SessionLocal, async_engine, engine
+from app.models import bill, customer, inventory, stock_movement, usage, user, vegetable  # Register models
+from app.models.user import User
+from app.models.vegetable import Vegetable
+from app.core.auth import create_access_token, get_password_hash
+from app.core.user_cache import invalidate_user
+from app.main import app
+from app.services.inventory_service import upsert_inventory
+from app.services.stock_ledger_service import OVERSELL_POLICIES, compact_stock_movements, set_stock_levels
+from app.utils.seed_vegetables import seed_vegetables
+from benchmarks.common import asgi_request, percentile
+
+BENCH_USER = "bench_stock"
+
+
+def setup_shop(hot_items):
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        seed_vegetables(db)
+        shop = db.query(User).filter(User.username == BENCH_USER).first()
+        if not shop:
+            shop = User(username=BENCH_USER, hashed_password=get_password_hash("bench"), shop_name="Bench Stock")
+            db.add(shop)
+            db.commit()
+        vegetable_ids = [veg_id for (veg_id,) in db.query(Vegetable.id).order_by(Vegetable.id).limit(hot_items)]
+        upsert_inventory(db, shop.id, [
+            {"vegetable_id": veg_id, "price_per_kg": 40, "stock_kg": 0.0} for veg_id in vegetable_ids
+        ], update_columns=["price_per_kg"])
+        db.commit()
+        return shop.id, vegetable_ids, create_access_token({"sub": shop.username})
+    finally:
+        db.close()
+
+
+def prepare_round(shop_id, vegetable_ids, policy, stock):
+    db = SessionLocal()
+    try:
+        db.execute(update(User).where(User.id == shop_id).values(oversell_policy=policy))
+        compact_stock_movements(db, shop_id)
+        set_stock_levels(db, shop_id, {veg_id: stock for veg_id in vegetable_ids}, "benchmark restock")
+        db.commit()
+    finally:
+        db.close()
+    invalidate_user(BENCH_USER)
+
+
+async def stock_left(token, vegetable_ids):
+    _, body = await asgi_request(app, "GET", "/api/v1/inventory/", [(b"authorization", f"Bearer {token}".encode())])
+    stock = {row["id"]: row["stock"] for row in json.loads(body)}
+    return min(stock[veg_id] for veg_id in vegetable_ids)
+
+
+async def counter(token, vegetable_ids, bills, timings, statuses):
+    headers = [(b"authorization", f"Bearer {token}".encode()), (b"content-type", b"application/json")]
+    for _ in range(bills):
+        body = json.dumps({
+            "billNumber": f"STK-{uuid.uuid4().hex[:12]}",
+            "mode": "Retail",
+            "items": [
+                {"id": veg_id, "name": "", "tamilName": "", "quantity": 1, "price": 40, "total": 40}
+                for veg_id in vegetable_ids
+            ],
+        }).encode()
+        start = time.perf_counter()
+        status, _ = await asgi_request(app, "POST", "/api/v1/billing/create", headers, body)
+        timings.append((time.perf_counter() - start) * 1000)
+        statuses[status] = statuses.get(status, 0) + 1
+
+
+async def run(counters_list, bills, hot_items, stock, policies):
+    shop_id, vegetable_ids, token = setup_shop(hot_items)
+    print(f"{hot_items} hot items, {stock:g} kg each per round, {bills} bills of 1 kg/item per counter")
+    print(f"{'Counters':>8} {'Policy':<7} {'bills/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+          f"{'409s':>5} {'Stock left':>10}")
+    print("-" * 72)
+    try:
+        for counters in counters_list:
+            for policy in policies:
+                prepare_round(shop_id, vegetable_ids, policy, stock)
+                timings, statuses = [], {}
+                start = time.perf_counter()
+                await asyncio.gather(*[
+                    counter(token, vegetable_ids, bills, timings, statuses) for _ in range(counters)
+                ])
+                elapsed = time.perf_counter() - start
+                left = await stock_left(token, vegetable_ids)
+                print(f"{counters:>8} {policy:<7} {len(timings) / elapsed:>8.1f} {percentile(timings, 50):>9.2f} "
+                      f"{percentile(timings, 95):>9.2f} {percentile(timings, 99):>9.2f} "
+                      f"{statuses.get(409, 0):>5} {left:>10g}")
+                unexpected = {s: n for s, n in statuses.items() if s not in (200, 409)}
+                if unexpected:
+                    print(f"         statuses: {unexpected}")
+    finally:
+        prepare_round(shop_id, vegetable_ids, "allow", stock)
+        await async_engine.dispose()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--counters", type=int, nargs="+", default=[1, 2, 3, 8])
+    parser.add_argument("--bills", type=int, default=25, help="bills per counter")
+    parser.add_argument("--hot-items", type=int, default=3)
+    parser.add_argument("--stock", type=float, default=50, help="kg of each hot item at the start of a round")
+    parser.add_argument("--policies", nargs="+", choices=OVERSELL_POLICIES, default=list(OVERSELL_POLICIES))
+    args = parser.parse_args()
+    asyncio.run(run(args.counters, args.bills, args.hot_items, args.stock, args.policies))
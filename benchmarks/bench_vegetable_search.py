@@ -0,0 +1,91 @@
+"""
+Vegetable search index benchmark: type-ahead latency vs. catalog size.
+
+Builds synthetic English/Tamil/Tanglish catalogs (no database needed) and
+times VegetableSearchIndex.search for exact, prefix, Tanglish and typo'd
+queries. The target is well under 1 ms per lookup for a few thousand items.
+
+    python -m benchmarks.bench_vegetable_search --sizes 100 1000 5000
+"""
+import argparse
+import random
+import sys
+import os
+import time
+from collections import namedtuple
+
+# Ensure we can import from app
+sys.path.append(os.getcwd())
+
+from app.services.vegetable_search import VegetableSearchIndex
+
+Item = namedtuple("Item", "id name tamil_name tanglish_name")
+
+BASE_ITEMS = [
+    ("Tomato", "தக்காளி", "Thakkali"),
+    ("Onion", "வெங்காயம்", "Vengayam"),
+    ("Lady's Finger", "வெண்டைக்காய்", "Vendakkai"),
+    ("Brinjal", "கத்திரிக்காய்", "Kathirikkai"),
+    ("Green Chilli", "பச்சைமிளகாய்", "Pachai Milagai"),
+    ("Drumstick", "முருங்கைக்காய்", "Murungaikkai"),
+    ("Bitter Gourd", "பாகற்காய்", "Pavakkai"),
+    ("Potato", "உருளைக்கிழங்கு", "Urulaikizhangu"),
+    ("Coriander Leaves", "கொத்தமல்லி", "Kothamalli"),
+    ("Cabbage", "கோஸ்", "Kos"),
+]
+VARIANTS = ["", "Nattu", "Hybrid", "Organic", "Baby", "Red", "Small", "Big", "Local", "Ooty"]
+
+QUERIES = ["tomato", "tom", "vendakai", "thakali", "kathiri", "pachai", "murunga",
+           "cabage", "onin", "வெண்", "கத்", "coriander l", "pavakai", "ur"]
+
+
+def make_catalog(size):
+    rng = random.Random(42)
+    items = []
+    for i in range(size):
+        name, tamil, tanglish = BASE_ITEMS[i % len(BASE_ITEMS)]
+        variant = VARIANTS[(i // len(BASE_ITEMS)) % len(VARIANTS)]
+        suffix = f" {i // (len(BASE_ITEMS) * len(VARIANTS))}" if i >= len(BASE_ITEMS) * len(VARIANTS) else ""
+        items.append(Item(
+            id=i + 1,
+            name=f"{variant} {name}{suffix}".strip(),
+            tamil_name=f"{tamil}{suffix}",
+            tanglish_name=f"{variant} {tanglish}{suffix}".strip(),
+        ))
+    rng.shuffle(items)
+    return items
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def run(sizes, rounds):
+    print(f"{'Items':>6} {'Build ms':>9} {'p50 us':>8} {'p95 us':>8} {'p99 us':>8} {'max us':>8}")
+    print("-" * 54)
+    for size in sizes:
+        catalog = make_catalog(size)
+        usage = {item.id: random.Random(item.id).randint(0, 500) for item in catalog}
+
+        start = time.perf_counter()
+        index = VegetableSearchIndex(catalog)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        timings = []
+        for _ in range(rounds):
+            for query in QUERIES:
+                start = time.perf_counter()
+                index.search(query, limit=10, usage=usage)
+                timings.append((time.perf_counter() - start) * 1_000_000)
+
+        print(f"{size:>6} {build_ms:>9.1f} {percentile(timings, 50):>8.0f} {percentile(timings, 95):>8.0f} "
+              f"{percentile(timings, 99):>8.0f} {max(timings):>8.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 3000, 5000])
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+    run(args.sizes, args.rounds)
@@ -0,0 +1,135 @@
+"""
+Concurrent-miss guard for the per-worker caches.
+
+Bumps a cache's version, then has several AsyncSessions miss it at the same
+time through run_sync, the way concurrent requests on one worker do. The
+tables the rebuild reads are locked for HOLD seconds by another connection,
+so every rebuild is suspended in the driver while the others arrive. Every
+caller must get a snapshot of the new version; if a rebuild holds a thread
+lock across its queries the event loop freezes, which is reported as a
+failure after TIMEOUT seconds. Runs against the database configured in .env.
+
+    python -m benchmarks.check_cache_concurrency
+
+tests/test_cache_concurrency.py runs the same checks under pytest.
+"""
+import asyncio
+import sys
+import os
+import threading
+from functools import partial
+
+from sqlalchemy import text
+
+# Ensure we can import from app
+sys.path.append(os.getcwd())
+
+from app.database.database import AsyncSessionLocal, Base, SessionLocal, async_engine, engine
+from app.models import bill, customer, inventory, usage, user, vegetable  # Register models
+from app.models.user import User
+from app.core.auth import get_password_hash
+from app.services.catalog_cache import bump_catalog_version, current_version, get_catalog
+from app.services.price_table import bump_price_version, current_price_version, get_price_table
+from app.utils.seed_vegetables import seed_vegetables
+
+BENCH_USER = "bench_user"
+
+CALLERS = 4
+HOLD = 1
+TIMEOUT = 30
+
+
+def catalog_setup(db):
+    bump_catalog_version(db)
+    db.commit()
+    return current_version(db), get_catalog
+
+
+def price_table_setup(db):
+    shop = db.query(User).filter(User.username == BENCH_USER).first()
+    if not shop:
+        shop = User(username=BENCH_USER, hashed_password=get_password_hash("bench"), shop_name="Bench Shop")
+        db.add(shop)
+        db.commit()
+    bump_price_version(db, shop.id)
+    db.commit()
+    return current_price_version(db, shop.id), partial(get_price_table, user_id=shop.id)
+
+
+CHECKS = {
+    # name: (bump the version and return it with the cache read, tables the rebuild reads)
+    "catalog": (catalog_setup, ("vegetables",)),
+    "price_table": (price_table_setup, ("inventory", "price_schedules")),
+}
+
+
+async def concurrent_misses(read):
+    async def call():
+        async with AsyncSessionLocal() as session:
+            return await session.run_sync(read)
+
+    try:
+        return await asyncio.gather(*(call() for _ in range(CALLERS)))
+    finally:
+        # Pooled asyncpg connections belong to this call's event loop
+        await async_engine.dispose()
+
+
+def hold_tables(tables):
+    """Lock `tables` from another connection and release them after HOLD seconds."""
+    blocker = SessionLocal()
+    for table in tables:
+        blocker.execute(text(f"LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE"))
+
+    def release():
+        blocker.commit()
+        blocker.close()
+
+    threading.Timer(HOLD, release).start()
+
+
+def run_check(read, tables):
+    """asyncio.run in a thread, so a frozen event loop shows up as a timeout instead of a hang."""
+    result = {}
+    hold_tables(tables)
+
+    def target():
+        try:
+            result["snapshots"] = asyncio.run(concurrent_misses(read))
+        except Exception as exc:
+            result["error"] = exc
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(TIMEOUT)
+    if thread.is_alive():
+        return None, f"FAIL: no result after {TIMEOUT}s (event loop blocked)"
+    if "error" in result:
+        return None, f"FAIL: {result['error']!r}"
+    return result["snapshots"], "ok"
+
+
+def main():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    failures = []
+    try:
+        seed_vegetables(db)
+        for name, (setup, tables) in CHECKS.items():
+            version, read = setup(db)
+            snapshots, status = run_check(read, tables)
+            if snapshots is not None and any(snapshot.version != version for snapshot in snapshots):
+                status = f"FAIL: stale snapshot (versions {[snapshot.version for snapshot in snapshots]}, want {version})"
+            if status != "ok":
+                failures.append(name)
+            print(f"{name:<12} callers={CALLERS:<3} {status}")
+    finally:
+        db.close()
+
+    if failures:
+        # A frozen worker thread would keep the interpreter alive
+        os._exit(1)
+
+
+if __name__ == "__main__":
+    main()
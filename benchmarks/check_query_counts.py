@@ -0,0 +1,127 @@
+"""
+SQL statement-count guard for the POS start-up screens.
+
+Calls GET /inventory, GET /vegetables/top15 and GET /billing/dashboard/stats
+for a shop with few and with many inventory/usage rows, and fails if the
+number of statements grows with the row count (an N+1) or exceeds the
+budget below. Runs against the database configured in .env using a
+dedicated 'bench_user' shop, and exits non-zero on a failure.
+
+    python -m benchmarks.check_query_counts
+
+tests/test_query_counts.py runs the same check under pytest.
+"""
+import asyncio
+import sys
+import os
+
+from sqlalchemy import event
+
+# Ensure we can import from app
+sys.path.append(os.getcwd())
+
+from app.database.database import AsyncSessionLocal, Base, SessionLocal, async_engine, engine
+from app.models import bill, customer, inventory, usage, user, vegetable  # Register models
+from app.models.inventory import Inventory
+from app.models.usage import VegetableUsage
+from app.models.user import User
+from app.models.vegetable import Vegetable
+from app.api.v1.inventory.inventory_api import get_inventory
+from app.api.v1.vegetables.vegetable_create import get_top15_vegetables
+from app.api.v1.billing.bill_create import get_dashboard_stats
+from app.core.auth import get_password_hash
+from app.services.price_table import bump_price_version
+from app.utils.seed_vegetables import seed_vegetables
+
+BENCH_USER = "bench_user"
+
+# Maximum statements per endpoint, independent of how many rows the shop has.
+# Counted on a warm worker: the per-worker caches were filled by an earlier call.
+BUDGETS = {
+    "GET /inventory": 2,  # price table version check + the inventory query
+    "GET /vegetables/top15": 1,
+    "GET /billing/dashboard/stats": 3,
+}
+
+ENDPOINTS = {
+    "GET /inventory": get_inventory,
+    "GET /vegetables/top15": get_top15_vegetables,
+    "GET /billing/dashboard/stats": get_dashboard_stats,
+}
+
+
+def stock_shop(db, shop, vegetables, rows):
+    db.query(Inventory).filter(Inventory.user_id == shop.id).delete()
+    db.query(VegetableUsage).filter(VegetableUsage.user_id == shop.id).delete()
+    for i, veg in enumerate(vegetables[:rows]):
+        db.add(Inventory(user_id=shop.id, vegetable_id=veg.id, price_per_kg=30, stock_kg=i % 10))
+        db.add(VegetableUsage(user_id=shop.id, vegetable_id=veg.id, usage_count=i + 1))
+    bump_price_version(db, shop.id)
+    db.commit()
+
+
+async def count_statements(endpoint, shop_id):
+    statements = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    async with AsyncSessionLocal() as session:
+        current = await session.get(User, shop_id)
+        await endpoint(db=session, current_user=current)  # Warm-up: fills the per-worker caches
+        event.listen(async_engine.sync_engine, "before_cursor_execute", on_execute)
+        try:
+            await endpoint(db=session, current_user=current)
+        finally:
+            event.remove(async_engine.sync_engine, "before_cursor_execute", on_execute)
+    # Pooled asyncpg connections belong to this call's event loop
+    await async_engine.dispose()
+    return len(statements)
+
+
+def measure_counts():
+    """Statement counts per endpoint for a small and a large shop, as {name: [small, large]}."""
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        seed_vegetables(db)
+        shop = db.query(User).filter(User.username == BENCH_USER).first()
+        if not shop:
+            shop = User(username=BENCH_USER, hashed_password=get_password_hash("bench"), shop_name="Bench Shop")
+            db.add(shop)
+            db.commit()
+        vegetables = db.query(Vegetable).order_by(Vegetable.id).all()
+
+        counts = {}
+        for rows in (3, min(60, len(vegetables))):
+            stock_shop(db, shop, vegetables, rows)
+            for name, endpoint in ENDPOINTS.items():
+                counts.setdefault(name, []).append(asyncio.run(count_statements(endpoint, shop.id)))
+        return counts
+    finally:
+        db.close()
+
+
+def check_counts(name, small, large):
+    """'ok', or why the endpoint fails its budget."""
+    if large != small:
+        return "FAIL: statement count grows with rows (N+1)"
+    if large > BUDGETS[name]:
+        return f"FAIL: over budget of {BUDGETS[name]}"
+    return "ok"
+
+
+def main():
+    failures = []
+    for name, (small, large) in measure_counts().items():
+        status = check_counts(name, small, large)
+        if status != "ok":
+            failures.append(name)
+        print(f"{name:<30} small={small:<3} large={large:<3} {status}")
+
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
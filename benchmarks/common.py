@@ -0,0 +1,39 @@
+"""Helpers shared by the benchmark scripts."""
+
+
+async def asgi_request(app, method: str, path: str, headers=(), body: bytes = b"", client=("bench", 1),
+                       response_headers: dict = None):
+    """
+    Minimal in-process request through the ASGI interface; returns (status, body).
+    Pass a dict as `response_headers` to collect the response headers into it.
+    """
+    path, _, query = path.partition("?")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": method, "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": query.encode(), "root_path": "", "server": ("bench", 80), "client": client,
+        "headers": [(b"host", b"bench"), *headers],
+    }
+    status = 0
+    chunks = []
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            if response_headers is not None:
+                response_headers.update((k.decode().lower(), v.decode()) for k, v in message.get("headers", []))
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return status, b"".join(chunks)
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
@@ -0,0 +1,182 @@
+"""
+Synthetic data for the load tests: N shops x M customers x K bills.
+
+Scales up what seed_vegetables.py and seed_ui_data.py do for one admin shop:
+the vegetable master list is seeded as usual, then every shop gets an
+inventory over the whole list, M regular customers and K bills of 1-8 lines
+spread over the last --days days, with their stock ledger sales, usage
+counts, dashboard rollups and customer stats to match. Rows are written
+with multi-row INSERTs in batches, so a few hundred thousand bills take
+seconds, not hours.
+
+Generation is deterministic for a given size and --seed. Each size gets its
+own 'load<N>x<M>x<K>' user prefix and is reused if it already exists, so
+successive load runs measure against the same data.
+
+    python -m benchmarks.datagen --shops 10 --customers 200 --bills 5000
+"""
+import argparse
+import random
+import sys
+import os
+import time
+import zlib
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from sqlalchemy import func, insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+# Ensure we can import from app
+sys.path.append(os.getcwd())
+
+from app.database.database import Base, SessionLocal, engine
+from app.models import bill, customer, inventory, stock_movement, usage, user, vegetable  # Register models
+from app.models.bill import Bill, BillItem
+from app.models.customer import Customer
+from app.models.stock_movement import StockMovement
+from app.models.usage import VegetableUsage
+from app.models.user import User
+from app.models.vegetable import Vegetable
+from app.core.auth import get_password_hash
+from app.services.customer_stats_service import rebuild_customer_stats
+from app.services.inventory_service import upsert_inventory
+from app.services.sales_rollup_service import rebuild_rollup
+from app.services.stock_ledger_service import SALE
+from app.utils.seed_vegetables import seed_vegetables
+
+PASSWORD = "load-password"
+BATCH_SIZE = 1000
+
+
+def dataset_prefix(shops: int, customers: int, bills: int) -> str:
+    return f"load{shops}x{customers}x{bills}"
+
+
+def shop_usernames(prefix: str, shops: int) -> List[str]:
+    return [f"{prefix}_shop{i}" for i in range(shops)]
+
+
+def _mobile(prefix: str, shop: int, customer_no: int) -> str:
+    # 12 digits, unique per dataset, shop and customer (customers.mobile_number is global)
+    return f"9{zlib.crc32(prefix.encode()) % 100:02d}{shop:04d}{customer_no:05d}"
+
+
+def _insert_bills(db, shop: User, prefix: str, start_no: int, bills: List[dict], lines: List[List[dict]]):
+    rows = [{**b, "bill_number": f"{prefix}-{shop.id}-{start_no + i}"} for i, b in enumerate(bills)]
+    ids = db.execute(insert(Bill).returning(Bill.id, sort_by_parameter_order=True), rows).scalars().all()
+    db.execute(insert(BillItem), [
+        {**item, "bill_id": bill_id} for bill_id, bill_lines in zip(ids, lines) for item in bill_lines
+    ])
+    # Sales history for stock reports; already reflected in the generated stock snapshot
+    db.execute(insert(StockMovement), [
+        {
+            "user_id": shop.id, "vegetable_id": item["vegetable_id"], "kind": SALE, "qty_kg": -item["qty_kg"],
+            "bill_id": bill_id, "created_at": row["created_at"], "compacted": True,
+        }
+        for row, bill_id, bill_lines in zip(rows, ids, lines) for item in bill_lines
+    ])
+
+
+def _generate_shop(db, rng: random.Random, prefix: str, shop: User, shop_no: int, vegetables: List[Vegetable],
+                   customers: int, bills: int, days: int):
+    prices = {veg.id: rng.randint(15, 120) for veg in vegetables}
+    upsert_inventory(db, shop.id, [
+        {
+            "vegetable_id": veg_id, "price_per_kg": price, "retail_price": price,
+            "wholesale_price": round(price * 0.85, 2), "stock_kg": 1_000_000,
+        }
+        for veg_id, price in prices.items()
+    ], update_columns=["price_per_kg", "retail_price", "wholesale_price", "stock_kg"])
+
+    regulars = [(f"Customer {shop_no}-{i}", _mobile(prefix, shop_no, i)) for i in range(customers)]
+    for start in range(0, len(regulars), BATCH_SIZE):
+        db.execute(pg_insert(Customer).values([
+            {"name": name, "mobile_number": mobile} for name, mobile in regulars[start:start + BATCH_SIZE]
+        ]).on_conflict_do_nothing(index_elements=[Customer.mobile_number]))
+
+    # Each shop sells mostly from a favourite subset, like a real counter
+    favourites = rng.sample(vegetables, min(len(vegetables), 30))
+    usage: Dict[int, int] = {}
+    now = datetime.utcnow()
+    pending_bills, pending_lines = [], []
+    for n in range(bills):
+        billing_type = "Wholesale" if rng.random() < 0.3 else "Retail"
+        bill_lines = []
+        for veg in rng.sample(favourites, rng.randint(1, min(8, len(favourites)))):
+            qty = round(rng.uniform(0.25, 25 if billing_type == "Wholesale" else 5), 2)
+            price = prices[veg.id] if billing_type == "Retail" else round(prices[veg.id] * 0.85, 2)
+            bill_lines.append({
+                "vegetable_id": veg.id, "vegetable_name": veg.name, "tamil_name": veg.tamil_name,
+                "qty_kg": qty, "price": price, "subtotal": round(qty * price, 2),
+            })
+            usage[veg.id] = usage.get(veg.id, 0) + 1
+        total = round(sum(line["subtotal"] for line in bill_lines), 2)
+        name, mobile = rng.choice(regulars) if regulars and rng.random() < 0.8 else (None, None)
+        pending_bills.append({
+            "user_id": shop.id, "shop_name": shop.shop_name, "customer_name": name, "customer_mobile": mobile,
+            "subtotal": total, "tax_amount": 0.0, "discount_amount": 0.0, "total_amount": total,
+            "billing_type": billing_type,
+            "created_at": now - timedelta(seconds=rng.randint(0, days * 86400)),
+        })
+        pending_lines.append(bill_lines)
+        if len(pending_bills) == BATCH_SIZE or n == bills - 1:
+            _insert_bills(db, shop, prefix, n + 1 - len(pending_bills), pending_bills, pending_lines)
+            pending_bills, pending_lines = [], []
+
+    if usage:
+        stmt = pg_insert(VegetableUsage).values([
+            {"user_id": shop.id, "vegetable_id": veg_id, "usage_count": count} for veg_id, count in usage.items()
+        ])
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[VegetableUsage.user_id, VegetableUsage.vegetable_id],
+            set_={"usage_count": stmt.excluded.usage_count}
+        ))
+
+
+def generate(shops: int, customers: int, bills: int, days: int = 30, seed: int = 1) -> str:
+    """
+    Create the dataset unless it already exists; returns its user prefix.
+    Every shop user logs in with PASSWORD.
+    """
+    prefix = dataset_prefix(shops, customers, bills)
+    usernames = shop_usernames(prefix, shops)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        existing = db.query(func.count(User.id)).filter(User.username.in_(usernames)).scalar()
+        if existing == shops:
+            print(f"Dataset {prefix} already exists, reusing it")
+            return prefix
+        if existing:
+            raise SystemExit(f"Dataset {prefix} is only partly there; reset the database and run again")
+
+        start = time.perf_counter()
+        seed_vegetables(db)
+        vegetables = db.query(Vegetable).order_by(Vegetable.id).all()
+        hashed = get_password_hash(PASSWORD)
+        rng = random.Random(seed)
+        for shop_no, username in enumerate(usernames):
+            shop = User(username=username, hashed_password=hashed, shop_name=f"Load Shop {shop_no}")
+            db.add(shop)
+            db.flush()
+            _generate_shop(db, rng, prefix, shop, shop_no, vegetables, customers, bills, days)
+            db.commit()
+            print(f"  {username}: {bills} bills")
+        rebuild_rollup(db)
+        rebuild_customer_stats(db)
+        print(f"Generated {prefix} in {time.perf_counter() - start:.1f}s")
+        return prefix
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shops", type=int, default=10)
+    parser.add_argument("--customers", type=int, default=200, help="regular customers per shop")
+    parser.add_argument("--bills", type=int, default=5000, help="bills per shop")
+    parser.add_argument("--days", type=int, default=30, help="spread bills over this many past days")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    generate(args.shops, args.customers, args.bills, args.days, args.seed)
@@ -0,0 +1,274 @@
+"""
+Reproducible load test for the billing API.
+
+Generates (or reuses) a synthetic dataset with benchmarks.datagen, then runs
+each scenario with --concurrency clients until --requests requests are done:
+
+  bill_create    POST /billing/create, 4 lines, random shop and customer
+  dashboard      GET  /billing/dashboard/stats
+  history        GET  /billing/history (first page, 50 bills)
+  inventory      GET  /inventory/
+  price_publish  POST /inventory/daily-pricing, full rate card
+  pdf            GET  /billing/{id}/pdf over the dataset's bills
+
+Requests go in-process through the ASGI interface with the app's startup and
+shutdown hooks run around them, so the numbers cover routing, auth, the
+database and rendering, but not HTTP parsing or the network. Each result
+holds throughput, p50/p95/p99/max latency, status counts and the mean SQL
+statements and DB time per request taken from the Server-Timing header.
+
+Results are written as JSON to benchmarks/results/ (or --output) together
+with the git commit, dataset and settings; pass an earlier file with
+--compare to print the change per scenario.
+
+    python -m benchmarks.load --shops 10 --customers 200 --bills 5000 \\
+        --concurrency 50 --requests 500
+    python -m benchmarks.load ... --compare benchmarks/results/<earlier>.json
+
+Runs against the PostgreSQL database configured in .env.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import re
+import subprocess
+import sys
+import os
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Tuple
+
+# Ensure we can import from app
+sys.path.append(os.getcwd())
+
+from app.core import config
+from app.core.auth import create_access_token
+from app.database.database import SessionLocal, async_engine, engine
+from app.models.bill import Bill
+from app.models.inventory import Inventory
+from app.models.user import User
+from app.main import app
+from benchmarks import datagen
+from benchmarks.common import asgi_request, percentile
+
+SCENARIOS = ["bill_create", "dashboard", "history", "inventory", "price_publish", "pdf"]
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+SERVER_TIMING_DB = re.compile(r'db;dur=([\d.]+);desc="(\d+) queries"')
+
+# A scenario builds the i-th request: (method, path, body)
+Request = Tuple[str, str, bytes]
+
+
+class Dataset:
+    """Shop tokens, inventory and bill ids of one generated dataset."""
+
+    def __init__(self, prefix: str, shops: int, seed: int):
+        db = SessionLocal()
+        try:
+            users = db.query(User).filter(User.username.in_(datagen.shop_usernames(prefix, shops))).all()
+            self.shops = [
+                {
+                    "id": shop.id,
+                    "token": create_access_token({"sub": shop.username}),
+                    "inventory": db.query(Inventory.vegetable_id, Inventory.retail_price).filter(
+                        Inventory.user_id == shop.id
+                    ).order_by(Inventory.vegetable_id).all(),
+                    "bills": [bill_id for (bill_id,) in db.query(Bill.id).filter(
+                        Bill.user_id == shop.id
+                    ).order_by(Bill.id.desc()).limit(1000)],
+                }
+                for shop in sorted(users, key=lambda u: u.id)
+            ]
+        finally:
+            db.close()
+        self.rng = random.Random(seed)
+        run_id = datetime.utcnow().strftime("%Y%m%d%H%M%S")
+        self.bill_numbers = (f"LOAD{run_id}-{n}" for n in itertools.count())
+
+    def shop(self, i: int) -> dict:
+        return self.shops[i % len(self.shops)]
+
+
+def _bill_create(data: Dataset, i: int) -> Request:
+    shop = data.shop(i)
+    lines = data.rng.sample(shop["inventory"], 4)
+    payload = {
+        # Supplied by the POS client; keeps shops from colliding on the global bill_number index
+        "billNumber": next(data.bill_numbers),
+        "customerName": f"Walk-in {i % 50}",
+        "mode": "Retail",
+        "items": [
+            {"id": veg_id, "name": "", "tamilName": "", "quantity": 1.5, "price": price, "total": price * 1.5}
+            for veg_id, price in lines
+        ],
+    }
+    return "POST", "/api/v1/billing/create", json.dumps(payload).encode()
+
+
+def _price_publish(data: Dataset, i: int) -> Request:
+    shop = data.shop(i)
+    payload = {
+        "startTime": "06:00 AM",
+        "expiryDate": datetime.utcnow().strftime("%d-%b-%Y"),
+        "items": [
+            {"id": veg_id, "wholesale": round(price * 0.85, 2), "retail": price + i % 3}
+            for veg_id, price in shop["inventory"]
+        ],
+    }
+    return "POST", "/api/v1/inventory/daily-pricing", json.dumps(payload).encode()
+
+
+def _pdf(data: Dataset, i: int) -> Request:
+    bills = data.shop(i)["bills"]
+    return "GET", f"/api/v1/billing/{bills[(i // len(data.shops)) % len(bills)]}/pdf", b""
+
+
+BUILDERS: Dict[str, Callable[[Dataset, int], Request]] = {
+    "bill_create": _bill_create,
+    "dashboard": lambda data, i: ("GET", "/api/v1/billing/dashboard/stats", b""),
+    "history": lambda data, i: ("GET", "/api/v1/billing/history?limit=50", b""),
+    "inventory": lambda data, i: ("GET", "/api/v1/inventory/", b""),
+    "price_publish": _price_publish,
+    "pdf": _pdf,
+}
+
+
+async def run_scenario(name: str, data: Dataset, requests: int, concurrency: int) -> dict:
+    build = BUILDERS[name]
+    timings: List[float] = []
+    statuses: Dict[str, int] = {}
+    sql_counts: List[int] = []
+    sql_ms: List[float] = []
+    next_request = iter(range(requests))
+
+    async def client():
+        for i in next_request:
+            method, path, body = build(data, i)
+            headers = [(b"authorization", f"Bearer {data.shop(i)['token']}".encode())]
+            if body:
+                headers.append((b"content-type", b"application/json"))
+            response_headers = {}
+            start = time.perf_counter()
+            try:
+                status, _ = await asgi_request(app, method, path, headers, body, response_headers=response_headers)
+            except Exception:
+                status = 0
+            timings.append((time.perf_counter() - start) * 1000)
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+            match = SERVER_TIMING_DB.search(response_headers.get("server-timing", ""))
+            if match:
+                sql_ms.append(float(match.group(1)))
+                sql_counts.append(int(match.group(2)))
+
+    start = time.perf_counter()
+    await asyncio.gather(*[client() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    ok = sum(count for status, count in statuses.items() if status.startswith("2"))
+    return {
+        "requests": requests,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(requests / elapsed, 1),
+        "p50_ms": round(percentile(timings, 50), 2),
+        "p95_ms": round(percentile(timings, 95), 2),
+        "p99_ms": round(percentile(timings, 99), 2),
+        "max_ms": round(max(timings), 2),
+        "errors": requests - ok,
+        "statuses": statuses,
+        "sql_statements_mean": round(sum(sql_counts) / len(sql_counts), 2) if sql_counts else None,
+        "sql_ms_mean": round(sum(sql_ms) / len(sql_ms), 2) if sql_ms else None,
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_results(results: Dict[str, dict], baseline: Dict[str, dict] = None):
+    header = f"{'Scenario':<14} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'SQL':>5} {'Errors':>7}"
+    print(header)
+    print("-" * len(header))
+    for name, r in results.items():
+        sql = "-" if r["sql_statements_mean"] is None else f"{r['sql_statements_mean']:.0f}"
+        print(f"{name:<14} {r['throughput_rps']:>8.1f} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} "
+              f"{r['p99_ms']:>9.2f} {sql:>5} {r['errors']:>7}")
+        old = (baseline or {}).get(name)
+        if old:
+            deltas = [
+                f"{key.replace('_ms', '').replace('throughput_', '')} {(r[key] - old[key]) / old[key] * 100:+.1f}%"
+                for key in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms") if old.get(key)
+            ]
+            print(f"{'  vs baseline':<14} {', '.join(deltas)}")
+
+
+async def run(args) -> dict:
+    started_at = datetime.utcnow().isoformat(timespec="seconds") + "Z"
+    prefix = datagen.generate(args.shops, args.customers, args.bills, args.days, args.seed)
+    data = Dataset(prefix, args.shops, args.seed)
+    results = {}
+    async with app.router.lifespan_context(app):
+        try:
+            for name in args.scenarios:
+                # One short round first so pools, caches and the PDF workers are warm
+                await run_scenario(name, data, min(args.concurrency, args.requests), args.concurrency)
+                results[name] = await run_scenario(name, data, args.requests, args.concurrency)
+                print(f"  {name}: {results[name]['throughput_rps']} req/s")
+        finally:
+            await async_engine.dispose()
+            engine.dispose()
+    return {
+        "meta": {
+            "started_at": started_at,
+            "commit": git_commit(),
+            "dataset": {"prefix": prefix, "shops": args.shops, "customers": args.customers,
+                        "bills": args.bills, "days": args.days, "seed": args.seed},
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "database": engine.url.render_as_string(hide_password=True),
+            "pdf_workers": config.PDF_WORKERS,
+            "cpu_count": os.cpu_count(),
+            "python": sys.version.split()[0],
+        },
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shops", type=int, default=10)
+    parser.add_argument("--customers", type=int, default=200, help="regular customers per shop")
+    parser.add_argument("--bills", type=int, default=5000, help="bills per shop")
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=500, help="requests per scenario")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--output", help="result file (default benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", help="earlier result file to diff against")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    output = args.output or os.path.join(RESULTS_DIR, datetime.utcnow().strftime("%Y%m%dT%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+    print()
+    print(f"{args.requests} requests per scenario, {args.concurrency} concurrent, dataset {report['meta']['dataset']['prefix']}")
+    print_results(report["results"], baseline)
+    print(f"\nWrote {output}")
+
+
+# The PDF pool spawns worker processes, which re-import this module
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+import sys
+import os
+import argparse
+from app.database.database import SessionLocal, engine, Base
+from app.models import bill, inventory, stock_movement, user, vegetable # Import models for registration
+from app.services.stock_ledger_service import compact_stock_movements
+
+# Ensure we can import from app
+sys.path.append(os.getcwd())
+
+def main():
+    parser = argparse.ArgumentParser(description="Fold pending stock movements into the inventory snapshot.")
+    parser.add_argument("--user-id", type=int, default=None, help="Only process this shop")
+    args = parser.parse_args()
+
+    # Create the ledger table if it doesn't exist yet
+    Base.metadata.create_all(bind=engine)
+
+    db = SessionLocal()
+    try:
+        rows = compact_stock_movements(db, args.user_id)
+        db.commit()
+        print(f"Compaction complete: {rows} inventory rows updated.")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
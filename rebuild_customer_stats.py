@@ -0,0 +1,30 @@
+import sys
+import os
+import argparse
+from app.database.database import SessionLocal, engine, Base
+from app.models import bill, customer_stats, user # Import models for registration
+from app.services.customer_stats_service import rebuild_customer_stats
+
+# Ensure we can import from app
+sys.path.append(os.getcwd())
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill the customer_shop_stats table from bills.")
+    parser.add_argument("--user-id", type=int, default=None, help="Only process this shop")
+    args = parser.parse_args()
+
+    # Create the stats table if it doesn't exist yet
+    Base.metadata.create_all(bind=engine)
+
+    db = SessionLocal()
+    try:
+        print("Rebuilding customer_shop_stats from bills...")
+        rebuild_customer_stats(db, args.user_id)
+        count = db.query(customer_stats.CustomerShopStats).count()
+        print(f"Rebuild complete: {count} customer rows.")
+        print("Set USE_CUSTOMER_STATS_TABLE=true to serve /customers/stats from this table.")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
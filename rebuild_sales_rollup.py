@@ -0,0 +1,38 @@
+import sys
+import os
+import argparse
+from app.database.database import SessionLocal, engine, Base
+from app.models import bill, sales_rollup, user, vegetable # Import models for registration
+from app.services.sales_rollup_service import rebuild_rollup, check_rollup
+
+# Ensure we can import from app
+sys.path.append(os.getcwd())
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill or verify the daily sales rollup tables.")
+    parser.add_argument("--user-id", type=int, default=None, help="Only process this shop")
+    parser.add_argument("--check", action="store_true", help="Only compare the rollup with raw bills")
+    args = parser.parse_args()
+
+    # Create the rollup tables if they don't exist yet
+    Base.metadata.create_all(bind=engine)
+
+    db = SessionLocal()
+    try:
+        if not args.check:
+            print("Rebuilding daily sales rollup from bills...")
+            rebuild_rollup(db, args.user_id)
+            print("Rebuild complete.")
+
+        problems = check_rollup(db, args.user_id)
+        if problems:
+            print(f"Rollup is INCONSISTENT ({len(problems)} mismatches):")
+            for problem in problems:
+                print(f"- {problem}")
+            sys.exit(1)
+        print("Rollup is consistent with raw bills.")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
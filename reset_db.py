@@ -4,8 +4,14 @@ from app.models.user import User
 from app.models.vegetable import Vegetable
 from app.models.inventory import Inventory
 from app.models.bill import Bill, BillItem
+from app.models.bill_sequence import BillSequence
+from app.models.sales_rollup import DailySalesRollup, DailyVegetableRollup
 from app.models.usage import VegetableUsage
 from app.models.customer import Customer
+from app.models.customer_stats import CustomerShopStats
+from app.models.stock_movement import StockMovement
+from app.models.price_schedule import PriceSchedule
+from app.models.price_history import PriceHistoryDay
 from app.utils.seed_vegetables import seed_vegetables
 from app.database.database import SessionLocal
 from app.models.user import User, UserRole
@@ -15,11 +21,20 @@ def reset_database():
     print("Dropping all tables...")
     # Using raw SQL to drop everything for PostgreSQL to handle dependencies
     with engine.connect() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS stock_movements CASCADE;"))
+        conn.execute(text("DROP TABLE IF EXISTS price_schedules CASCADE;"))
+        conn.execute(text("DROP TABLE IF EXISTS price_history_days CASCADE;"))
         conn.execute(text("DROP TABLE IF EXISTS bill_items CASCADE;"))
+        conn.execute(text("DROP TABLE IF EXISTS bill_sequences CASCADE;"))
+        conn.execute(text("DROP TABLE IF EXISTS customer_shop_stats CASCADE;"))
+        conn.execute(text("DROP TABLE IF EXISTS daily_sales_rollup CASCADE;"))
+        conn.execute(text("DROP TABLE IF EXISTS daily_vegetable_rollup CASCADE;"))
         conn.execute(text("DROP TABLE IF EXISTS bills CASCADE;"))
+        conn.execute(text("DROP TABLE IF EXISTS inventory_tombstones CASCADE;"))
         conn.execute(text("DROP TABLE IF EXISTS inventory CASCADE;"))
         conn.execute(text("DROP TABLE IF EXISTS vegetable_usage CASCADE;"))
         conn.execute(text("DROP TABLE IF EXISTS vegetables CASCADE;"))
+        conn.execute(text("DROP TABLE IF EXISTS catalog_versions CASCADE;"))
         conn.execute(text("DROP TABLE IF EXISTS customers CASCADE;"))
         conn.execute(text("DROP TABLE IF EXISTS users CASCADE;"))
         conn.execute(text("DROP TYPE IF EXISTS userrole;"))
@@ -0,0 +1,28 @@
+import sys
+import os
+import argparse
+from app.database.database import SessionLocal, engine, Base
+from app.models import inventory, price_schedule, user, vegetable # Import models for registration
+from app.services.price_schedule_service import next_event, run_due
+
+# Ensure we can import from app
+sys.path.append(os.getcwd())
+
+def main():
+    parser = argparse.ArgumentParser(description="Activate and expire the daily rate cards that are due now.")
+    parser.add_argument("--user-id", type=int, default=None, help="Only process this shop")
+    args = parser.parse_args()
+
+    # Create the schedule table if it doesn't exist yet
+    Base.metadata.create_all(bind=engine)
+
+    db = SessionLocal()
+    try:
+        shops = run_due(db, user_id=args.user_id)
+        db.commit()
+        print(f"Rate cards applied for {len(shops)} shops. Next change due at: {next_event(db) or 'none'} (UTC)")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,9 @@ from app.database.database import SessionLocal, engine
 from app.models.user import User
 from app.models.vegetable import Vegetable
 from app.models.inventory import Inventory
+from app.services.catalog_cache import bump_catalog_version
+from app.services.price_table import bump_price_version
+from app.services.sync_service import stamp_inventory, stamp_vegetables
 
 # Ensure we can import from app
 sys.path.append(os.getcwd())
@@ -53,6 +56,7 @@ def seed_ui_inventory():
 
         print(f"Seeding {len(payload['items'])} items for user '{admin.username}'...")
 
+        seeded_ids = []
         for item in payload["items"]:
             # Check/Create Vegetable
             veg = db.query(Vegetable).filter(Vegetable.name == item["name"]).first()
@@ -75,6 +79,8 @@ def seed_ui_inventory():
                 veg.image_url = item["image"]
                 veg.price_per_kg = item["price"]
 
+            seeded_ids.append(veg.id)
+
             # Check/Create Inventory for Admin
             inv = db.query(Inventory).filter(
                 Inventory.user_id == admin.id,
@@ -96,6 +102,10 @@ def seed_ui_inventory():
                 inv.retail_price = item["price"]
                 inv.wholesale_price = item["price"] * 0.8
 
+        bump_catalog_version(db)
+        bump_price_version(db, admin.id)
+        stamp_vegetables(db, seeded_ids)
+        stamp_inventory(db, admin.id, seeded_ids)
         db.commit()
         print("Success! UI vegetables seeded successfully.")
 
@@ -5,6 +5,9 @@ from app.database.database import SessionLocal, engine
 from app.models.user import User
 from app.models.vegetable import Vegetable
 from app.models.inventory import Inventory
+from app.services.catalog_cache import bump_catalog_version
+from app.services.price_table import bump_price_version
+from app.services.sync_service import stamp_inventory, stamp_vegetables
 
 # Ensure we can import from app
 sys.path.append(os.getcwd())
@@ -63,6 +66,7 @@ def seed_vegetables(username):
 
         print(f"Seeding {len(items)} items for user '{user.username}'...")
 
+        seeded_ids = []
         for item in items:
             # Check/Create Vegetable in master list
             veg = db.query(Vegetable).filter(Vegetable.name == item["english"]).first()
@@ -83,6 +87,8 @@ def seed_vegetables(username):
                 veg.tanglish_name = item["tanglish"]
                 veg.category = item["category"]
 
+            seeded_ids.append(veg.id)
+
             # Add to user inventory
             inv = db.query(Inventory).filter(
                 Inventory.user_id == user.id,
@@ -100,6 +106,10 @@ def seed_vegetables(username):
                 )
                 db.add(inv)
                 
+        bump_catalog_version(db)
+        bump_price_version(db, user.id)
+        stamp_vegetables(db, seeded_ids)
+        stamp_inventory(db, user.id, seeded_ids)
         db.commit()
         print(f"Success! Vegetables seeded for {user.username}.")
 
@@ -0,0 +1,27 @@
+"""
+Concurrent cache misses through run_sync must not freeze the event loop;
+see benchmarks/check_cache_concurrency.py. Needs the database from .env.
+"""
+import pytest
+
+from app.database.database import Base, SessionLocal, engine
+from app.utils.seed_vegetables import seed_vegetables
+from benchmarks.check_cache_concurrency import CALLERS, CHECKS, run_check
+
+
+@pytest.fixture(scope="module")
+def db():
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    seed_vegetables(session)
+    yield session
+    session.close()
+
+
+@pytest.mark.parametrize("cache", sorted(CHECKS))
+def test_concurrent_misses(db, cache):
+    setup, tables = CHECKS[cache]
+    version, read = setup(db)
+    snapshots, status = run_check(read, tables)
+    assert status == "ok"
+    assert [snapshot.version for snapshot in snapshots] == [version] * CALLERS
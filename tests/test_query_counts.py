@@ -0,0 +1,24 @@
+"""
+Statement-count regression test for the POS start-up screens; fails when an
+endpoint starts issuing a query per row (N+1) or exceeds its budget in
+benchmarks/check_query_counts.py. Needs the database configured in .env:
+
+    pip install -r requirements-dev.txt
+    python -m pytest
+"""
+import pytest
+
+from benchmarks.check_query_counts import BUDGETS, check_counts, measure_counts
+
+
+@pytest.fixture(scope="module")
+def counts():
+    return measure_counts()
+
+
+@pytest.mark.parametrize("endpoint", sorted(BUDGETS))
+def test_statement_count(counts, endpoint):
+    small, large = counts[endpoint]
+    assert check_counts(endpoint, small, large) == "ok", (
+        f"{endpoint}: {small} statements with a few rows, {large} with many (budget {BUDGETS[endpoint]})"
+    )